@@ -0,0 +1,50 @@
+"""Memory used by settings trees.
+
+Run from the repository root: python -m benchmarks.memory
+"""
+import json
+import tracemalloc
+
+from morfdict import Paths
+from morfdict import StringDict
+
+
+def measure(make):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    data = make()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del data
+    return after - before
+
+
+def make_settings(dicts=1000, keys=10):
+    settings = StringDict()
+    for index in range(dicts):
+        settings['section{0}'.format(index)] = {
+            'key{0}'.format(key): 'value' for key in range(keys)}
+    return settings
+
+
+def make_paths(count=5000):
+    paths = Paths()
+    paths.set('root', 'root', is_root=True)
+    for index in range(count):
+        paths.set('path{0}'.format(index), 'dir{0}'.format(index), 'root')
+    return paths
+
+
+def main():
+    settings = measure(make_settings)
+    paths = measure(make_paths)
+    print(json.dumps({
+        'settings_bytes': settings,
+        'settings_bytes_per_dict': settings // 1000,
+        'paths_bytes': paths,
+        'paths_bytes_per_element': paths // 5000,
+    }, indent=4))
+
+
+if __name__ == '__main__':
+    main()
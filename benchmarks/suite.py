@@ -0,0 +1,334 @@
+"""Speed of MorfDict, StringDict, Paths and Factory.
+
+Run from the repository root:
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --compare old.json new.json
+
+Every benchmark is run a few times and the timings (in seconds) are written
+as JSON, together with the Python version and the machine.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import perf_counter
+
+from morfdict import Factory
+from morfdict import Paths
+from morfdict import StringDict
+from morfdict.cache import MorfCache
+from morfdict.loaders import build_settings
+from morfdict.schema import Schema
+
+BENCHMARKS = []
+
+
+def benchmark(loops):
+    """Register function which prepares data and returns the measured
+    function. Measured function is called `loops` times per run."""
+    def decorator(prepare):
+        BENCHMARKS.append((prepare.__name__, loops, prepare))
+        return prepare
+    return decorator
+
+
+def make_flat(keys):
+    return StringDict({'key{0}'.format(index): 'value' for index in range(
+        keys)})
+
+
+def make_nested(depth):
+    settings = StringDict({'leaf': 'value'})
+    data = settings
+    for index in range(depth):
+        data['child'] = {}
+        data = data['child']
+    return settings, data
+
+
+@benchmark(100000)
+def getitem_flat():
+    settings = make_flat(1000)
+    return lambda: settings['key500']
+
+
+@benchmark(100000)
+def getitem_nested():
+    settings, data = make_nested(10)
+    data['leaf'] = 'value'
+    return lambda: settings['child']['child']['child']['child']['child']
+
+
+@benchmark(100000)
+def getitem_nested_leaf():
+    settings, data = make_nested(5)
+    data['leaf'] = 'value'
+    return lambda: settings['child']['child']['child']['child']['child'][
+        'leaf']
+
+
+@benchmark(100000)
+def get_path_nested_leaf():
+    settings, data = make_nested(5)
+    data['leaf'] = 'value'
+    return settings.accessor('child.child.child.child.child.leaf')
+
+
+@benchmark(100000)
+def schema_view_nested_leaf():
+    settings, data = make_nested(5)
+    data['leaf'] = 'value'
+    fields = {'leaf': str}
+    for index in range(5):
+        fields = {'child': fields}
+    cfg = Schema(fields).build(settings)
+    return lambda: cfg.child.child.child.child.child.leaf
+
+
+@benchmark(100000)
+def getitem_cached_morf():
+    settings = StringDict({'name': 'app', 'path': '/srv/%(name)s'})
+    MorfCache().set_morf(
+        settings, 'path',
+        lambda obj, value: obj._default_morf(obj, value).upper())
+    return lambda: settings['path']
+
+
+@benchmark(100000)
+def getitem_parent_fallback():
+    settings, data = make_nested(10)
+    return lambda: data['leaf']
+
+
+@benchmark(10000)
+def getitem_parent_miss():
+    settings, data = make_nested(10)
+    return lambda: data.get('missing')
+
+
+def make_chain(depth):
+    settings = StringDict({'key0': 'value'})
+    for index in range(1, depth + 1):
+        settings['key{0}'.format(index)] = '%(key{0})s/{0}'.format(index - 1)
+    return settings
+
+
+@benchmark(10000)
+def interpolation_chain_2():
+    settings = make_chain(2)
+    return lambda: settings['key2']
+
+
+@benchmark(1000)
+def interpolation_chain_20():
+    settings = make_chain(20)
+    return lambda: settings['key20']
+
+
+@benchmark(100)
+def interpolation_chain_100():
+    settings = make_chain(100)
+    return lambda: settings['key100']
+
+
+@benchmark(5)
+def to_dict_10k():
+    settings = make_flat(5000)
+    for index in range(5000):
+        settings['ref{0}'.format(index)] = '%(key{0})s ref'.format(index)
+    return settings.to_dict
+
+
+@benchmark(5)
+def merge_10k():
+    layer = make_flat(10000)
+    return lambda: StringDict().merge(layer)
+
+
+def make_data(count):
+    return {
+        'group{0}'.format(group): {
+            'key{0}'.format(index): '%(name)s {0}'.format(index)
+            for index in range(count // 100)}
+        for group in range(100)}
+
+
+@benchmark(5)
+def construct_10k():
+    data = make_data(10000)
+    return lambda: StringDict(data)
+
+
+def make_wide(count):
+    return {
+        'section{0}'.format(index): {'a': 'x', 'b': '%(a)s y'}
+        for index in range(count)}
+
+
+@benchmark(5)
+def construct_wide_2000():
+    data = make_wide(2000)
+    return lambda: StringDict(data)
+
+
+@benchmark(5)
+def setitem_wide_root_2000():
+    data = make_wide(2000)
+    names = ['root{0}'.format(index) for index in range(2000)]
+
+    def run():
+        settings = StringDict(data)
+        for name in names:
+            settings[name] = 'value'
+    return run
+
+
+@benchmark(5)
+def build_settings_10k():
+    data = make_data(10000)
+    return lambda: build_settings(data)
+
+
+def make_paths(count):
+    paths = Paths()
+    paths.set('root', 'root', is_root=True)
+    for index in range(count):
+        parent = 'path{0}'.format(index // 10) if index >= 10 else 'root'
+        paths.set('path{0}'.format(index), 'dir{0}'.format(index), parent)
+    return paths
+
+
+@benchmark(10000)
+def paths_get():
+    paths = make_paths(5000)
+    return lambda: paths.get('path4999')
+
+
+@benchmark(5)
+def paths_to_dict():
+    return make_paths(5000).to_dict
+
+
+@benchmark(5)
+def paths_set_wide_20k():
+    names = ['path{0}'.format(index) for index in range(20000)]
+
+    def run():
+        paths = Paths()
+        paths.set('root', 'root', is_root=True)
+        for name in names:
+            paths.set(name, name, 'root')
+    return run
+
+
+@benchmark(5)
+def paths_to_tree():
+    return make_paths(5000).to_tree
+
+
+SETTINGS_MODULE = '''
+def make_settings(settings, paths):
+{0}
+'''
+
+
+@benchmark(10)
+def factory_cold():
+    root = mkdtemp()
+    package = os.path.join(root, 'benchpkg')
+    os.makedirs(os.path.join(package, 'settings'))
+    for name in ['__init__.py', os.path.join('settings', '__init__.py')]:
+        open(os.path.join(package, name), 'w').close()
+    for name in ['default', 'local']:
+        lines = '\n'.join(
+            "    settings['{0}{1}'] = '%(name)s {1}'".format(name, index)
+            for index in range(500))
+        with open(os.path.join(package, 'settings', name + '.py'), 'w') as f:
+            f.write(SETTINGS_MODULE.format(lines))
+    sys.path.insert(0, root)
+
+    def make_settings():
+        for name in list(sys.modules):
+            if name.startswith('benchpkg'):
+                del sys.modules[name]
+        Factory('benchpkg').make_settings({'name': 'bench'})
+
+    make_settings.cleanup = lambda: (sys.path.remove(root), rmtree(root))
+    return make_settings
+
+
+def run_benchmark(loops, prepare, repeat):
+    function = prepare()
+    timings = []
+    try:
+        for index in range(repeat):
+            start = perf_counter()
+            for loop in range(loops):
+                function()
+            timings.append((perf_counter() - start) / loops)
+    finally:
+        if hasattr(function, 'cleanup'):
+            function.cleanup()
+    return {
+        'loops': loops,
+        'min': min(timings),
+        'mean': sum(timings) / len(timings),
+        'timings': timings,
+    }
+
+
+def run(names=None, repeat=5):
+    results = {}
+    for name, loops, prepare in BENCHMARKS:
+        if names and name not in names:
+            continue
+        results[name] = run_benchmark(loops, prepare, repeat)
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'benchmarks': results,
+    }
+
+
+def compare(old, new):
+    """Return lines with change of min timing for every benchmark."""
+    lines = []
+    for name, result in sorted(new['benchmarks'].items()):
+        if name not in old['benchmarks']:
+            continue
+        before = old['benchmarks'][name]['min']
+        after = result['min']
+        lines.append('{0:30} {1:12.3e} {2:12.3e} {3:8.2f}x'.format(
+            name, before, after, before / after if after else float('inf')))
+    return lines
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('names', nargs='*', help='benchmarks to run')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='file for the JSON results')
+    parser.add_argument(
+        '--compare', nargs=2, metavar=('OLD', 'NEW'),
+        help='compare two JSON results instead of running benchmarks')
+    args = parser.parse_args(args)
+
+    if args.compare:
+        with open(args.compare[0]) as old, open(args.compare[1]) as new:
+            print('\n'.join(compare(json.load(old), json.load(new))))
+        return
+
+    data = json.dumps(run(args.names, args.repeat), indent=4)
+    if args.output:
+        with open(args.output, 'w') as stream:
+            stream.write(data)
+    else:
+        print(data)
+
+
+if __name__ == '__main__':
+    main()
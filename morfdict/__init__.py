@@ -1,6 +1,17 @@
 from morfdict.factory import Factory
+from morfdict.models import CachedStringDict
+from morfdict.models import FrozenDict
+from morfdict.models import LayeredDict
 from morfdict.models import MorfDict
 from morfdict.models import Paths
 from morfdict.models import StringDict
 
-__all__ = ['Factory', 'MorfDict', 'StringDict', 'Paths']
+__all__ = [
+    'Factory',
+    'MorfDict',
+    'StringDict',
+    'CachedStringDict',
+    'FrozenDict',
+    'LayeredDict',
+    'Paths',
+]
@@ -0,0 +1,186 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+
+from morfdict.cache import MorfCache
+from morfdict.models import MorfDict
+from morfdict.models import NoDefault
+from morfdict.template import find_references
+
+# Results of AsyncMorfs awaited before running the synchronous code, by
+# (id(morf), id(obj)), as pairs of the raw value and the result. The same
+# morf can be set for many keys of the object, which differ by raw value.
+_prefetched = ContextVar('morfdict_prefetched', default=None)
+
+
+def run_sync(coroutine):
+    """Run the coroutine and return its result. If an event loop is already
+    running in this thread, the coroutine is run in a separate thread."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+
+class AsyncMorf(object):
+    """Morf method which can be awaited.
+
+    - method: `async def method(obj, value)`, or a normal function when
+        blocking is true; blocking methods are run in a thread pool
+    - cache: if true, result is kept until the value changes, in a
+        MorfCache of this morf or in the MorfCache given
+    - timeout: seconds after which asyncio.TimeoutError is raised (for
+        blocking methods only when awaited)
+
+    Reading the key in normal, synchronous way still works, but blocks until
+    the method is done.
+    """
+
+    def __init__(self, method, blocking=False, cache=False, timeout=None):
+        self.method = method
+        self.blocking = blocking
+        if cache is True:
+            cache = MorfCache()
+        self.cache = cache if isinstance(cache, MorfCache) else None
+        self.timeout = timeout
+
+    def _get_cached(self, obj, value):
+        prefetched = _prefetched.get()
+        if prefetched is not None:
+            for raw, result in prefetched.get((id(self), id(obj)), ()):
+                if raw is value or raw == value:
+                    return result
+        if self.cache is not None:
+            return self.cache.get_result((id(self), id(obj)), obj, value)
+        return NoDefault
+
+    def _store(self, obj, value, result):
+        if self.cache is not None:
+            self.cache.put_result((id(self), id(obj)), obj, value, result)
+        return result
+
+    def __call__(self, obj, value):
+        result = self._get_cached(obj, value)
+        if result is not NoDefault:
+            return result
+        if self.blocking:
+            result = self.method(obj, value)
+        else:
+            result = run_sync(self._wait(self.method(obj, value)))
+        return self._store(obj, value, result)
+
+    async def acall(self, obj, value, executor=None):
+        result = self._get_cached(obj, value)
+        if result is not NoDefault:
+            return result
+        if self.blocking:
+            loop = asyncio.get_running_loop()
+            awaitable = loop.run_in_executor(
+                executor, self.method, obj, value)
+        else:
+            awaitable = self.method(obj, value)
+        return self._store(obj, value, await self._wait(awaitable))
+
+    async def _wait(self, awaitable):
+        if self.timeout is None:
+            return await awaitable
+        return await asyncio.wait_for(awaitable, self.timeout)
+
+
+def find_async_morfs(settings, key, found=None):
+    """Find AsyncMorfs needed to read the key. Return dict of
+    (id(obj), key) to (morf, obj, key, dependencies), where dependencies
+    are the AsyncMorfs needed to get the value passed to the morf."""
+    found = {} if found is None else found
+    _find(settings, key, found, set())
+    return found
+
+
+def _find(settings, key, found, seen):
+    if (id(settings), key) in seen:
+        return []
+    seen.add((id(settings), key))
+
+    dependencies = []
+    if dict.__contains__(settings, key):
+        raw = dict.get(settings, key)
+        if isinstance(raw, str):
+            for name in find_references(raw):
+                _find(settings, name, found, seen)
+    else:
+        owner = settings._owner(key)
+        if not isinstance(owner, MorfDict):
+            return []
+        dependencies = _find(owner, key, found, seen)
+
+    morf = settings._morf.get(key)
+    if isinstance(morf, AsyncMorf):
+        found[(id(settings), key)] = (morf, settings, key, dependencies)
+        return [(id(settings), key)]
+    return dependencies
+
+
+def find_all_async_morfs(settings):
+    """Find AsyncMorfs needed to read every key of the tree."""
+    found = {}
+    stack = [settings]
+    seen = set()
+    while stack:
+        node = stack.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        for key in list(node.keys()):
+            find_async_morfs(node, key, found)
+            value = dict.get(node, key)
+            if isinstance(value, MorfDict):
+                stack.append(value)
+    return found
+
+
+async def prefetch(found, executor=None):
+    """Await all the AsyncMorfs concurrently. Morfs which need a value
+    made by another AsyncMorf wait for it."""
+    results = dict(_prefetched.get() or {})
+    tasks = {}
+
+    async def run(morf, obj, key, dependencies):
+        for dependency in dependencies:
+            await tasks[dependency]
+        token = _prefetched.set(results)
+        try:
+            value = obj._get_from_self_or_parent(key)
+        finally:
+            _prefetched.reset(token)
+        result = await morf.acall(obj, value, executor)
+        name = (id(morf), id(obj))
+        results[name] = results.get(name, ()) + ((value, result),)
+
+    for name, item in found.items():
+        tasks[name] = asyncio.ensure_future(run(*item))
+    if tasks:
+        await asyncio.gather(*tasks.values())
+    return results
+
+
+async def aget(settings, key, executor=None):
+    """Read the key, awaiting all the AsyncMorfs it needs concurrently."""
+    results = await prefetch(find_async_morfs(settings, key), executor)
+    token = _prefetched.set(results)
+    try:
+        return settings[key]
+    finally:
+        _prefetched.reset(token)
+
+
+async def ato_dict(settings, executor=None):
+    """Make dict like MorfDict.to_dict, awaiting all the AsyncMorfs of the
+    tree concurrently."""
+    results = await prefetch(find_all_async_morfs(settings), executor)
+    token = _prefetched.set(results)
+    try:
+        return settings.to_dict()
+    finally:
+        _prefetched.reset(token)
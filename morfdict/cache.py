@@ -0,0 +1,167 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from weakref import ref
+
+from morfdict.models import NoDefault
+from morfdict.models import split_path
+
+
+def _same(old, new):
+    return old is new or (type(old) is type(new) and old == new)
+
+
+class CacheEntry(object):
+    __slots__ = ('owner', 'raw', 'dependencies', 'expires', 'value')
+
+    def __init__(self, owner, raw, dependencies, expires, value):
+        self.owner = owner
+        self.raw = raw
+        self.dependencies = dependencies
+        self.expires = expires
+        self.value = value
+
+
+class CachingMorf(object):
+    """Morf method which keeps results of the original one in a MorfCache.
+
+    A result is used until:
+    - ttl seconds pass (if ttl is given),
+    - the raw value of the key changes (if raw is true),
+    - value of one of the dependencies changes. Dependencies are paths like
+        'db.host' read from the object which has the key (so values of its
+        parents are found as well).
+    With raw set to false and no ttl or dependencies the result is kept
+    forever (until it is evicted or the cache is cleared).
+    """
+
+    def __init__(self, cache, key, morf, ttl=None, raw=True, depends=()):
+        self.cache = cache
+        self.key = key
+        self.morf = morf
+        self.ttl = ttl
+        self.raw = raw
+        self.depends = [split_path(path) for path in depends]
+
+    def _read_dependencies(self, obj):
+        values = []
+        for keys in self.depends:
+            node = obj._walk(keys[:-1])
+            values.append(
+                NoDefault if node is None
+                else node._get_value(keys[-1], NoDefault))
+        return values
+
+    def _is_valid(self, entry, obj, value, dependencies):
+        if entry.owner() is not obj:
+            return False
+        if entry.expires is not None and entry.expires <= monotonic():
+            return False
+        if self.raw and not _same(entry.raw, value):
+            return False
+        for old, new in zip(entry.dependencies, dependencies):
+            if not _same(old, new):
+                return False
+        return True
+
+    def __call__(self, obj, value):
+        cache = self.cache
+        name = (id(obj), self.key)
+        dependencies = self._read_dependencies(obj)
+        entry = cache.get(name)
+        if entry is not None and self._is_valid(
+            entry, obj, value, dependencies,
+        ):
+            cache.hits += 1
+            return entry.value
+
+        cache.misses += 1
+        result = self.morf(obj, value)
+        expires = None if self.ttl is None else monotonic() + self.ttl
+        cache.put(name, CacheEntry(
+            ref(obj), value, dependencies, expires, result))
+        return result
+
+
+class MorfCache(object):
+    """Bounded LRU store of morfed values for one settings tree.
+
+    >> cache = MorfCache(maxsize=256)
+    >> cache.set_morf(settings, 'secret', read_secret_file, ttl=60)
+    >> settings['secret']
+    >> cache.hits, cache.misses, cache.evictions
+    (0, 1, 0)
+
+    When maxsize entries are stored, the least recently used one is
+    evicted. Counters are not guarded by the lock, so they are approximate
+    when many threads read at once.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, name):
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                self._entries.move_to_end(name)
+            return entry
+
+    def put(self, name, entry):
+        with self._lock:
+            self._entries[name] = entry
+            self._entries.move_to_end(name)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_result(self, name, obj, value):
+        """Get result stored by put_result for the same object and raw
+        value, or NoDefault."""
+        entry = self.get(name)
+        if (
+            entry is None or entry.owner() is not obj
+            or not _same(entry.raw, value)
+        ):
+            self.misses += 1
+            return NoDefault
+        self.hits += 1
+        return entry.value
+
+    def put_result(self, name, obj, value, result):
+        """Store result of morfing the raw value of the object. The object
+        is only weakly referenced, so a new object with the same id does not
+        get the result."""
+        self.put(name, CacheEntry(ref(obj), value, (), None, result))
+        return result
+
+    def clear(self):
+        """Drop all the entries. Counters are not reset."""
+        with self._lock:
+            self._entries.clear()
+
+    def morf(self, key, morf, ttl=None, raw=True, depends=()):
+        """Make CachingMorf for the key (see CachingMorf for the policy)."""
+        return CachingMorf(self, key, morf, ttl, raw, depends)
+
+    def set_morf(self, settings, key, morf, ttl=None, raw=True, depends=()):
+        """Set morf method for the key of the settings, which keeps its
+        results in this cache."""
+        settings.set_morf(key, self.morf(key, morf, ttl, raw, depends))
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+        }
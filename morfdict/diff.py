@@ -0,0 +1,88 @@
+from morfdict.models import Change
+from morfdict.models import MorfDict
+from morfdict.models import NoDefault
+
+
+def same_value(old, new):
+    """Check if raw values are the same, without morfing them."""
+    if old is new:
+        return True
+    try:
+        return type(old) is type(new) and bool(old == new)
+    except Exception:
+        return False
+
+
+def diff(before, after, path=()):
+    """Yield Changes which turn raw values and morf methods of before into
+    the ones of after. Values are not morfed. Nested MorfDicts are compared
+    key by key, but the same object is skipped without looking into it."""
+    if before is after:
+        return
+    for key in after.keys():
+        old = dict.get(before, key, NoDefault)
+        new = dict.get(after, key)
+        if old is new:
+            continue
+        if isinstance(old, MorfDict) and isinstance(new, MorfDict):
+            yield from diff(old, new, path + (key,))
+        elif not same_value(old, new):
+            yield Change.make(path + (key,), old, new)
+    for key in before.keys():
+        if not dict.__contains__(after, key):
+            yield Change.make(path + (key,), dict.get(before, key), NoDefault)
+
+    if before._morf is after._morf:
+        return
+    for key, morf in after._morf.items():
+        old = before._morf.get(key, NoDefault)
+        if old is not morf:
+            yield Change.make(path + (key,), old, morf, True)
+    for key, morf in before._morf.items():
+        if key not in after._morf:
+            yield Change.make(path + (key,), morf, NoDefault, True)
+
+
+class TreeObserver(object):
+    """Observe a MorfDict and all its nested MorfDicts, including the ones
+    set later. callback(change) gets Changes with paths starting at the
+    observed object.
+
+    >> observer = TreeObserver(settings, print)
+    >> settings['db']['host'] = 'db2'
+    Change(changed, 'db.host')
+    >> observer.stop()
+    """
+
+    def __init__(self, settings, callback):
+        self.callback = callback
+        self._observed = []
+        self._observe(settings, ())
+
+    def _observe(self, settings, path):
+        stack = [(settings, path)]
+        while stack:
+            node, path = stack.pop()
+            observer = self._make_observer(path)
+            node.add_observer(observer)
+            self._observed.append((node, observer))
+            for key in node.keys():
+                value = dict.get(node, key)
+                if isinstance(value, MorfDict):
+                    stack.append((value, path + (key,)))
+
+    def _make_observer(self, path):
+        def observer(change):
+            if path:
+                change = Change(
+                    change.kind, path + change.path, change.old, change.new,
+                    change.morf)
+            if not change.morf and isinstance(change.new, MorfDict):
+                self._observe(change.new, change.path)
+            self.callback(change)
+        return observer
+
+    def stop(self):
+        for node, observer in self._observed:
+            node.remove_observer(observer)
+        self._observed = []
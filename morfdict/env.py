@@ -0,0 +1,124 @@
+from os import environ
+
+from morfdict.models import EnvirontmentValueMissing
+from morfdict.models import MorfDict
+
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+FALSE_VALUES = ('0', 'false', 'no', 'off', '')
+
+
+def to_bool(value):
+    """Convert environment value like 'true', 'yes', '1' or 'off' to bool."""
+    normalized = value.strip().lower()
+    if normalized in TRUE_VALUES:
+        return True
+    if normalized in FALSE_VALUES:
+        return False
+    raise ValueError('{0!r} is not a bool value'.format(value))
+
+
+def to_list(value):
+    """Convert comma separated environment value to a list of strings."""
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+class EnvirontmentValueInvalid(Exception):
+
+    def __init__(self, name, value, error):
+        self.message = (
+            'Environtment "{0}" value {1!r} is invalid: {2}'.format(
+                name, value, error))
+        super().__init__(self.message)
+
+
+class EnvBindingError(Exception):
+    """All the problems found while reading bound environment variables."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        self.message = '\n'.join(error.message for error in errors)
+        super().__init__(self.message)
+
+
+class EnvBinding(object):
+    __slots__ = ('key', 'name', 'convert', 'default', 'error')
+
+    def __init__(
+        self, key, name, convert=str, default=NotImplemented, error=None,
+    ):
+        assert not (default is not NotImplemented and error)
+        self.key = tuple(key) if isinstance(key, (list, tuple)) else (key,)
+        self.name = name
+        self.convert = convert
+        self.default = default
+        self.error = error
+
+    def read(self, variables):
+        """Read and convert the value. Default value is not converted."""
+        if self.name not in variables:
+            if self.default is NotImplemented:
+                raise EnvirontmentValueMissing(self.name, self.error)
+            return self.default
+        value = variables[self.name]
+        try:
+            return self.convert(value)
+        except (TypeError, ValueError) as error:
+            raise EnvirontmentValueInvalid(self.name, value, error)
+
+
+class EnvBindings(object):
+    """Settings keys bound to environment variables.
+
+    All the variables are read from one snapshot of the environment and
+    converted at once, so reading the settings later costs nothing.
+    """
+
+    def __init__(self):
+        self.bindings = []
+
+    def __len__(self):
+        return len(self.bindings)
+
+    def bind(self, key, name, convert=str, default=NotImplemented, error=None):
+        """
+        Bind settings key to environment variable.
+        - key - settings key, or list of keys for nested settings
+        - name - name of environment variable
+        - convert - function which converts the value, like int, to_bool
+            or to_list
+        - default - value used when variable is missing
+        - error - error message used when variable is missing
+        default and error args can not be used together
+        """
+        self.bindings.append(EnvBinding(key, name, convert, default, error))
+
+    def keys(self):
+        """Top level settings keys which are bound."""
+        return frozenset(binding.key[0] for binding in self.bindings)
+
+    def read(self, variables=None):
+        """Read all bound variables. Return list of (key, value) tuples or
+        raise EnvBindingError with every missing and invalid variable."""
+        variables = dict(environ) if variables is None else variables
+        values = []
+        errors = []
+        for binding in self.bindings:
+            try:
+                values.append((binding.key, binding.read(variables)))
+            except (
+                EnvirontmentValueMissing, EnvirontmentValueInvalid,
+            ) as error:
+                errors.append(error)
+        if errors:
+            raise EnvBindingError(errors)
+        return values
+
+    def apply(self, settings, variables=None):
+        """Read all bound variables and set them in the settings."""
+        for keys, value in self.read(variables):
+            target = settings
+            for key in keys[:-1]:
+                if not isinstance(dict.get(target, key), MorfDict):
+                    target[key] = {}
+                target = target._raw_get(key)
+            target[keys[-1]] = value
@@ -0,0 +1,150 @@
+import json
+import re
+
+from morfdict.models import MorfDict
+from morfdict.resolver import Resolver
+
+ENV_NAME = re.compile(r'[^A-Za-z0-9_]')
+ENV_SPECIAL = re.compile(r'[\s"\'\\#$`]')
+
+
+def iter_items(settings, skip_errors=False, errors=None):
+    """Yield (key, value) of the MorfDict, resolving one dict at a time.
+    Nested MorfDicts are yielded as they are. If skip_errors is true, keys
+    which can not be read are skipped (like in get_errors) and the errors
+    are added to the errors list."""
+    resolver = Resolver(settings).resolve()
+    for key in list(settings):
+        try:
+            value = resolver.get(key)
+        except Exception as error:
+            if not skip_errors:
+                raise
+            if errors is not None:
+                errors.append(error)
+            continue
+        yield key, value
+
+
+def iter_flat(settings, separator='.', skip_errors=False, errors=None):
+    """Yield (dotted key, value) of all the values of the tree."""
+    stack = [((), iter_items(settings, skip_errors, errors))]
+    while stack:
+        path, items = stack[-1]
+        for key, value in items:
+            if isinstance(value, MorfDict):
+                stack.append((
+                    path + (str(key),),
+                    iter_items(value, skip_errors, errors)))
+                break
+            yield separator.join(path + (str(key),)), value
+        else:
+            stack.pop()
+
+
+def _encode(value, skip_errors, errors):
+    try:
+        return json.dumps(value)
+    except (TypeError, ValueError) as error:
+        if not skip_errors:
+            raise
+        if errors is not None:
+            errors.append(error)
+        return None
+
+
+def iter_json(settings, indent=None, skip_errors=False, errors=None):
+    """Yield parts of JSON document made of the settings."""
+    newline = '\n' if indent is not None else ''
+    separator = ': ' if indent is not None else ':'
+
+    def prefix(depth):
+        return newline + ' ' * ((indent or 0) * depth)
+
+    def encode_node(node, depth):
+        yield '{'
+        empty = True
+        for key, value in iter_items(node, skip_errors, errors):
+            if not isinstance(value, MorfDict):
+                value = _encode(value, skip_errors, errors)
+                if value is None:
+                    continue
+            yield '{0}{1}{2}{3}'.format(
+                '' if empty else ',', prefix(depth + 1),
+                json.dumps(str(key)), separator)
+            empty = False
+            if isinstance(value, MorfDict):
+                yield from encode_node(value, depth + 1)
+            else:
+                yield value
+        yield '}' if empty else prefix(depth) + '}'
+
+    return encode_node(settings, 0)
+
+
+def iter_flat_json(settings, indent=None, skip_errors=False, errors=None):
+    """Yield parts of JSON object with dotted keys, like {"db.host": ...}."""
+    newline = '\n' + ' ' * indent if indent is not None else ''
+    separator = ': ' if indent is not None else ':'
+    yield '{'
+    empty = True
+    for key, value in iter_flat(
+        settings, skip_errors=skip_errors, errors=errors,
+    ):
+        value = _encode(value, skip_errors, errors)
+        if value is None:
+            continue
+        yield '{0}{1}{2}{3}{4}'.format(
+            '' if empty else ',', newline, json.dumps(key), separator, value)
+        empty = False
+    yield '}' if empty or indent is None else '\n}'
+
+
+def format_env_value(value):
+    """Format value in the form which morfdict.env converters read."""
+    if value is None:
+        value = ''
+    elif isinstance(value, bool):
+        value = 'true' if value else 'false'
+    elif isinstance(value, (list, tuple)):
+        value = ','.join(str(item) for item in value)
+    else:
+        value = str(value)
+    if ENV_SPECIAL.search(value):
+        value = '"{0}"'.format(
+            value.replace('\\', '\\\\').replace('"', '\\"').replace(
+                '\n', '\\n'))
+    return value
+
+
+def iter_env(settings, prefix='', skip_errors=False, errors=None):
+    """Yield lines of env file, like DB_HOST=localhost. Names are made of
+    the upper cased keys of the nested dicts, joined by '_'."""
+    for key, value in iter_flat(settings, '_', skip_errors, errors):
+        name = ENV_NAME.sub('_', prefix + key).upper()
+        yield '{0}={1}\n'.format(name, format_env_value(value))
+
+
+def _write(stream, parts):
+    for part in parts:
+        stream.write(part)
+
+
+def write_json(
+    settings, stream, indent=None, flat=False, skip_errors=False,
+):
+    """Write the settings as JSON to the file-like object, without making
+    the whole dict in memory. If flat is true, the JSON object has dotted
+    keys instead of nested objects. Return list of skipped errors."""
+    errors = []
+    make = iter_flat_json if flat else iter_json
+    _write(stream, make(settings, indent, skip_errors, errors))
+    return errors
+
+
+def write_env(settings, stream, prefix='', skip_errors=False):
+    """Write the settings as env file to the file-like object. Return list
+    of skipped errors."""
+    errors = []
+    _write(stream, iter_env(settings, prefix, skip_errors, errors))
+    return errors
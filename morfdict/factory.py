@@ -1,13 +1,165 @@
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from logging import getLogger
+from os import environ
 from os.path import abspath
 from os.path import dirname
 
+from morfdict.env import EnvBindings
+from morfdict.loaders import load_file
+from morfdict.models import LayeredDict
+from morfdict.models import MorfDict
 from morfdict.models import Paths
 from morfdict.models import StringDict
+from morfdict.reload import Reloader
+from morfdict.reload import apply_layer
+from morfdict.reload import copy_paths
+from morfdict.reload import copy_settings
+from morfdict.reload import diff_paths
+from morfdict.snapshot import SnapshotError
+from morfdict.snapshot import find_module_file
+from morfdict.snapshot import make_key
+from morfdict.snapshot import read_snapshot
+from morfdict.snapshot import write_snapshot
+
+log = getLogger('morfdict')
+# Name of the step which applies environment bindings after the modules.
+ENVIRON = '<environ>'
+# Names of the steps which load data files start with it.
+FILE = '<file>'
+
+
+class ParallelError(Exception):
+
+    def __init__(self, message):
+        self.message = message
+        super().__init__(message)
+
+
+class LazySettings(object):
+    """Settings which run pending settings modules of the Factory before a
+    key, which those modules can set, is used for the first time.
+
+    When all the modules are run, the object gets back its original class
+    (and loses the _factory class attribute), which is why the methods of
+    the original class are called directly.
+
+    Copying and pickling run all the modules first. C code which reads the
+    dict storage directly (like json.dumps of settings with no keys yet)
+    does not, so call Factory.load_all or to_dict before it.
+    """
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        factory = self._factory
+        factory.load_key(key)
+        return factory.settings_class.__getitem__(self, key)
+
+    def __setitem__(self, key, value):
+        factory = self._factory
+        if type(value) is dict:
+            value = factory.settings_class(value)
+        factory.load_key(key)
+        factory.settings_class.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        factory = self._factory
+        factory.load_key(key)
+        factory.settings_class.__delitem__(self, key)
+
+    def _raw_get(self, key):
+        factory = self._factory
+        factory.load_key(key)
+        return factory.settings_class._raw_get(self, key)
+
+    def _get_value(self, key, default):
+        factory = self._factory
+        factory.load_key(key)
+        return factory.settings_class._get_value(self, key, default)
+
+    def _get_child(self, key):
+        factory = self._factory
+        factory.load_key(key)
+        return factory.settings_class._get_child(self, key)
+
+    def __contains__(self, key):
+        factory = self._factory
+        factory.load_key(key)
+        return factory.settings_class.__contains__(self, key)
+
+    def _has_key(self, key, seen=None):
+        # nested dicts look for keys of their parents with it
+        factory = self._factory
+        factory.load_key(key)
+        return factory.settings_class._has_key(self, key, seen)
+
+    def __iter__(self):
+        factory = self._factory
+        factory.load_all()
+        return factory.settings_class.__iter__(self)
+
+    def __len__(self):
+        factory = self._factory
+        factory.load_all()
+        return factory.settings_class.__len__(self)
+
+    def keys(self):
+        factory = self._factory
+        factory.load_all()
+        return factory.settings_class.keys(self)
+
+    def set_morf(self, key, morf):
+        factory = self._factory
+        factory.load_key(key)
+        factory.settings_class.set_morf(self, key, morf)
+
+    def merge(self, data):
+        factory = self._factory
+        factory.load_all()
+        factory.settings_class.merge(self, data)
+
+    def __reduce_ex__(self, protocol):
+        # used by copy, deepcopy and pickle
+        factory = self._factory
+        factory.load_all()
+        return factory.settings_class.__reduce_ex__(self, protocol)
+
+
+class LazyPaths(Paths):
+    """Paths which run all pending settings modules of the Factory before
+    the first use."""
+
+    def get(self, name):
+        self._factory.load_all()
+        return Paths.get(self, name)
+
+    def set(self, *args, **kwargs):
+        self._factory.load_all()
+        return Paths.set(self, *args, **kwargs)
+
+    def set_generator(self, *args, **kwargs):
+        self._factory.load_all()
+        return Paths.set_generator(self, *args, **kwargs)
+
+    def to_dict(self):
+        self._factory.load_all()
+        return Paths.to_dict(self)
+
+    def to_tree(self):
+        self._factory.load_all()
+        return Paths.to_tree(self)
+
+    def get_errors(self):
+        self._factory.load_all()
+        return Paths.get_errors(self)
 
 
 class Factory(object):
     """Loader for settings files."""
 
+    settings_class = StringDict
+
     def __init__(self, main_modulepath, settings_modulepath='settings'):
         """
         :param main_modulepath: import path to a main module
@@ -16,6 +168,97 @@ class Factory(object):
         """
         self.main_modulepath = main_modulepath
         self.settings_modulepath = settings_modulepath
+        self.manifests = {}
+        self.reads = {}
+        self.env = EnvBindings()
+        self.environ = {}
+        self.reloader = None
+        self.files = []
+        self._pending = []
+        self._running = False
+
+    def declare_keys(self, modulename, keys, reads=None):
+        """Declare top level settings keys which the module can set. In the
+        lazy mode the module is run only when one of those keys is used.
+        Modules without declared keys can set any key.
+
+        Keys which the module reads can be declared as well, so it can run
+        in parallel with modules which do not set them (see the workers
+        argument of make_settings). Modules without declared reads can read
+        any key."""
+        self.manifests[modulename] = frozenset(keys)
+        if reads is not None:
+            self.reads[modulename] = frozenset(reads)
+
+    def get_dependencies(self, modulenames):
+        """Get dict of module name -> names of the modules before it which
+        must run first: the ones which can set keys that it can read or
+        set."""
+        dependencies = {}
+        for index, name in enumerate(modulenames):
+            writes = self.manifests.get(name)
+            reads = self.reads.get(name)
+            dependencies[name] = [
+                before for before in modulenames[:index]
+                if self._depends(writes, reads, self.manifests.get(before))]
+        return dependencies
+
+    def _depends(self, writes, reads, before_writes):
+        if before_writes is None or writes is None or reads is None:
+            return True
+        return bool(before_writes & (writes | reads))
+
+    def bind_env(
+        self, key, name, convert=str, default=NotImplemented, error=None,
+    ):
+        """Bind settings key to environment variable. Bound variables are
+        read once, when the settings are made, and override the values set
+        by the modules. See EnvBindings.bind for the arguments."""
+        self.env.bind(key, name, convert, default, error)
+
+    def apply_env(self):
+        """Set bound environment variables in the settings. Raise
+        EnvBindingError with all the missing and invalid variables."""
+        self.env.apply(self.settings, self.environ)
+
+    def add_file(self, filename, format=None, required=True):
+        """Load settings from a data file (JSON, TOML, INI or env) after the
+        settings modules, in the order of adding. Format is taken from the
+        file extension, unless given. Missing file which is not required
+        is skipped."""
+        self.files.append((filename, format, required))
+
+    def load_file(self, filename, format=None, required=True):
+        """Set values from the data file in the settings."""
+        try:
+            load_file(self.settings, filename, format, self.settings_class)
+        except FileNotFoundError:
+            if required:
+                raise
+
+    def get_steps(self, additional_modules):
+        """Get list of (name, show_error) of everything which sets the
+        settings: modules, data files and environment bindings."""
+        steps = [('default', True)] + list(additional_modules)
+        steps.extend(
+            (FILE + filename, required)
+            for filename, format, required in self.files)
+        if self.env:
+            steps.append((ENVIRON, True))
+        return steps
+
+    def run_step(self, name, show_error):
+        if name == ENVIRON:
+            self.apply_env()
+        elif name.startswith(FILE):
+            filename = name[len(FILE):]
+            for source in self.files:
+                if source[0] == filename:
+                    self.load_file(*source)
+        elif show_error:
+            self.run_module(name)
+        else:
+            self.run_module_without_errors(name)
 
     def _import_wrapper(self, modulepath):
         return __import__(
@@ -47,14 +290,17 @@ class Factory(object):
         """Initialize settings with data. Add 'module_root' to paths
         depending on main module.
         """
-        self.settings = StringDict(settings)
+        self.settings = self.settings_class(settings)
         self.paths = Paths()
 
         mainmodule = self._import_wrapper(self.main_modulepath)
 
         self.paths.set('module_root', dirname(abspath(mainmodule.__file__)))
 
-    def make_settings(self, settings={}, additional_modules=None):
+    def make_settings(
+        self, settings={}, additional_modules=None, lazy=False, snapshot=None,
+        watch=False, layered=False, workers=None,
+    ):
         """Make StringDict and PathDict from modules.
 
         :param settings: default settings
@@ -63,16 +309,304 @@ class Factory(object):
         :param element: in tuple is a module name, second is bool. If setted to
             true,
         :param method: will raise ImportError on missing module.
+        :param lazy: if true, modules are run on the first use of a key which
+            they can set (see declare_keys). Modules are always run in the
+            same order, so the result is the same.
+        :param snapshot: filename of a snapshot. If the snapshot was made from
+            the same module files, settings are read from it without importing
+            the modules. Otherwise the settings are made (not lazily) and
+            stored in the snapshot. Values read with get_from_env are stored
+            as well, but they are not part of the key, so use bind_env for
+            values which change between runs. Parents appended by the
+            modules are stored too; if one of them can not be pickled, the
+            snapshot is not written and a warning is logged.
+        :param watch: if true, self.reloader (see Reloader) is made, which
+            can reload changed modules later. Can not be used with lazy or
+            snapshot.
+        :param layered: if true, settings are LayeredDict and every module
+            sets its values in its own layer, named like the module. Default
+            settings are in the 'init' layer. Can not be used with lazy,
+            snapshot or watch.
+        :param workers: if given, modules are run by that many threads.
+            Every module runs in its own layer, when the modules which it
+            depends on (see declare_keys and get_dependencies) are done, and
+            the layers are merged in the order of the modules, so the result
+            is the same as when they run one by one. Parents appended by the
+            modules are appended after the merge in the same order. Modules
+            can not delete keys set by other modules, and ParallelError is
+            raised when a module adds observers. Data files and environment
+            bindings are applied after the merge. Can not be used with lazy,
+            snapshot or watch.
         """
+        assert not (watch and (lazy or snapshot or self.files))
+        assert not (layered and (lazy or snapshot or watch))
+        assert not (workers and (lazy or snapshot or watch))
         additional_modules = additional_modules or (('local', False),)
+        self.environ = dict(environ)
+        if snapshot:
+            return self._make_settings_with_snapshot(
+                snapshot, settings, additional_modules)
+
         self.init_data(settings)
 
-        self.run_module('default')
+        if lazy:
+            self._pending = self.get_steps(additional_modules)
+            if self.env:
+                self.manifests[ENVIRON] = self.env.keys()
+            self.settings.__class__ = type(
+                'Lazy' + self.settings_class.__name__,
+                (LazySettings, self.settings_class),
+                {'__slots__': (), '_factory': self})
+            self.paths.__class__ = LazyPaths
+            self.paths._factory = self
+            return self.settings, self.paths
+
+        if watch:
+            self.reloader = Reloader(self, additional_modules)
+            self.reloader.build()
+            return self.settings, self.paths
+
+        if workers:
+            return self._make_parallel_settings(
+                additional_modules, workers, layered)
 
-        for module_name, show_error in additional_modules:
-            if show_error:
-                self.run_module(module_name)
-            else:
-                self.run_module_without_errors(module_name)
+        if layered:
+            return self._make_layered_settings(settings, additional_modules)
 
+        for name, show_error in self.get_steps(additional_modules):
+            self.run_step(name, show_error)
         return self.settings, self.paths
+
+    def _make_layered_settings(self, settings, additional_modules):
+        self.settings = LayeredDict()
+        self.settings.push_layer('init', self.settings_class(settings))
+        for name, show_error in self.get_steps(additional_modules):
+            with self.settings.layer(name):
+                self.run_step(name, show_error)
+        return self.settings, self.paths
+
+    def _run_module_layer(self, name, show_error, layers, parents, paths):
+        """Run the module on settings made of the layers and the parents
+        (see find_parents), in a new layer. Return the layer, the changes of
+        the paths and the parents added by the module."""
+        settings = LayeredDict()
+        settings._set_layers(layers)
+        append_parents(settings, parents)
+        before = {
+            (keys, id(parent), parent_keys)
+            for keys, parent, parent_keys in find_parents(settings)}
+        paths_before = copy_paths(paths)
+        with settings.layer(name):
+            try:
+                module = self.import_module(name)
+                module.make_settings(settings, paths)
+            except ImportError:
+                if show_error:
+                    raise
+        if has_observers(settings):
+            raise ParallelError(
+                'Module "{0}" added observers, which can not be kept when '
+                'modules run in parallel'.format(name))
+        added = [
+            (keys, parent, parent_keys)
+            for keys, parent, parent_keys in find_parents(settings)
+            if (keys, id(parent), parent_keys) not in before]
+        return (
+            settings.get_layer(name), diff_paths(paths_before, paths), added)
+
+    def _make_parallel_settings(self, additional_modules, workers, layered):
+        modules = [('default', True)] + list(additional_modules)
+        names = [name for name, show_error in modules]
+        dependencies = self.get_dependencies(names)
+        required = {}
+        for name in names:
+            required[name] = set(dependencies[name])
+            for dependency in dependencies[name]:
+                required[name].update(required[dependency])
+
+        results = {}
+        running = {}
+        waiting = list(modules)
+        with ThreadPoolExecutor(workers) as executor:
+            while waiting or running:
+                for name, show_error in list(waiting):
+                    if not required[name].issubset(results):
+                        continue
+                    waiting.remove((name, show_error))
+                    layers = [('init', self.settings)] + [
+                        (before, results[before][0])
+                        for before in names if before in required[name]]
+                    parents = [
+                        item for before in names if before in required[name]
+                        for item in results[before][2]]
+                    paths = copy_paths(self.paths)
+                    for before in names:
+                        if before in required[name]:
+                            apply_layer(results[before][1], None, paths)
+                    future = executor.submit(
+                        self._run_module_layer, name, show_error, layers,
+                        parents, paths)
+                    running[future] = name
+                done, pending = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[running.pop(future)] = future.result()
+
+        for name in names:
+            apply_layer(results[name][1], None, self.paths)
+        steps = self.get_steps(additional_modules)[len(modules):]
+        if layered:
+            init, self.settings = self.settings, LayeredDict()
+            self.settings._set_layers([('init', init)] + [
+                (name, results[name][0]) for name in names])
+            for name in names:
+                append_parents(self.settings, results[name][2])
+            for name, show_error in steps:
+                with self.settings.layer(name):
+                    self.run_step(name, show_error)
+        else:
+            for name in names:
+                merge_layer(self.settings, results[name][0])
+            for name in names:
+                append_parents(self.settings, results[name][2])
+            for name, show_error in steps:
+                self.run_step(name, show_error)
+        return self.settings, self.paths
+
+    def get_snapshot_key(self, settings, additional_modules):
+        """Make key of the snapshot from the settings modules files and
+        the default settings."""
+        modulenames = ['default'] + [
+            module_name for module_name, show_error in additional_modules]
+        filenames = [
+            find_module_file('.'.join(
+                [self.main_modulepath, self.settings_modulepath, name]))
+            for name in modulenames]
+        filenames.extend(filename for filename, format, required in self.files)
+        return make_key(
+            filenames,
+            self.main_modulepath,
+            self.settings_modulepath,
+            modulenames,
+            self.settings_class.__module__,
+            self.settings_class.__qualname__,
+            repr(settings))
+
+    def _make_settings_with_snapshot(
+        self, snapshot, settings, additional_modules,
+    ):
+        key = self.get_snapshot_key(settings, additional_modules)
+        data = read_snapshot(snapshot, key, self.settings_class)
+        if data:
+            self.settings, self.paths = data
+        else:
+            env, self.env = self.env, EnvBindings()
+            try:
+                self.make_settings(settings, additional_modules)
+            finally:
+                self.env = env
+            try:
+                write_snapshot(snapshot, key, self.settings, self.paths)
+            except SnapshotError as error:
+                log.warning(error.message)
+        if self.env:
+            self.apply_env()
+        return self.settings, self.paths
+
+    def load_key(self, key):
+        """Run pending modules up to the last one which can set the key."""
+        if self._running or not self._pending:
+            return
+        count = 0
+        for index, (module_name, show_error) in enumerate(self._pending):
+            keys = self.manifests.get(module_name)
+            if keys is None or key in keys:
+                count = index + 1
+        if count:
+            self._run_pending(count)
+
+    def load_all(self):
+        """Run all pending modules."""
+        if not self._running and self._pending:
+            self._run_pending(len(self._pending))
+
+    def _run_pending(self, count):
+        modules = self._pending[:count]
+        del self._pending[:count]
+        self._running = True
+        try:
+            for name, show_error in modules:
+                self.run_step(name, show_error)
+        finally:
+            self._running = False
+        if not self._pending:
+            self.settings.__class__ = self.settings_class
+            self.paths.__class__ = Paths
+
+
+def merge_layer(settings, layer):
+    """Set raw values and morf methods of the layer in the settings,
+    merging nested dicts."""
+    for key in layer.keys():
+        value = layer._raw_get(key)
+        if isinstance(value, MorfDict):
+            current = dict.get(settings, key)
+            if isinstance(current, MorfDict):
+                merge_layer(current, value)
+                continue
+            value = copy_settings(value)
+        settings[key] = value
+    for key, morf in layer._morf.items():
+        settings.set_morf(key, morf)
+
+
+def _walk_views(settings):
+    """Yield keys and nodes of the LayeredDict and of its nested dicts."""
+    stack = [((), settings)]
+    while stack:
+        keys, node = stack.pop()
+        yield keys, node
+        for key in list(node.keys()):
+            value = dict.get(node, key)
+            if isinstance(value, LayeredDict) and value._container is node:
+                stack.append((keys + (key,), value))
+
+
+def find_parents(settings):
+    """Find parents of the LayeredDict and of its nested dicts, other than
+    the dicts which contain them. Return list of (keys, parent, parent_keys),
+    where keys lead to the dict which has the parent. Parent which is one of
+    the nested dicts is given by its keys (parent_keys) instead, because it
+    is made again in other settings."""
+    nodes = {id(node): keys for keys, node in _walk_views(settings)}
+    found = []
+    for keys, node in _walk_views(settings):
+        for parent in node._parents:
+            if parent is node._container:
+                continue
+            parent_keys = nodes.get(id(parent))
+            found.append((
+                keys, None if parent_keys is not None else parent,
+                parent_keys))
+    return found
+
+
+def _get_node(settings, keys):
+    for key in keys:
+        settings = dict.get(settings, key)
+        if not isinstance(settings, MorfDict):
+            return None
+    return settings
+
+
+def append_parents(settings, parents):
+    """Append the parents found by find_parents to the settings."""
+    for keys, parent, parent_keys in parents:
+        node = _get_node(settings, keys)
+        if parent_keys is not None:
+            parent = _get_node(settings, parent_keys)
+        if node is not None and parent is not None:
+            node.append_parent(parent)
+
+
+def has_observers(settings):
+    return any(node._observers for keys, node in _walk_views(settings))
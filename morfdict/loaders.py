@@ -0,0 +1,162 @@
+import json
+import os
+import re
+from configparser import ConfigParser
+from copy import deepcopy
+
+from morfdict.models import MorfDict
+from morfdict.models import StringDict
+from morfdict.template import Template
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+ENV_LINE = re.compile(
+    r'^\s*(?:export\s+)?([A-Za-z_][A-Za-z0-9_.]*)\s*=\s*(.*?)\s*$')
+ENV_ESCAPES = {'n': '\n', '"': '"', '\\': '\\'}
+
+
+class LoaderError(Exception):
+
+    def __init__(self, message):
+        self.message = message
+        super().__init__(message)
+
+
+def parse_json(stream):
+    return json.load(stream)
+
+
+def parse_toml(stream):
+    if tomllib is None:
+        raise LoaderError('Reading TOML files needs Python 3.11 or tomli')
+    return tomllib.loads(stream.read())
+
+
+def parse_ini(stream):
+    """Sections are nested dicts and keys of the DEFAULT section are top
+    level keys, so sections inherit them like in ConfigParser. Values are
+    not interpolated by ConfigParser, because StringDict will do it."""
+    parser = ConfigParser(interpolation=None, default_section='')
+    parser.optionxform = str
+    parser.read_file(stream)
+    data = {}
+    for section in parser.sections():
+        values = dict(parser.items(section, raw=True))
+        if section == 'DEFAULT':
+            data.update(values)
+        else:
+            data[section] = values
+    return data
+
+
+def _unquote_env(value):
+    if len(value) > 1 and value[0] == value[-1] == "'":
+        return value[1:-1]
+    if len(value) > 1 and value[0] == value[-1] == '"':
+        return re.sub(
+            r'\\(.)',
+            lambda match: ENV_ESCAPES.get(match.group(1), match.group(0)),
+            value[1:-1])
+    return value
+
+
+def parse_env(stream):
+    """Read KEY=value lines, like the ones written by
+    morfdict.export.write_env. Values are strings."""
+    data = {}
+    for number, line in enumerate(stream, 1):
+        if not line.strip() or line.lstrip().startswith('#'):
+            continue
+        match = ENV_LINE.match(line)
+        if match is None:
+            raise LoaderError('Invalid line {0} of env file: {1!r}'.format(
+                number, line))
+        data[match.group(1)] = _unquote_env(match.group(2))
+    return data
+
+
+PARSERS = {
+    'json': parse_json,
+    'toml': parse_toml,
+    'ini': parse_ini,
+    'cfg': parse_ini,
+    'env': parse_env,
+}
+
+# filename -> ((modification time, size), format, parsed data)
+_cache = {}
+
+
+def get_format(filename):
+    """Get format name from the file extension ('.env' files included)."""
+    name = os.path.basename(filename)
+    extension = name.rsplit('.', 1)[-1].lower()
+    if extension not in PARSERS:
+        raise LoaderError('Unknown format of "{0}"'.format(filename))
+    return extension
+
+
+def read_file(filename, format=None):
+    """Parse the file. Parsed data is kept until the file changes, so it
+    must not be changed."""
+    filename = os.path.abspath(filename)
+    stat = os.stat(filename)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cached = _cache.get(filename)
+    if cached is not None and cached[0] == stamp and cached[1] == format:
+        return cached[2]
+    parse = PARSERS[format or get_format(filename)]
+    with open(filename, encoding='utf8') as stream:
+        data = parse(stream)
+    if not isinstance(data, dict):
+        raise LoaderError('"{0}" does not contain a dict'.format(filename))
+    _cache[filename] = (stamp, format, data)
+    return data
+
+
+def build_settings(data, settings_class=StringDict):
+    """Make settings_class tree from nested dicts at once, without setting
+    the keys one by one."""
+    settings = settings_class()
+    templates = issubclass(settings_class, StringDict)
+    values = {}
+    for key, value in data.items():
+        if type(value) is dict:
+            value = build_settings(value, settings_class)
+            value._add_parent(settings)
+        elif templates and type(value) is str and '%' in value:
+            value = Template(value)
+        elif type(value) is list:
+            # parsed data is cached, so the settings get their own copy
+            value = deepcopy(value)
+        values[key] = value
+    dict.update(settings, values)
+    return settings
+
+
+def load_data(settings, data, settings_class=StringDict):
+    """Set values from nested dicts in the settings, merging nested dicts
+    which already are in the settings. New nested dicts are built at once
+    (as settings_class objects) and set with one key."""
+    for key, value in data.items():
+        if type(value) is dict:
+            current = dict.get(settings, key)
+            if isinstance(current, MorfDict):
+                load_data(current, value, settings_class)
+                continue
+            value = build_settings(value, settings_class)
+        elif type(value) is list:
+            value = deepcopy(value)
+        settings[key] = value
+
+
+def load_file(settings, filename, format=None, settings_class=StringDict):
+    """Read the file (see read_file) and set its values in the settings.
+    Format is taken from the file extension, unless given."""
+    load_data(settings, read_file(filename, format), settings_class)
@@ -1,7 +1,15 @@
+from contextlib import contextmanager
+from copyreg import __newobj__
 from importlib import import_module
 from os import environ
 from os import path
 from os import sep
+from threading import local
+from weakref import WeakValueDictionary
+
+from morfdict.resolver import Resolver
+from morfdict.template import Template
+from morfdict.template import find_references
 
 
 class EnvirontmentValueMissing(Exception):
@@ -10,9 +18,25 @@ class EnvirontmentValueMissing(Exception):
         self.message = message or 'Environtment "{0}" value missing'.format(name)
 
 
+class LayerError(Exception):
+
+    def __init__(self, message):
+        self.message = message
+        super().__init__(message)
+
+
+class FrozenDictError(TypeError):
+
+    def __init__(self, message=None):
+        self.message = message or 'FrozenDict can not be changed'
+        super().__init__(self.message)
+
+
 class PathElement(object):
+    __slots__ = ('name', '_value', 'parent', 'is_root', 'paths')
     TAB = '    '
     FORMAT = '{0}{1}:{2}'
+    cacheable = True
 
     def __init__(self, name, value, parent=None, is_root=False, paths=None):
         self.name = name
@@ -25,8 +49,11 @@ class PathElement(object):
     def value(self):
         return self._value
 
-    def format_line(self):
-        tabs = self._format_tabs()
+    def format_line(self, depth=None):
+        if depth is None:
+            tabs = self._format_tabs()
+        else:
+            tabs = self.TAB * depth
         return self.FORMAT.format(
             tabs,
             '/' + self.value[0] if self.is_root else self.value[0],
@@ -43,12 +70,18 @@ class PathElement(object):
             return [self] + self.paths.paths[self.parent]._get_parents()
 
     def get_childs(self):
-        for element in self.paths.paths.values():
-            if element.parent == self.name:
-                yield element
+        return iter(list(self.paths._children.get(self.name, {}).values()))
 
 
 class PathGeneratorElement(PathElement):
+    __slots__ = ('cacheable',)
+
+    def __init__(
+        self, name, value, parent=None, is_root=False, paths=None,
+        cacheable=False,
+    ):
+        super().__init__(name, value, parent, is_root, paths)
+        self.cacheable = cacheable
 
     @property
     def value(self):
@@ -59,7 +92,211 @@ class NoDefault:
     pass
 
 
-class MorfDict(dict):
+class Change(object):
+    """Change of a raw value (or a morf method, if morf is true).
+
+    - kind: 'added', 'removed' or 'changed'
+    - path: tuple of keys, from the observed object to the changed key
+    - old, new: values before and after, NoDefault if there was none
+    """
+    __slots__ = ('kind', 'path', 'old', 'new', 'morf')
+    ADDED = 'added'
+    REMOVED = 'removed'
+    CHANGED = 'changed'
+
+    def __init__(self, kind, path, old, new, morf=False):
+        self.kind = kind
+        self.path = path
+        self.old = old
+        self.new = new
+        self.morf = morf
+
+    @classmethod
+    def make(cls, path, old, new, morf=False):
+        if old is NoDefault:
+            kind = cls.ADDED
+        elif new is NoDefault:
+            kind = cls.REMOVED
+        else:
+            kind = cls.CHANGED
+        return cls(kind, path, old, new, morf)
+
+    def __repr__(self):
+        return 'Change({0}, {1!r}{2})'.format(
+            self.kind, '.'.join(str(key) for key in self.path),
+            ', morf' if self.morf else '')
+
+
+# split string paths, cleared when it gets too big
+_split_paths = {}
+_SPLIT_PATHS_SIZE = 1024
+
+
+def split_path(path):
+    """Split path like 'db.host' into keys. Tuples and lists are keys
+    already."""
+    if isinstance(path, str):
+        keys = _split_paths.get(path)
+        if keys is None:
+            if len(_split_paths) >= _SPLIT_PATHS_SIZE:
+                _split_paths.clear()
+            keys = _split_paths[path] = tuple(path.split('.'))
+        return keys
+    return tuple(path)
+
+
+class Accessor(object):
+    """Reader of one nested key. The path is split once, so it can be made
+    once (for example at import time) and called in loops.
+
+    The nested dict which has the key is kept until one of the keys on the
+    way to it is changed (the MorfDicts tell the accessor like they tell
+    their children, see MorfDict._key_changed). It is not kept when one of
+    the nested dicts is morfed or read from a parent.
+
+    >> db_host = settings.accessor('db.host')
+    >> db_host()
+    'localhost'
+    """
+    __slots__ = (
+        'settings', 'parents', 'key', 'default', '_node', '__weakref__')
+
+    def __init__(self, settings, path, default=None):
+        keys = split_path(path)
+        self.settings = settings
+        self.parents = keys[:-1]
+        self.key = keys[-1]
+        self.default = default
+        self._node = None
+
+    def __call__(self):
+        node = self._node
+        if node is None:
+            node = self._find()
+            if node is None:
+                return self.default
+        return node._get_value(self.key, self.default)
+
+    def _find(self):
+        node = self.settings
+        cacheable = True
+        for key in self.parents:
+            if cacheable and isinstance(node, MorfDict):
+                node._add_reader(key, self)
+            child = node._get_child(key)
+            if child is None:
+                return None
+            cacheable = cacheable and (
+                isinstance(node, FrozenDict)
+                or dict.get(node, key) is child and key not in node._morf)
+            node = child
+        if cacheable:
+            self._node = node
+        return node
+
+    # called by MorfDict._key_changed and MorfDict._parents_changed
+
+    def _forget(self, keys):
+        self._node = None
+        return keys
+
+    def _forget_all(self):
+        self._node = None
+
+    def _pop_readers(self, keys=None):
+        return []
+
+
+class NestedAccess(object):
+    """Reading nested keys by paths. Intermediate dicts are found by plain
+    dict lookups (unless they have a morf method) and missing keys are
+    checked before reading, so misses do not raise exceptions."""
+    __slots__ = ()
+
+    def _walk(self, keys):
+        """Get nested dict by keys, or None."""
+        node = self
+        for key in keys:
+            node = node._get_child(key)
+            if node is None:
+                return None
+        return node
+
+    def get_path(self, path, default=None):
+        """Get value of nested key, by path like 'db.host' or tuple of
+        keys. Return default if any of the keys is missing."""
+        keys = split_path(path)
+        node = self._walk(keys[:-1])
+        if node is None:
+            return default
+        return node._get_value(keys[-1], default)
+
+    def get_many(self, paths, default=None):
+        """Get list of values of nested keys. Every nested dict is found
+        once."""
+        nodes = {(): self}
+        values = []
+        for name in paths:
+            keys = split_path(name)
+            parents = keys[:-1]
+            node = nodes.get(parents, NoDefault)
+            if node is NoDefault:
+                node = nodes[parents] = self._walk(parents)
+            if node is None:
+                values.append(default)
+            else:
+                values.append(node._get_value(keys[-1], default))
+        return values
+
+    def accessor(self, path, default=None):
+        """Make Accessor of nested key."""
+        return Accessor(self, path, default)
+
+
+class EmptyTable(dict):
+    """Read only empty dict. Copies and pickles of it are the same object.
+    """
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('Shared empty table can not be changed')
+
+    __setitem__ = _readonly
+    __delitem__ = _readonly
+    __ior__ = _readonly
+    clear = _readonly
+    pop = _readonly
+    popitem = _readonly
+    setdefault = _readonly
+    update = _readonly
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return 'EMPTY'
+
+
+# Shared by all objects until the first write, to keep them small.
+EMPTY = EmptyTable()
+NO_PARENTS = ()
+
+
+class MorfDict(NestedAccess, dict):
+    __slots__ = (
+        '_morf', '_parents', '_children', '_owners', '_readers',
+        '_observers', '__weakref__')
+    # true if the objects keep morfed values, which _forget has to drop
+    memoizes = False
+    # true if Template values can be stored (see StringDict)
+    templates = False
+    # indexes which are not pickled, but made again from the parents
+    _rebuilt = {
+        '_children': None, '_owners': EMPTY, '_readers': EMPTY,
+        '_observers': None}
 
     def __init__(self, data={}, morf=None):
         """
@@ -67,34 +304,211 @@ class MorfDict(dict):
         :param morf: dict of morf methods
         """
         super(MorfDict, self).__init__()
-        self._morf = morf or {}
-        self._parents = []
+        self._morf = morf or EMPTY
+        self._parents = NO_PARENTS
+        self._children = None
+        self._owners = EMPTY
+        self._readers = EMPTY
+        self._observers = None
 
         for name, value in data.items():
             self[name] = value
 
     def __getitem__(self, key):
         value = self._get_from_self_or_parent(key)
-        method = self._morf.get(key, self._default_morf)
+        method = self._morf.get(key)
+        if method is None:
+            return self._default_morf(self, value)
+        if type(value) is Template:
+            # compiled templates are an implementation detail of StringDict
+            value = str(value)
         return method(self, value)
 
     def _raw_get(self, key):
         return super().__getitem__(key)
 
+    def __reduce_ex__(self, protocol):
+        slots = {}
+        for cls in type(self).__mro__:
+            for name in cls.__dict__.get('__slots__', ()):
+                if name not in self._rebuilt and hasattr(self, name):
+                    slots[name] = getattr(self, name)
+        slots.pop('__weakref__', None)
+        return (__newobj__, (type(self),), (dict(dict.items(self)), slots))
+
+    def __setstate__(self, state):
+        data, slots = state
+        dict.update(self, data)
+        for name, value in self._rebuilt.items():
+            # a child restored before this object has already registered
+            if not hasattr(self, name):
+                setattr(self, name, value)
+        for name, value in slots.items():
+            setattr(self, name, value)
+        parents = self._parents
+        self._parents = NO_PARENTS
+        for parent in parents:
+            self._add_parent(parent)
+
     def _get_from_self_or_parent(self, key):
-        for obj in [super(MorfDict, self)] + self._parents:
+        value = dict.get(self, key, NoDefault)
+        if value is not NoDefault:
+            return value
+        owner = self._owner(key)
+        if owner is None:
+            raise KeyError(key)
+        try:
+            return owner[key]
+        except KeyError:
+            return self._get_from_parents_after(owner, key)
+
+    def _owner(self, key, seen=None):
+        """Get first parent which can provide the key. Result is kept in the
+        _owners index until the key or the parents change."""
+        owner = self._owners.get(key, NoDefault)
+        if owner is NoDefault:
+            # objects already searched are skipped, so cyclic parents will
+            # not search forever. Nothing is stored before the search ends,
+            # because other threads can read the index meanwhile.
+            seen = set() if seen is None else seen
+            seen.add(id(self))
+            owner = self._find_owner(key, seen)
+            for parent in self._parents:
+                if isinstance(parent, MorfDict):
+                    parent._add_reader(key, self)
+            if None in seen:
+                # a parent which is not a MorfDict did not have the key, and
+                # it will not tell when it gets one
+                return owner
+            if self._owners is EMPTY:
+                self._owners = {}
+            self._owners[key] = owner
+        return owner
+
+    def _add_reader(self, key, child):
+        """Remember that the child (or an Accessor) has found the key
+        through this object, so it is told when the key changes here."""
+        if self._readers is EMPTY:
+            self._readers = {}
+        self._readers.setdefault(key, set()).add(id(child))
+        if isinstance(child, Accessor):
+            if self._children is None:
+                self._children = WeakValueDictionary()
+            self._children[id(child)] = child
+
+    def _find_owner(self, key, seen):
+        for parent in self._parents:
+            if isinstance(parent, MorfDict):
+                if id(parent) not in seen and parent._has_key(key, seen):
+                    return parent
+            elif key in parent:
+                return parent
+            else:
+                seen.add(None)
+        return None
+
+    def _has_key(self, key, seen=None):
+        return (
+            dict.__contains__(self, key)
+            or self._owner(key, seen) is not None)
+
+    def _get_from_parents_after(self, owner, key):
+        """Morfing the value in the owner failed, so try the next parents
+        the same way as the key would not be found in the owner."""
+        index = [id(parent) for parent in self._parents].index(id(owner))
+        for obj in self._parents[index + 1:]:
             try:
                 return obj.__getitem__(key)
             except KeyError:
                 continue
         raise KeyError(key)
 
-    def append_parent(self, parent, key=None):
-        """Add parent to this object."""
+    def _add_parent(self, parent):
+        if parent is self or any(obj is parent for obj in self._parents):
+            return False
+        if self._parents is NO_PARENTS:
+            self._parents = []
         self._parents.append(parent)
+        if isinstance(parent, MorfDict):
+            # the parent can still be restored from a pickle
+            if getattr(parent, '_children', None) is None:
+                parent._children = WeakValueDictionary()
+            parent._children[id(self)] = self
+        return True
+
+    def append_parent(self, parent, key=None):
+        """Add parent to this object. Parent which was already added is not
+        added for the second time."""
+        if self._add_parent(parent):
+            self._parents_changed()
         if key:
             parent[key] = self
 
+    def _pop_readers(self, keys=None):
+        """Get the children which found the keys (or any key) through this
+        object. They are forgotten, because they will find the keys again.
+        """
+        readers = self._readers
+        if not readers:
+            return []
+        if keys is None:
+            ids = set().union(*readers.values())
+            self._readers = EMPTY
+        else:
+            ids = set()
+            for key in keys:
+                ids.update(readers.pop(key, ()))
+        children = self._children or {}
+        return [
+            child for child in map(children.get, ids) if child is not None]
+
+    def _key_changed(self, key):
+        """Tell this object and the descendants which found the key through
+        it that the key changed. Descendants which never read the key are
+        not visited, so setting keys does not get slower with the size of
+        the tree.
+
+        Keys which the descendants computed from the key are reported
+        further down, because children read morfed values from parents.
+        """
+        if not (self._owners or self._readers or self.memoizes):
+            return
+        keys = {key}
+        stack = [self]
+        seen = {}
+        while stack:
+            obj = stack.pop()
+            if seen.get(id(obj)) == len(keys):
+                continue
+            keys |= obj._forget(keys)
+            seen[id(obj)] = len(keys)
+            stack.extend(obj._pop_readers(keys))
+
+    def _parents_changed(self):
+        """Tell this object and the descendants which found any key through
+        it that the parents changed."""
+        seen = set()
+        stack = [self]
+        while stack:
+            obj = stack.pop()
+            if id(obj) in seen:
+                continue
+            seen.add(id(obj))
+            obj._forget_all()
+            stack.extend(obj._pop_readers())
+
+    def _forget(self, keys):
+        """Drop everything computed for the keys. Return all dropped keys."""
+        if self._owners:
+            for key in keys:
+                self._owners.pop(key, None)
+        return keys
+
+    def _forget_all(self):
+        """Drop everything computed for all keys."""
+        if self._owners:
+            self._owners.clear()
+
     def _default_morf(self, obj, value):
         return value
 
@@ -113,25 +527,153 @@ class MorfDict(dict):
 
         value = convert_dict_to_morfdict_if_avalible(value)
         append_parent_if_avalible(value)
-        return make_set(key, value)
+        if type(value) is Template and not self.templates:
+            value = str(value)
+        old = dict.get(self, key, NoDefault) if self._observers else None
+        make_set(key, value)
+        self._key_changed(key)
+        if self._observers and old is not value:
+            self._notify(key, old, value)
+
+    def __delitem__(self, key):
+        old = dict.get(self, key, NoDefault)
+        super().__delitem__(key)
+        self._key_changed(key)
+        if self._observers:
+            self._notify(key, old, NoDefault)
+
+    # dict methods which change keys without __setitem__ or __delitem__
+
+    def update(self, *args, **kwargs):
+        data = dict(*args, **kwargs)
+        if not self.templates:
+            for key, value in data.items():
+                if type(value) is Template:
+                    data[key] = str(value)
+        old = {
+            key: dict.get(self, key, NoDefault) for key in data
+        } if self._observers else None
+        super().update(data)
+        for key, value in data.items():
+            self._key_changed(key)
+            if self._observers and old[key] is not value:
+                self._notify(key, old[key], value)
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def setdefault(self, key, default=None):
+        if dict.__contains__(self, key):
+            return self._raw_get(key)
+        value = super().setdefault(key, default)
+        self._key_changed(key)
+        if self._observers:
+            self._notify(key, NoDefault, value)
+        return value
+
+    def pop(self, key, *args):
+        found = dict.__contains__(self, key)
+        value = super().pop(key, *args)
+        if found:
+            self._key_changed(key)
+            if self._observers:
+                self._notify(key, value, NoDefault)
+        return value
+
+    def popitem(self):
+        key, value = super().popitem()
+        self._key_changed(key)
+        if self._observers:
+            self._notify(key, value, NoDefault)
+        return key, value
+
+    def clear(self):
+        items = list(dict.items(self))
+        super().clear()
+        for key, value in items:
+            self._key_changed(key)
+            if self._observers:
+                self._notify(key, value, NoDefault)
 
     def set_morf(self, key, morf):
         """Set morf method for this key."""
+        if self._morf is EMPTY:
+            self._morf = {}
+        old = self._morf.get(key, NoDefault)
         self._morf[key] = morf
+        self._key_changed(key)
+        if self._observers and old is not morf:
+            self._notify(key, old, morf, True)
 
     def del_morf(self, key):
         """Delete morf method for this key."""
-        self._morf.pop(key)
+        if self._morf is EMPTY:
+            raise KeyError(key)
+        old = self._morf.pop(key)
+        self._key_changed(key)
+        if self._observers:
+            self._notify(key, old, NoDefault, True)
+
+    def add_observer(self, callback):
+        """Call callback(change) with a Change after every change of a raw
+        value or a morf method of this object. Nested dicts have their own
+        observers (see morfdict.diff.TreeObserver)."""
+        if self._observers is None:
+            self._observers = []
+        self._observers.append(callback)
+
+    def remove_observer(self, callback):
+        self._observers.remove(callback)
+
+    def _notify(self, key, old, new, morf=False):
+        change = Change.make((key,), old, new, morf)
+        for callback in list(self._observers):
+            callback(change)
 
     def get_morf(self, key):
         """Get morf method for this key."""
         return self._morf[key]
 
+    # morfdict.aio is imported only when used, to keep asyncio away from
+    # the startup of programs which do not need it.
+
+    def set_async_morf(
+        self, key, morf, blocking=False, cache=False, timeout=None,
+    ):
+        """Set awaitable morf method for this key. See AsyncMorf."""
+        from morfdict.aio import AsyncMorf
+        self.set_morf(key, AsyncMorf(morf, blocking, cache, timeout))
+
+    async def aget(self, key, executor=None):
+        """Get value of the key, awaiting async morfs concurrently."""
+        from morfdict.aio import aget
+        return await aget(self, key, executor)
+
+    async def ato_dict(self, executor=None):
+        """Create simple dict object from this object, awaiting all async
+        morfs concurrently."""
+        from morfdict.aio import ato_dict
+        return await ato_dict(self, executor)
+
+    def _get_templates(self):
+        """Get keys and raw values of the keys which are only interpolated
+        on morf."""
+        return ()
+
+    def _has_templates(self):
+        return False
+
     def to_dict(self):
         """Create simple dict object from this object."""
+        keys = list(self)
+        # values are read one by one, unless templates need to be sorted
+        get = self.__getitem__
+        if self._has_templates():
+            get = Resolver(self).resolve().get
         data = {}
-        for key in list(self):
-            value = self[key]
+        for key in keys:
+            value = get(key)
             if isinstance(value, MorfDict):
                 value = value.to_dict()
             data[key] = value
@@ -146,6 +688,35 @@ class MorfDict(dict):
             else:
                 raise
 
+    def _get_value(self, key, default):
+        """Like get, but check if the key can be found first."""
+        if not dict.__contains__(self, key) and self._owner(key) is None:
+            return default
+        return self.get(key, default)
+
+    def _get_child(self, key):
+        value = dict.get(self, key, NoDefault)
+        if isinstance(value, MorfDict) and key not in self._morf:
+            return value
+        value = self._get_value(key, None)
+        return value if isinstance(value, MorfDict) else None
+
+    def _walk(self, keys):
+        # the first key goes through _get_child (lazy settings hook it), the
+        # dicts below are checked inline like in _get_child
+        if not keys:
+            return self
+        node = self._get_child(keys[0])
+        for key in keys[1:]:
+            if node is None:
+                return None
+            value = dict.get(node, key)
+            if isinstance(value, MorfDict) and key not in node._morf:
+                node = value
+            else:
+                node = node._get_child(key)
+        return node
+
     def items(self):
         for key in self.keys():
             try:
@@ -163,19 +734,112 @@ class MorfDict(dict):
                     self[key] = value
             else:
                 self[key] = value
-        self._parents += data._parents
+        for parent in data._parents:
+            self._add_parent(parent)
+        self._parents_changed()
 
     def get_errors(self):
+        resolver = Resolver(self).resolve()
         errors = []
         for key in list(self):
             try:
-                value = self[key]
+                value = resolver.get(key)
                 if isinstance(value, MorfDict):
                     value = value.to_dict()
             except Exception as error:
                 errors.append(error)
         return errors
 
+    def freeze(self):
+        """Resolve all values once and return them as a read only FrozenDict.
+        Nested MorfDicts are frozen as well, and so are the parents, which
+        the FrozenDicts link to for the inherited keys. Keys of the parents
+        (outside of this tree) which can not be read are skipped."""
+        tree = {id(self)}
+        stack = [self]
+        while stack:
+            for value in dict.values(stack.pop()):
+                if isinstance(value, MorfDict) and id(value) not in tree:
+                    tree.add(id(value))
+                    stack.append(value)
+
+        frozen = {}
+        nodes = []
+
+        def convert(value):
+            if not isinstance(value, MorfDict):
+                return value
+            if id(value) not in frozen:
+                frozen[id(value)] = FrozenDict()
+                nodes.append(value)
+            return frozen[id(value)]
+
+        result = convert(self)
+        for node in nodes:
+            node._freeze_into(frozen[id(node)], convert, id(node) in tree)
+        return result
+
+    def _freeze_into(self, result, convert, strict):
+        for key in list(self):
+            try:
+                value = self[key]
+            except Exception:
+                if strict:
+                    raise
+                continue
+            dict.__setitem__(result, key, convert(value))
+        result._parents = [
+            convert(parent) for parent in self._parents
+            if isinstance(parent, MorfDict)]
+
+        # keys which the parents do not give the same way: the ones with a
+        # morf method set here and the ones read from parents which are not
+        # MorfDicts
+        keys = [
+            key for key in self._morf if not dict.__contains__(self, key)]
+        for parent in self._parents:
+            if not isinstance(parent, MorfDict):
+                keys.extend(key for key in parent if key not in self)
+        for key in keys:
+            owner = self._owner(key)
+            if owner is None or (
+                isinstance(owner, MorfDict) and key not in self._morf
+            ):
+                continue
+            try:
+                value = self[key]
+            except Exception:
+                # like to_dict, inherited keys which can not be read are
+                # not an error
+                continue
+            if result._inherited is EMPTY:
+                result._inherited = {}
+            result._inherited[key] = convert(value)
+
+    def _copy_tree(self):
+        """Copy this object and all the nested MorfDicts. Parents which are
+        in the tree are replaced by their copies, other parents are shared.
+        Computed values are not copied."""
+        nodes = [self]
+        copies = {id(self): type(self)()}
+        for node in nodes:
+            for value in dict.values(node):
+                if isinstance(value, MorfDict) and id(value) not in copies:
+                    copies[id(value)] = type(value)()
+                    nodes.append(value)
+
+        for node in nodes:
+            copy = copies[id(node)]
+            if node._morf:
+                copy._morf = dict(node._morf)
+            for key, value in dict.items(node):
+                if isinstance(value, MorfDict):
+                    value = copies[id(value)]
+                dict.__setitem__(copy, key, value)
+            for parent in node._parents:
+                copy._add_parent(copies.get(id(parent), parent))
+        return copies[id(self)]
+
     def get_from_env(self, name, default=NotImplemented, error=None):
         """
         Get setting fro environtment.
@@ -195,25 +859,463 @@ class MorfDict(dict):
                 raise EnvirontmentValueMissing(name, error)
 
 
+class FrozenDict(NestedAccess, dict):
+    """Read only snapshot of a MorfDict with all the values resolved.
+
+    Reading a key is a plain dict lookup. Keys which the MorfDict could read
+    from its parents are found in the frozen parents, but like in the
+    MorfDict they are not listed in keys, items or to_dict.
+    """
+
+    __slots__ = ('_inherited', '_parents')
+
+    def __init__(self):
+        super().__init__()
+        self._inherited = EMPTY
+        self._parents = NO_PARENTS
+
+    def __reduce__(self):
+        # values and links are restored with dict methods, because the
+        # object is read only; parents can link back to it, so they are
+        # set after the object is made
+        return (
+            FrozenDict, (), (dict(self), self._inherited, self._parents))
+
+    def __setstate__(self, state):
+        data, self._inherited, self._parents = state
+        dict.update(self, data)
+
+    def __missing__(self, key):
+        value = self._find(key)
+        if value is NoDefault:
+            raise KeyError(key)
+        return value
+
+    def _find(self, key):
+        """Find inherited value, searching the parents in the same order as
+        MorfDict does."""
+        value = self._inherited.get(key, NoDefault)
+        if value is not NoDefault or not self._parents:
+            return value
+        seen = {id(self)}
+        stack = list(reversed(self._parents))
+        while stack:
+            node = stack.pop()
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            value = dict.get(node, key, NoDefault)
+            if value is NoDefault:
+                value = node._inherited.get(key, NoDefault)
+            if value is not NoDefault:
+                return value
+            stack.extend(reversed(node._parents))
+        return NoDefault
+
+    def _readonly(self, *args, **kwargs):
+        raise FrozenDictError()
+
+    __setitem__ = _readonly
+    __delitem__ = _readonly
+    __ior__ = _readonly
+    clear = _readonly
+    pop = _readonly
+    popitem = _readonly
+    setdefault = _readonly
+    update = _readonly
+    merge = _readonly
+    append_parent = _readonly
+    set_morf = _readonly
+    del_morf = _readonly
+
+    def get(self, key, default=None):
+        value = dict.get(self, key, NoDefault)
+        if value is NoDefault:
+            value = self._find(key)
+            if value is NoDefault:
+                return default
+        return value
+
+    _get_value = get
+
+    def _get_child(self, key):
+        value = self.get(key)
+        return value if isinstance(value, FrozenDict) else None
+
+    def to_dict(self):
+        """Create simple dict object from this object."""
+        data = {}
+        for key, value in self.items():
+            if isinstance(value, FrozenDict):
+                value = value.to_dict()
+            data[key] = value
+        return data
+
+    def freeze(self):
+        return self
+
+    def get_errors(self):
+        return []
+
+
 class StringDict(MorfDict):
-    """Class which tries to interpolate itself on morf."""
+    """Class which tries to interpolate itself on morf.
+
+    Strings with placeholders are compiled into Template objects when set,
+    so they are not parsed again on every read. Strings without '%' are
+    returned as they are.
+    """
+    __slots__ = ()
+    templates = True
+
+    def __setitem__(self, key, value):
+        if type(value) is str and '%' in value:
+            value = Template(value)
+        super().__setitem__(key, value)
 
     def _default_morf(self, obj, value):
         if type(value) is str:
-            return value % self
+            if '%' in value:
+                return value % self
+            return value
+        elif type(value) is Template:
+            return value.render(self)
         else:
             return value
 
+    def _has_templates(self):
+        return Template in map(type, dict.values(self))
+
+    def _get_templates(self):
+        if type(self)._default_morf is not StringDict._default_morf:
+            return ()
+        morf = self._morf
+        return [
+            (key, value) for key, value in dict.items(self)
+            if (type(value) is str or type(value) is Template)
+            and key not in morf]
+
+    def get_references(self, key):
+        """Get names of the keys which the value of this key interpolates."""
+        value = self._get_from_self_or_parent(key)
+        if isinstance(value, str):
+            return find_references(value)
+        return []
+
+    def _forget(self, keys):
+        """Children read interpolated values, so the keys interpolating
+        the changed ones changed for them too. Keys made by other morf
+        methods are not followed."""
+        keys = super()._forget(keys)
+        if self.memoizes or not self._readers:
+            return keys
+        changed = set(keys)
+        templates = [
+            (key, value.references) for key, value in dict.items(self)
+            if type(value) is Template and key not in changed]
+        while templates:
+            found = [
+                key for key, references in templates
+                if not changed.isdisjoint(references)]
+            if not found:
+                break
+            changed.update(found)
+            templates = [item for item in templates if item[0] not in changed]
+        return changed
+
+
+class _Reading(local):
+    """Values being morfed by CachedStringDicts in this thread, as
+    (object, set of the keys read) from the outermost."""
+
+    def __init__(self):
+        self.frames = []
+
+
+_reading = _Reading()
+
+
+class CachedStringDict(StringDict):
+    """StringDict which memoizes morfed values.
+
+    Keys read while morfing a value are recorded, so changing one of them
+    drops only the values which depend on it. Morf methods are expected to
+    depend only on the values they read from this object.
+    """
+    __slots__ = ('_cache', '_dependants')
+    memoizes = True
+    _rebuilt = dict(StringDict._rebuilt, _cache=None, _dependants=None)
+
+    def __init__(self, data={}, morf=None):
+        self._cache = {}
+        self._dependants = {}
+        super().__init__(data, morf)
+
+    def __setstate__(self, state):
+        self._cache = {}
+        self._dependants = {}
+        super().__setstate__(state)
+
+    def __getitem__(self, key):
+        frames = _reading.frames
+        if frames:
+            # the stack is kept per thread, so concurrent reads of this
+            # object do not record keys for each other
+            for obj, dependencies in reversed(frames):
+                if obj is self:
+                    dependencies.add(key)
+                    break
+        value = self._cache.get(key, NoDefault)
+        if value is not NoDefault:
+            return value
+
+        dependencies = set()
+        frames.append((self, dependencies))
+        try:
+            value = super().__getitem__(key)
+        finally:
+            frames.pop()
+
+        for dependency in dependencies:
+            self._dependants.setdefault(dependency, set()).add(key)
+        self._cache[key] = value
+        return value
+
+    def _forget(self, keys):
+        super()._forget(keys)
+        forgotten = set(keys)
+        keys = list(keys)
+        while keys:
+            key = keys.pop()
+            self._cache.pop(key, None)
+            for dependant in self._dependants.pop(key, ()):
+                if dependant not in forgotten:
+                    forgotten.add(dependant)
+                    keys.append(dependant)
+        return forgotten
+
+    def _forget_all(self):
+        super()._forget_all()
+        self._cache.clear()
+        self._dependants.clear()
+
+
+class LayeredDict(StringDict):
+    """StringDict made of a stack of layers (StringDicts) instead of merged
+    copies of them.
+
+    Every key is read from the top layer which has it; nested dicts of the
+    layers are stacked the same way. Values of the top layers are kept in
+    this object (with the name of the layer in an index), so reading is as
+    fast as in StringDict, and adding, removing or swapping a layer costs as
+    much as the number of its keys.
+
+    Layers are not changed after they are added. Values set in this object
+    go to the layer opened with layer(), or to the 'runtime' layer which
+    is always on top.
+    """
+    __slots__ = ('_layers', '_index', '_container', '_key', '_writing')
+    RUNTIME = 'runtime'
+
+    def __init__(self, data={}, morf=None):
+        self._layers = []
+        self._index = {}
+        self._container = None
+        self._key = None
+        self._writing = None
+        super().__init__(data, morf)
+
+    def which_layer(self, key):
+        """Get name of the layer which provides value of the key. Raise
+        KeyError if no layer has the key."""
+        return self._index[key]
+
+    def layer_names(self):
+        return [name for name, layer in self._layers]
+
+    def get_layer(self, name):
+        return self._layers[self._find_layer(name)][1]
+
+    def _find_layer(self, name):
+        for index, (layer_name, layer) in enumerate(self._layers):
+            if layer_name == name:
+                return index
+        raise LayerError('There is no "{0}" layer'.format(name))
+
+    def push_layer(self, name, data):
+        """Add layer on top of the other layers (but below the runtime
+        layer)."""
+        assert self._container is None, 'Layers are set in the top object'
+        if name in self.layer_names():
+            raise LayerError('Layer "{0}" already exists'.format(name))
+        if not isinstance(data, MorfDict):
+            data = StringDict(data)
+        layers = list(self._layers)
+        index = len(layers)
+        if layers and layers[-1][0] == self.RUNTIME:
+            index -= 1
+        layers.insert(index, (name, data))
+        self._set_layers(layers)
+
+    def remove_layer(self, name):
+        layers = list(self._layers)
+        del layers[self._find_layer(name)]
+        self._set_layers(layers)
+
+    def swap_layer(self, name, data):
+        """Replace the layer with a new one, in the same place."""
+        if not isinstance(data, MorfDict):
+            data = StringDict(data)
+        layers = list(self._layers)
+        layers[self._find_layer(name)] = (name, data)
+        self._set_layers(layers)
+
+    @contextmanager
+    def layer(self, name):
+        """Add new layer, which gets the values set in this block."""
+        self.push_layer(name, {})
+        previous = self._writing
+        self._writing = name
+        try:
+            yield self
+        finally:
+            self._writing = previous
+
+    def _set_layers(self, layers):
+        """Use new list of layers and update the keys of the layers which
+        were added or removed."""
+        old = self._layers
+        self._layers = layers
+        old_ids = {id(layer) for name, layer in old}
+        new_ids = {id(layer) for name, layer in layers}
+        keys = {}
+        for name, layer in old + layers:
+            if (id(layer) in old_ids) != (id(layer) in new_ids):
+                keys.update(dict.fromkeys(layer.keys()))
+                keys.update(dict.fromkeys(layer._morf))
+        for key in keys:
+            self._resolve_key(key)
+
+    def _resolve_key(self, key):
+        """Set value and morf method of the key from the top layers."""
+        values = []
+        for name, layer in reversed(self._layers):
+            value = dict.get(layer, key, NoDefault)
+            if value is not NoDefault:
+                values.append((name, value))
+                if not isinstance(value, MorfDict):
+                    break
+
+        if not values:
+            self._index.pop(key, None)
+            if dict.__contains__(self, key):
+                MorfDict.__delitem__(self, key)
+        elif isinstance(values[0][1], MorfDict):
+            layers = [
+                item for item in reversed(values)
+                if isinstance(item[1], MorfDict)]
+            current = dict.get(self, key)
+            if isinstance(current, LayeredDict):
+                current._set_layers(layers)
+            else:
+                child = type(self)()
+                child._container = self
+                child._key = key
+                child._set_layers(layers)
+                MorfDict.__setitem__(self, key, child)
+            self._index[key] = values[0][0]
+        else:
+            if dict.get(self, key, NoDefault) is not values[0][1]:
+                MorfDict.__setitem__(self, key, values[0][1])
+            self._index[key] = values[0][0]
+
+        morf = NoDefault
+        for name, layer in reversed(self._layers):
+            morf = layer._morf.get(key, NoDefault)
+            if morf is not NoDefault:
+                break
+        if morf is not self._morf.get(key, NoDefault):
+            if morf is NoDefault:
+                MorfDict.del_morf(self, key)
+            else:
+                MorfDict.set_morf(self, key, morf)
+
+    def _writable_layer(self):
+        """Get node of the layer which gets the values set in this object,
+        creating missing nested dicts."""
+        if self._container is not None:
+            parent = self._container._writable_layer()
+            if not isinstance(dict.get(parent, self._key), MorfDict):
+                parent[self._key] = {}
+            return parent._raw_get(self._key)
+
+        name = self._writing or self.RUNTIME
+        for layer_name, layer in self._layers:
+            if layer_name == name:
+                return layer
+        layer = StringDict()
+        self._layers = self._layers + [(name, layer)]
+        return layer
+
+    def _refresh(self, key):
+        """Update the key after its layer was changed."""
+        chain = []
+        obj = self
+        while obj._container is not None:
+            chain.append((obj._container, obj._key))
+            obj = obj._container
+        for container, name in reversed(chain):
+            container._resolve_key(name)
+        self._resolve_key(key)
+
+    def __setitem__(self, key, value):
+        self._writable_layer()[key] = value
+        self._refresh(key)
+
+    def __delitem__(self, key):
+        layer = self._writable_layer()
+        if not dict.__contains__(layer, key):
+            if dict.__contains__(self, key):
+                raise LayerError(
+                    'Key "{0}" is set by the "{1}" layer'.format(
+                        key, self._index[key]))
+            raise KeyError(key)
+        del layer[key]
+        self._refresh(key)
+
+    def set_morf(self, key, morf):
+        self._writable_layer().set_morf(key, morf)
+        self._refresh(key)
+
+    def del_morf(self, key):
+        self._writable_layer().del_morf(key)
+        self._refresh(key)
+
+    def _copy_tree(self):
+        """Copy with the same layers. Only the runtime layer, which can be
+        changed, is copied."""
+        assert self._container is None
+        copy = type(self)()
+        copy._set_layers([
+            (name, layer._copy_tree() if name == self.RUNTIME else layer)
+            for name, layer in self._layers])
+        return copy
+
 
 class Paths(object):
 
     def __init__(self):
         self.paths = dict()
+        self._children = dict()
+        self._cache = dict()
 
     def get(self, name):
         """
         Get path by name.
         """
+        value = self._cache.get(name)
+        if value is not None:
+            return value
         element = self.paths[name]
         if element.parent:
             parent = self.get(element.parent)
@@ -221,7 +1323,12 @@ class Paths(object):
             parent = ''
         if element.is_root:
             parent = sep + parent
-        return path.join(parent, *element.value)
+        value = path.join(parent, *element.value)
+        if element.cacheable and (
+            not element.parent or element.parent in self._cache
+        ):
+            self._cache[name] = value
+        return value
 
     def set(self, name, value, parent=None, is_root=False):
         """
@@ -233,21 +1340,55 @@ class Paths(object):
         """
         if not isinstance(value, (list, tuple)):
             value = [value]
-        self.paths[name] = PathElement(name, value, parent, is_root, self)
+        self._add_element(PathElement(name, value, parent, is_root, self))
         return self.context(name)
 
+    def _add_element(self, element):
+        name = element.name
+        old = self.paths.get(name)
+        self.paths[name] = element
+
+        if old is not None and old.parent != element.parent:
+            self._children[old.parent or None].pop(name, None)
+        children = self._children.setdefault(element.parent or None, {})
+        children[name] = element
+        if old is not None and old.parent != element.parent:
+            # Keep children in the order in which the paths were first set.
+            self._children[element.parent or None] = {
+                key: self.paths[key] for key in self.paths
+                if key in children}
+
+        self._forget(name)
+
+    def _forget(self, name):
+        """Drop cached paths of the element and all of its descendants."""
+        names = [name]
+        seen = set(names)
+        while names:
+            name = names.pop()
+            self._cache.pop(name, None)
+            # a path can be its own ancestor by mistake
+            for child in self._children.get(name, ()):
+                if child not in seen:
+                    seen.add(child)
+                    names.append(child)
+
     def context(self, name):
         return PathsContext(self, name)
 
-    def set_generator(self, name, generator, parent=None, is_root=False):
+    def set_generator(
+        self, name, generator, parent=None, is_root=False, cacheable=False,
+    ):
         """
         Set path method generator.
             - name: normalized name of the path
             - generator: generation function which accepts this object as first
                 argument
+            - cacheable: if true, generated path is kept until this path or
+                one of its parents is set again
         """
-        self.paths[name] = PathGeneratorElement(
-            name, generator, parent, is_root, self)
+        self._add_element(PathGeneratorElement(
+            name, generator, parent, is_root, self, cacheable))
 
     def to_dict(self):
         """
@@ -274,14 +1415,13 @@ class Paths(object):
         """
         Show paths in form of a tree.
         """
-        def do_tree(data, element):
-            data.append(self.paths[element.name].format_line())
-            for child in element.get_childs():
-                do_tree(data, child)
+        def do_tree(data, element, depth):
+            data.append(element.format_line(depth))
+            for child in self._children.get(element.name, {}).values():
+                do_tree(data, child, depth + 1)
         data = []
-        for element in self.paths.values():
-            if not element.parent:
-                do_tree(data, element)
+        for element in self._children.get(None, {}).values():
+            do_tree(data, element, 0)
         return '\n'.join(data + [''])
 
     def get_errors(self):
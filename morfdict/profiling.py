@@ -0,0 +1,192 @@
+from time import perf_counter
+
+from morfdict.models import MorfDict
+
+
+class KeyStats(object):
+    """Read statistics of one key.
+
+    - reads: number of reads
+    - time: time spent in reads, including reads made by the morf
+    - lookup_time: part of the time spent on finding the raw value
+    - parent_hits: number of reads which found the value in a parent
+    - max_depth: the farthest parent in which the value was found
+    """
+    __slots__ = ('reads', 'time', 'lookup_time', 'parent_hits', 'max_depth')
+
+    def __init__(self):
+        self.reads = 0
+        self.time = 0.0
+        self.lookup_time = 0.0
+        self.parent_hits = 0
+        self.max_depth = 0
+
+    @property
+    def morf_time(self):
+        """Time spent in morf methods and interpolation."""
+        return self.time - self.lookup_time
+
+    def to_dict(self):
+        return {
+            'reads': self.reads,
+            'time': self.time,
+            'morf_time': self.morf_time,
+            'lookup_time': self.lookup_time,
+            'parent_hits': self.parent_hits,
+            'max_depth': self.max_depth,
+        }
+
+
+class ProfiledMorfDict(object):
+    """Mixin which records reads in the Profiler. Objects get this class
+    only while profiling, so reads are not slower when it is disabled."""
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        profiler = self._profiler
+        start = profiler.clock()
+        try:
+            return self._original.__getitem__(self, key)
+        finally:
+            profiler.record(self, key, profiler.clock() - start)
+
+    def _get_from_self_or_parent(self, key):
+        profiler = self._profiler
+        start = profiler.clock()
+        value = self._original._get_from_self_or_parent(self, key)
+        profiler.record_lookup(
+            self, key, profiler.clock() - start, self._parent_depth(key))
+        return value
+
+    def _parent_depth(self, key):
+        depth = 0
+        obj = self
+        while isinstance(obj, MorfDict) and not dict.__contains__(obj, key):
+            obj = obj._owners.get(key)
+            depth += 1
+        return depth
+
+    def __setitem__(self, key, value):
+        self._original.__setitem__(self, key, value)
+        value = dict.get(self, key)
+        if isinstance(value, MorfDict):
+            self._profiler.attach(value, self._profiler.join(self, key))
+
+
+class Profiler(object):
+    """Counts reads of every key in a MorfDict tree.
+
+    >> profiler = Profiler()
+    >> profiler.start(settings)
+    >> ...
+    >> profiler.stop()
+    >> profiler.report()
+
+    The hook, if given, is called after every read with the path of the
+    key (like 'db.host') and the time of the read.
+    """
+
+    def __init__(self, hook=None, clock=perf_counter):
+        self.hook = hook
+        self.clock = clock
+        self.stats = {}
+        self.paths = {}
+        self._nodes = {}
+        self._classes = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self, settings):
+        """Start profiling all the MorfDicts of the tree."""
+        self.attach(settings, '')
+        return self
+
+    def attach(self, settings, path):
+        stack = [(settings, path)]
+        while stack:
+            node, path = stack.pop()
+            if id(node) in self._nodes:
+                continue
+            self._nodes[id(node)] = node
+            self.paths[id(node)] = path
+            node.__class__ = self._profiled_class(type(node))
+            for key in node.keys():
+                value = dict.get(node, key)
+                if isinstance(value, MorfDict):
+                    stack.append((value, self._join(path, key)))
+
+    def stop(self):
+        """Give all the profiled objects their classes back."""
+        for node in self._nodes.values():
+            node.__class__ = node._original
+        self._nodes.clear()
+
+    def _profiled_class(self, cls):
+        if issubclass(cls, ProfiledMorfDict):
+            return cls
+        if cls not in self._classes:
+            self._classes[cls] = type(
+                'Profiled' + cls.__name__,
+                (ProfiledMorfDict, cls),
+                {'__slots__': (), '_profiler': self, '_original': cls})
+        return self._classes[cls]
+
+    def _join(self, path, key):
+        return '{0}.{1}'.format(path, key) if path else str(key)
+
+    def join(self, node, key):
+        return self._join(self.paths.get(id(node), '?'), key)
+
+    def _stats(self, node, key):
+        path = self.join(node, key)
+        stats = self.stats.get(path)
+        if stats is None:
+            stats = self.stats[path] = KeyStats()
+        return path, stats
+
+    def record(self, node, key, elapsed):
+        path, stats = self._stats(node, key)
+        stats.reads += 1
+        stats.time += elapsed
+        if self.hook:
+            self.hook(path, elapsed)
+
+    def record_lookup(self, node, key, elapsed, depth):
+        path, stats = self._stats(node, key)
+        stats.lookup_time += elapsed
+        if depth:
+            stats.parent_hits += 1
+            stats.max_depth = max(stats.max_depth, depth)
+
+    def report(self):
+        """Statistics of all read keys, the most read first."""
+        return [
+            dict(stats.to_dict(), key=path)
+            for path, stats in sorted(
+                self.stats.items(), key=lambda item: -item[1].reads)]
+
+    def hot_keys(self, count=10):
+        return [item['key'] for item in self.report()[:count]]
+
+    def dead_keys(self, settings):
+        """Keys of the tree which were never read."""
+        dead = []
+        stack = [(settings, '')]
+        seen = set()
+        while stack:
+            node, path = stack.pop()
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            for key in node.keys():
+                keypath = self._join(path, key)
+                if keypath not in self.stats:
+                    dead.append(keypath)
+                value = dict.get(node, key)
+                if isinstance(value, MorfDict):
+                    stack.append((value, keypath))
+        return sorted(dead)
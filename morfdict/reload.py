@@ -0,0 +1,321 @@
+import os
+import sys
+from importlib import invalidate_caches
+from importlib import reload
+from logging import getLogger
+from threading import Event
+from threading import RLock
+from threading import Thread
+
+from morfdict.diff import same_value
+from morfdict.diff import diff
+from morfdict.models import MorfDict
+from morfdict.models import NoDefault
+from morfdict.models import PathGeneratorElement
+from morfdict.models import PathElement
+from morfdict.models import Paths
+from morfdict.snapshot import find_module_file
+
+log = getLogger('morfdict')
+
+
+class Layer(object):
+    """Changes which one settings module made.
+
+    - values: list of (path, key, raw value) where path is a tuple of keys
+        of nested dicts, NoDefault value means the key was deleted
+    - morfs: list of (path, key, morf method) in the same form
+    - paths: list of path elements which the module set
+    """
+    __slots__ = ('values', 'morfs', 'paths')
+
+    def __init__(self, values=None, morfs=None, paths=None):
+        self.values = values or []
+        self.morfs = morfs or []
+        self.paths = paths or []
+
+    def __bool__(self):
+        return bool(self.values or self.morfs or self.paths)
+
+    def keys(self):
+        """Dotted names of the changed settings keys."""
+        return {
+            '.'.join(str(name) for name in path + (key,))
+            for path, key, value in self.values + self.morfs}
+
+
+def diff_settings(before, after, layer=None):
+    """Make Layer with the changes which turn raw values and morf methods
+    of before into the ones of after."""
+    layer = Layer() if layer is None else layer
+    for change in diff(before, after):
+        entry = (change.path[:-1], change.path[-1], change.new)
+        if change.morf:
+            layer.morfs.append(entry)
+        else:
+            layer.values.append(entry)
+    return layer
+
+
+def _same_element(old, new):
+    return (
+        type(old) is type(new)
+        and old.parent == new.parent
+        and old.is_root == new.is_root
+        and old.cacheable == new.cacheable
+        and same_value(old._value, new._value))
+
+
+def diff_paths(before, after, layer=None):
+    """Add path elements of after which are not in before to the Layer."""
+    layer = Layer() if layer is None else layer
+    for name, element in after.paths.items():
+        old = before.paths.get(name)
+        if old is None or not _same_element(old, element):
+            layer.paths.append(element)
+    return layer
+
+
+def copy_settings(settings):
+    """Copy MorfDict subtree without its parents."""
+    copy = type(settings)()
+    for key in settings.keys():
+        value = settings._raw_get(key)
+        if isinstance(value, MorfDict):
+            value = copy_settings(value)
+        copy[key] = value
+    if settings._morf:
+        copy._morf = dict(settings._morf)
+    return copy
+
+
+def copy_element(element, paths):
+    if isinstance(element, PathGeneratorElement):
+        return PathGeneratorElement(
+            element.name, element._value, element.parent, element.is_root,
+            paths, element.cacheable)
+    return PathElement(
+        element.name, element._value, element.parent, element.is_root, paths)
+
+
+def copy_paths(paths):
+    copy = Paths()
+    for element in paths.paths.values():
+        copy._add_element(copy_element(element, copy))
+    return copy
+
+
+def _get_node(settings, path):
+    for key in path:
+        if not isinstance(dict.get(settings, key), MorfDict):
+            settings[key] = {}
+        settings = settings._raw_get(key)
+    return settings
+
+
+def apply_layer(layer, settings, paths=None):
+    """Make the changes of the Layer in the settings and paths."""
+    for path, key, value in layer.values:
+        node = _get_node(settings, path)
+        if value is NoDefault:
+            if dict.__contains__(node, key):
+                del node[key]
+        else:
+            if isinstance(value, MorfDict):
+                value = copy_settings(value)
+            node[key] = value
+    for path, key, morf in layer.morfs:
+        node = _get_node(settings, path)
+        if morf is NoDefault:
+            if key in node._morf:
+                node.del_morf(key)
+        else:
+            node.set_morf(key, morf)
+    if paths is not None:
+        for element in layer.paths:
+            paths._add_element(copy_element(element, paths))
+
+
+class Reloader(object):
+    """Rebuild settings made by the Factory when a settings module changes.
+
+    Every module is remembered as a Layer of changes it made. When module
+    files change, only the changed modules are imported and run again, on
+    a copy of the settings made by the modules before them. Layers of the
+    other modules are applied without running them, so values which they
+    computed in Python (instead of interpolation or morf methods) from the
+    values of changed modules stay as they were.
+
+    The new settings are applied to the live settings only when all the
+    changed modules succeed. If the live settings are VersionedSettings,
+    all changes are published in one transaction. Paths are replaced at
+    once.
+
+    >> settings, paths = factory.make_settings(watch=True)
+    >> factory.reloader.subscribe(lambda keys, paths: print(keys))
+    >> factory.reloader.start(interval=1.0)
+    """
+
+    def __init__(self, factory, modules):
+        self.factory = factory
+        self.modules = [('default', True)] + list(modules)
+        self.settings = None
+        self.subscribers = []
+        self.stamps = {}
+        self._layers = []
+        self._result = None
+        self._failed = None
+        self._lock = RLock()
+        self._thread = None
+        self._stop = Event()
+
+    def subscribe(self, callback):
+        """Call callback(keys, paths) after every reload with the dotted
+        names of the changed settings keys and the names of changed paths.
+        Values interpolated from the changed keys change as well, but are
+        not listed."""
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self.subscribers.remove(callback)
+
+    def _modulepath(self, name):
+        factory = self.factory
+        return '.'.join(
+            [factory.main_modulepath, factory.settings_modulepath, name])
+
+    def _stamp(self, name):
+        filename = find_module_file(self._modulepath(name))
+        try:
+            stat = os.stat(filename)
+        except (OSError, TypeError):
+            return (filename, None)
+        return (filename, stat.st_mtime_ns, stat.st_size)
+
+    def _get_stamps(self):
+        return {name: self._stamp(name) for name, show_error in self.modules}
+
+    def _run(self, name, show_error, settings, paths, fresh=False):
+        try:
+            module = sys.modules.get(self._modulepath(name))
+            if fresh:
+                invalidate_caches()
+            if fresh and module is not None:
+                module = reload(module)
+            else:
+                module = self.factory.import_module(name)
+            module.make_settings(settings, paths)
+        except ImportError:
+            if show_error:
+                raise
+
+    def _run_layers(self, settings, paths, start, changed, fresh=True):
+        """Run changed modules and apply layers of the others, from the
+        module at the start index. Changed modules are imported again if
+        fresh is true. Return the new list of layers."""
+        layers = self._layers[:start]
+        for index in range(start, len(self.modules)):
+            name, show_error = self.modules[index]
+            before = (settings._copy_tree(), copy_paths(paths))
+            if index in changed:
+                self._run(name, show_error, settings, paths, fresh)
+                layer = diff_settings(before[0], settings)
+                diff_paths(before[1], paths, layer)
+            else:
+                layer = self._layers[index][1]
+                apply_layer(layer, settings, paths)
+            layers.append((before, layer))
+        factory = self.factory
+        if factory.env:
+            factory.env.apply(settings, factory.environ)
+        return layers
+
+    def build(self):
+        """Run all the modules on the settings of the Factory."""
+        with self._lock:
+            factory = self.factory
+            self.stamps = self._get_stamps()
+            self._layers = []
+            self._layers = self._run_layers(
+                factory.settings, factory.paths, 0,
+                range(len(self.modules)), fresh=False)
+            self._result = (
+                factory.settings._copy_tree(), copy_paths(factory.paths))
+
+    def check(self):
+        """Reload changed modules. Return Layer with the changes made in the
+        live settings, which is empty if nothing changed."""
+        with self._lock:
+            stamps = self._get_stamps()
+            if stamps == self.stamps or stamps == self._failed:
+                return Layer()
+            changed = {
+                index for index, (name, show_error) in enumerate(self.modules)
+                if stamps[name] != self.stamps.get(name)}
+            start = min(changed)
+            settings, paths = self._layers[start][0]
+            settings = settings._copy_tree()
+            paths = copy_paths(paths)
+            try:
+                layers = self._run_layers(settings, paths, start, changed)
+            except Exception:
+                self._failed = stamps
+                raise
+            self.stamps = stamps
+            self._failed = None
+            self._layers = layers
+            return self._publish(settings, paths)
+
+    def _publish(self, settings, paths):
+        old_settings, old_paths = self._result
+        layer = diff_settings(old_settings, settings)
+        diff_paths(old_paths, paths, layer)
+        self._result = (settings, paths)
+        if not layer:
+            return layer
+
+        factory = self.factory
+        live = self.settings if self.settings is not None else (
+            factory.settings)
+        if hasattr(live, 'transaction'):
+            with live.transaction() as live:
+                apply_layer(layer, live)
+        else:
+            apply_layer(layer, live)
+
+        if layer.paths or len(old_paths.paths) != len(paths.paths):
+            copy = copy_paths(paths)
+            for element in copy.paths.values():
+                element.paths = factory.paths
+            vars(factory.paths).update(vars(copy))
+
+        keys = layer.keys()
+        names = {element.name for element in layer.paths}
+        names.update(set(old_paths.paths).difference(paths.paths))
+        for callback in list(self.subscribers):
+            callback(keys, names)
+        return layer
+
+    def start(self, interval=1.0):
+        """Check the modules every interval seconds in a daemon thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = Thread(
+            target=self._watch, args=(interval,), name='morfdict-reloader',
+            daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _watch(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.check()
+            except Exception:
+                log.exception('Reloading settings failed')
@@ -0,0 +1,115 @@
+from morfdict.template import Template
+
+
+class InterpolationCycleError(Exception):
+
+    def __init__(self, cycle, message=None):
+        self.cycle = cycle
+        self.message = message or 'Interpolation cycle: {0}'.format(
+            ' -> '.join(cycle))
+        super().__init__(self.message)
+
+
+class ResolvedValues(dict):
+    """Values already resolved by the Resolver. Values which are not
+    resolved yet are read from the MorfDict and remembered."""
+
+    def __init__(self, data, errors):
+        super().__init__()
+        self.data = data
+        self.errors = errors
+
+    def __missing__(self, key):
+        if key in self.errors:
+            raise self.errors[key]
+        value = self[key] = self.data[key]
+        return value
+
+
+class Resolver(object):
+    """Resolve all the values of a MorfDict at once.
+
+    Templates (values which are only interpolated) are parsed once and
+    resolved in topological order, so every value is computed exactly once.
+    Values without references to other keys of the MorfDict are taken at
+    once and only the other ones are sorted. Other values are read from the
+    MorfDict when needed.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.errors = {}
+        self.values = ResolvedValues(data, self.errors)
+        self.templates = {}
+        self.graph = {}
+
+    def resolve(self):
+        values = self.values
+        for key, template in self.data._get_templates():
+            if type(template) is not Template:
+                # plain strings are copied; strings with '%' which were not
+                # compiled are read from the MorfDict when needed
+                if '%' not in template:
+                    values[key] = template
+                continue
+            references = [
+                name for name in template.references if name in self.data]
+            if references:
+                self.templates[key] = template
+                self.graph[key] = references
+                continue
+            try:
+                values[key] = template.render(values)
+            except Exception as error:
+                self.errors[key] = error
+
+        for key in self._sort():
+            if key in values or key in self.errors:
+                continue
+            try:
+                if key in self.templates:
+                    values[key] = self._render(self.templates[key])
+                else:
+                    values[key] = self.data[key]
+            except Exception as error:
+                self.errors[key] = error
+        return self
+
+    def _render(self, template):
+        if isinstance(template, Template):
+            return template.render(self.values)
+        return template
+
+    def get(self, key):
+        """Get resolved value or raise the error raised on resolving."""
+        if key in self.errors:
+            raise self.errors[key]
+        return self.values[key]
+
+    def _sort(self):
+        """Sort keys so every template is after the templates it uses.
+        Keys which make a cycle get InterpolationCycleError."""
+        order = []
+        done = set()
+        for key in list(self.graph):
+            if key in done:
+                continue
+            path = [key]
+            stack = [iter(self.graph.get(key, ()))]
+            while stack:
+                name = next(stack[-1], None)
+                if name is None:
+                    stack.pop()
+                    done.add(path[-1])
+                    order.append(path.pop())
+                elif name in path:
+                    self._set_cycle(path[path.index(name):] + [name])
+                elif name not in done:
+                    path.append(name)
+                    stack.append(iter(self.graph.get(name, ())))
+        return order
+
+    def _set_cycle(self, cycle):
+        error = InterpolationCycleError(cycle)
+        for key in cycle:
+            self.errors.setdefault(key, error)
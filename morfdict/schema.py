@@ -0,0 +1,320 @@
+from morfdict.cache import MorfCache
+from morfdict.env import to_bool
+from morfdict.env import to_list
+from morfdict.models import FrozenDict
+from morfdict.models import MorfDict
+from morfdict.models import NoDefault
+from morfdict.resolver import Resolver
+
+# Converters used when a string is read for a key of one of those types.
+CONVERTERS = {
+    int: int,
+    float: float,
+    bool: to_bool,
+    list: to_list,
+}
+
+
+class SchemaMismatch(Exception):
+
+    def __init__(self, path, message):
+        self.path = path
+        self.message = '"{0}" {1}'.format(
+            '.'.join(str(key) for key in path), message)
+        super().__init__(self.message)
+
+
+class SchemaError(Exception):
+    """All the mismatches found while reading settings with a Schema."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        self.message = '\n'.join(error.message for error in errors)
+        super().__init__(self.message)
+
+
+class SettingsView(object):
+    """Base of the classes made by Schema. Values are plain attributes."""
+    __slots__ = ()
+
+    def to_dict(self):
+        data = {}
+        for key in self.__slots__:
+            value = getattr(self, key)
+            if isinstance(value, SettingsView):
+                value = value.to_dict()
+            data[key] = value
+        return data
+
+    def __repr__(self):
+        return '{0}({1})'.format(
+            type(self).__name__,
+            ', '.join(
+                '{0}={1!r}'.format(key, getattr(self, key))
+                for key in self.__slots__))
+
+
+def _type_name(kind):
+    if isinstance(kind, tuple):
+        return ' or '.join(item.__name__ for item in kind)
+    return kind.__name__
+
+
+class Field(object):
+    """Declaration of one value.
+
+    - kind: type (or tuple of types) of the value
+    - convert: function which converts value of other type. Without it,
+        strings are converted for int, float, bool and list (see
+        CONVERTERS)
+    - default: value used when the key is missing
+    - check: function which returns false for invalid values
+    - min, max: the smallest and the biggest valid value
+    - choices: valid values
+    """
+    __slots__ = (
+        'kind', 'convert', 'default', 'check', 'min', 'max', 'choices')
+
+    def __init__(
+        self, kind=object, convert=None, default=NoDefault, check=None,
+        min=None, max=None, choices=None,
+    ):
+        self.kind = kind
+        self.convert = convert
+        self.default = default
+        self.check = check
+        self.min = min
+        self.max = max
+        self.choices = choices
+
+    def coerce(self, value):
+        """Convert and check the value. Raise TypeError or ValueError with
+        message which describes the problem."""
+        kind = self.kind
+        if not isinstance(value, kind):
+            convert = self.convert
+            if convert is None and isinstance(value, str):
+                convert = CONVERTERS.get(kind)
+            if convert is not None:
+                try:
+                    value = convert(value)
+                except (TypeError, ValueError) as error:
+                    raise ValueError('can not be converted: {0}'.format(
+                        error))
+            if not isinstance(value, kind):
+                raise TypeError('should be {0}, not {1}'.format(
+                    _type_name(kind), type(value).__name__))
+        if self.min is not None and value < self.min:
+            raise ValueError('should be at least {0!r}'.format(self.min))
+        if self.max is not None and value > self.max:
+            raise ValueError('should be at most {0!r}'.format(self.max))
+        if self.choices is not None and value not in self.choices:
+            raise ValueError('should be one of {0}'.format(
+                ', '.join(repr(choice) for choice in self.choices)))
+        if self.check is not None and not self.check(value):
+            raise ValueError('is invalid: {0!r}'.format(value))
+        return value
+
+
+class CoercingMorf(object):
+    """Morf method which coerces the value with the Field, after the
+    original morf method. The last result is kept for every object (up to
+    maxsize objects, in a MorfCache) and returned while the morfed value is
+    the same."""
+    maxsize = 16
+
+    def __init__(self, field, morf=None):
+        self.field = field
+        self.morf = morf
+        self.cache = MorfCache(self.maxsize)
+
+    def __call__(self, obj, value):
+        morf = self.morf or obj._default_morf
+        value = morf(obj, value)
+        result = self.cache.get_result(id(obj), obj, value)
+        if result is NoDefault:
+            result = self.cache.put_result(
+                id(obj), obj, value, self.field.coerce(value))
+        return result
+
+
+class Section(object):
+    """Base of classes which declare schemas. Class attributes (without
+    leading underscore) are the keys and nested Section classes are nested
+    dicts.
+
+    >> class Settings(Section):
+    >>     name = str
+    >>     class db(Section):
+    >>         host = str
+    >>         port = Field(int, min=1, max=65535)
+    """
+
+
+def _get_fields(declaration):
+    if isinstance(declaration, type) and issubclass(declaration, Section):
+        return {
+            key: value for key, value in vars(declaration).items()
+            if not key.startswith('_')}
+    return declaration
+
+
+def _is_schema(declaration):
+    return isinstance(declaration, (dict, Schema)) or (
+        isinstance(declaration, type) and issubclass(declaration, Section))
+
+
+class Schema(object):
+    """Declared keys of settings, with their types and checks.
+
+    >> schema = Schema({'name': str, 'db': {'host': str, 'port': int}})
+    >> cfg = schema.build(settings)
+    >> cfg.db.host
+    'localhost'
+
+    Keys are declared with a dict or a Section class. Values are types (or
+    tuples of types) or Fields; `object` accepts anything. Nested dicts are
+    nested schemas. Keys of the settings which are not declared are
+    ignored. Paths can be declared the same way (without nesting).
+    """
+
+    def __init__(self, declaration, name=None, paths=None):
+        if name is None:
+            name = getattr(declaration, '__name__', 'Settings')
+        self.name = name
+        self.fields = {}
+        for key, field in _get_fields(declaration).items():
+            if not isinstance(key, str) or not key.isidentifier():
+                raise ValueError(
+                    'Schema key {0!r} is not an identifier'.format(key))
+            if _is_schema(field) and not isinstance(field, Schema):
+                field = Schema(field, name + key.title().replace('_', ''))
+            elif not isinstance(field, (Field, Schema)):
+                field = Field(field)
+            self.fields[key] = field
+        self.paths = {
+            key: field if isinstance(field, Field) else Field(field)
+            for key, field in (paths or {}).items()}
+        self._view_class = None
+
+    @property
+    def view_class(self):
+        """Class with a slot for every declared key, made once."""
+        if self._view_class is None:
+            self._view_class = type(
+                self.name, (SettingsView,), {'__slots__': tuple(self.fields)})
+        return self._view_class
+
+    def _getter(self, settings):
+        if isinstance(settings, MorfDict):
+            return Resolver(settings).resolve().get
+        return settings.__getitem__
+
+    def _read(self, settings, path, errors, install=False):
+        """Make view of the settings in one pass, adding all mismatches to
+        errors. If install is true, CoercingMorfs are set for the keys and
+        defaults are set for the missing keys."""
+        get = self._getter(settings)
+        view = self.view_class()
+        for key, field in self.fields.items():
+            keypath = path + (key,)
+            value = _read_value(get, key, keypath, field, errors)
+            if value is NoDefault:
+                continue
+            if value is MissingKey:
+                value = field.default
+                if install:
+                    settings[key] = value
+
+            if isinstance(field, Schema):
+                if not isinstance(value, (MorfDict, FrozenDict)):
+                    errors.append(SchemaMismatch(keypath, 'is not a dict'))
+                    continue
+                value = field._read(value, keypath, errors, install)
+            else:
+                try:
+                    coerced = field.coerce(value)
+                except (TypeError, ValueError) as error:
+                    errors.append(SchemaMismatch(keypath, str(error)))
+                    continue
+                if install:
+                    _install(settings, key, field, value, coerced)
+                value = coerced
+            setattr(view, key, value)
+        return view
+
+    def _read_paths(self, paths, errors):
+        for name, field in self.paths.items():
+            keypath = ('paths', name)
+            value = _read_value(paths.get, name, keypath, field, errors)
+            if value is NoDefault or value is MissingKey:
+                continue
+            try:
+                field.coerce(value)
+            except (TypeError, ValueError) as error:
+                errors.append(SchemaMismatch(keypath, str(error)))
+
+    def get_errors(self, settings, paths=None):
+        """List all mismatches of the settings (and paths), like
+        MorfDict.get_errors lists the values which can not be read."""
+        errors = []
+        self._read(settings, (), errors)
+        if paths is not None:
+            self._read_paths(paths, errors)
+        return errors
+
+    def build(self, settings):
+        """Make view_class object with the coerced values of the settings.
+        Raise SchemaError with all the mismatches."""
+        errors = []
+        view = self._read(settings, (), errors)
+        if errors:
+            raise SchemaError(errors)
+        return view
+
+    def coerce(self, settings, paths=None):
+        """Validate the whole settings (and paths) in one pass and make them
+        return coerced values: missing keys get their defaults and
+        CoercingMorfs are set for the other keys. Raise SchemaError with all
+        the mismatches."""
+        errors = []
+        self._read(settings, (), errors, install=True)
+        if paths is not None:
+            self._read_paths(paths, errors)
+        if errors:
+            raise SchemaError(errors)
+
+
+class MissingKey:
+    """Read value of a missing key which has a default."""
+
+
+def _read_value(get, key, keypath, field, errors):
+    """Read the value. Return MissingKey for a missing key with a default, or
+    NoDefault when the error was added to errors."""
+    try:
+        return get(key)
+    except KeyError as error:
+        if error.args and error.args[0] == key:
+            default = getattr(field, 'default', NoDefault)
+            if default is not NoDefault:
+                return MissingKey
+            errors.append(SchemaMismatch(keypath, 'is missing'))
+        else:
+            errors.append(SchemaMismatch(
+                keypath, 'can not be read: {0!r}'.format(error)))
+    except Exception as error:
+        errors.append(SchemaMismatch(
+            keypath, 'can not be read: {0!r}'.format(error)))
+    return NoDefault
+
+
+def _install(settings, key, field, value, coerced):
+    """Set CoercingMorf for the key, with the value coerced while
+    validating already cached."""
+    morf = settings._morf.get(key)
+    if isinstance(morf, CoercingMorf):
+        morf = morf.morf
+    morf = CoercingMorf(field, morf)
+    morf.cache.put_result(id(settings), settings, value, coerced)
+    settings.set_morf(key, morf)
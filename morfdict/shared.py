@@ -0,0 +1,226 @@
+import marshal
+import mmap
+import os
+import struct
+from collections.abc import Mapping
+
+from morfdict.models import FrozenDict
+
+MAGIC = b'MORFDIC2'
+HEADER = struct.Struct('<8sQ')
+# own keys, inherited keys, parents
+COUNTS = struct.Struct('<III')
+# key offset, key length, kind, value offset, value length
+ENTRY = struct.Struct('<QIBQI')
+PARENT = struct.Struct('<Q')
+VALUE = 0
+NODE = 1
+
+
+class SharedDictError(Exception):
+
+    def __init__(self, message):
+        self.message = message
+        super().__init__(message)
+
+
+def export_shared(settings, filename):
+    """Resolve all values of the MorfDict and write them to a file, which can
+    be opened with open_shared.
+
+    Every dict of the tree is stored as a table of its keys sorted by the
+    utf8 bytes, followed by the few inherited keys which its parents do not
+    give (see MorfDict.freeze) and the offsets of its parents, where the
+    other inherited keys are found. Values are encoded with marshal, so
+    they need to be built-in types.
+    """
+    frozen = settings.freeze()
+    nodes = []
+    indexes = {}
+    stack = [frozen]
+    while stack:
+        node = stack.pop()
+        if id(node) in indexes:
+            continue
+        indexes[id(node)] = len(nodes)
+        nodes.append(node)
+        for table in (
+            dict.values(node), node._inherited.values(), node._parents,
+        ):
+            stack.extend(
+                value for value in table if isinstance(value, FrozenDict))
+
+    node_offsets = []
+    offset = HEADER.size
+    for node in nodes:
+        node_offsets.append(offset)
+        offset += (
+            COUNTS.size
+            + ENTRY.size * (len(node) + len(node._inherited))
+            + PARENT.size * len(node._parents))
+
+    data_start = offset
+    tables = bytearray()
+    data = bytearray()
+    for node in nodes:
+        tables += COUNTS.pack(
+            len(node), len(node._inherited), len(node._parents))
+        for table in (dict.items(node), node._inherited.items()):
+            for key, value in sorted(
+                (_encode_key(key), value) for key, value in table
+            ):
+                key_offset = data_start + len(data)
+                data += key
+                if isinstance(value, FrozenDict):
+                    kind = NODE
+                    value_offset = node_offsets[indexes[id(value)]]
+                    value_length = 0
+                else:
+                    kind = VALUE
+                    encoded = _encode_value(key, value)
+                    value_offset = data_start + len(data)
+                    value_length = len(encoded)
+                    data += encoded
+                tables += ENTRY.pack(
+                    key_offset, len(key), kind, value_offset, value_length)
+        for parent in node._parents:
+            tables += PARENT.pack(node_offsets[indexes[id(parent)]])
+
+    tmpname = '{0}.{1}.tmp'.format(filename, os.getpid())
+    with open(tmpname, 'wb') as stream:
+        stream.write(HEADER.pack(MAGIC, node_offsets[0]))
+        stream.write(tables)
+        stream.write(data)
+    os.replace(tmpname, filename)
+
+
+def _encode_key(key):
+    if not isinstance(key, str):
+        raise SharedDictError(
+            'Only string keys can be shared, got {0!r}'.format(key))
+    return key.encode('utf8')
+
+
+def _encode_value(key, value):
+    try:
+        return marshal.dumps(value)
+    except ValueError:
+        raise SharedDictError(
+            'Value of "{0}" can not be shared: {1!r}'.format(
+                key.decode('utf8'), value))
+
+
+def open_shared(filename):
+    """Open file made by export_shared. The file is memory mapped read only,
+    so all processes which open it share the same memory."""
+    with open(filename, 'rb') as stream:
+        buffer = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, root = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise SharedDictError('"{0}" is not a shared settings file'.format(
+            filename))
+    return SharedDict(buffer, root)
+
+
+class SharedDict(Mapping):
+    """Read only view of a dict stored by export_shared.
+
+    Keys are found by binary search in the mapped file and values are
+    decoded on every read, so nothing is copied into the process memory.
+    """
+
+    def __init__(self, buffer, offset):
+        self._buffer = buffer
+        self._node = offset
+        self._offset = offset + COUNTS.size
+        self._own, self._inherited, self._parents = COUNTS.unpack_from(
+            buffer, offset)
+
+    def _parent_offsets(self):
+        start = self._offset + ENTRY.size * (self._own + self._inherited)
+        return [
+            PARENT.unpack_from(self._buffer, start + index * PARENT.size)[0]
+            for index in range(self._parents)]
+
+    def _find_inherited(self, key):
+        """Find key which is not an own key, in the inherited keys and then
+        in the parents, in the same order as FrozenDict does."""
+        entry = self._find(key, self._own, self._own + self._inherited)
+        if entry is not None or not self._parents:
+            return entry
+        seen = {self._node}
+        stack = list(reversed(self._parent_offsets()))
+        while stack:
+            offset = stack.pop()
+            if offset in seen:
+                continue
+            seen.add(offset)
+            node = SharedDict(self._buffer, offset)
+            entry = node._find(key, 0, node._own) or node._find(
+                key, node._own, node._own + node._inherited)
+            if entry is not None:
+                return entry
+            stack.extend(reversed(node._parent_offsets()))
+        return None
+
+    def _entry(self, index):
+        return ENTRY.unpack_from(
+            self._buffer, self._offset + index * ENTRY.size)
+
+    def _key(self, entry):
+        return self._buffer[entry[0]:entry[0] + entry[1]]
+
+    def _find(self, key, start, end):
+        while start < end:
+            middle = (start + end) // 2
+            entry = self._entry(middle)
+            found = self._key(entry)
+            if found == key:
+                return entry
+            elif found < key:
+                start = middle + 1
+            else:
+                end = middle
+        return None
+
+    def _decode(self, entry):
+        key_offset, key_length, kind, offset, length = entry
+        if kind == NODE:
+            return SharedDict(self._buffer, offset)
+        return marshal.loads(self._buffer[offset:offset + length])
+
+    def __getitem__(self, key):
+        if not isinstance(key, str):
+            raise KeyError(key)
+        encoded = key.encode('utf8')
+        entry = (
+            self._find(encoded, 0, self._own)
+            or self._find_inherited(encoded))
+        if entry is None:
+            raise KeyError(key)
+        return self._decode(entry)
+
+    def __iter__(self):
+        for index in range(self._own):
+            yield self._key(self._entry(index)).decode('utf8')
+
+    def __len__(self):
+        return self._own
+
+    def __contains__(self, key):
+        return isinstance(key, str) and self._find(
+            key.encode('utf8'), 0, self._own) is not None
+
+    def to_dict(self):
+        """Create simple dict object from this object."""
+        data = {}
+        for index in range(self._own):
+            entry = self._entry(index)
+            value = self._decode(entry)
+            if isinstance(value, SharedDict):
+                value = value.to_dict()
+            data[self._key(entry).decode('utf8')] = value
+        return data
+
+    def get_errors(self):
+        return []
@@ -0,0 +1,188 @@
+import hashlib
+import os
+import pickle
+from importlib.machinery import PathFinder
+from importlib.util import find_spec
+
+from morfdict.models import MorfDict
+from morfdict.models import PathGeneratorElement
+from morfdict.models import Paths
+
+VERSION = 2
+
+
+class SnapshotError(Exception):
+
+    def __init__(self, message):
+        self.message = message
+        super().__init__(message)
+
+
+class Node(object):
+    """Raw values, morf methods and parents of one MorfDict in a snapshot.
+    Parents are (keys, None) for dicts of the same tree and (None, parent)
+    for other objects, which are stored as they are. The dict which
+    contains the node is not listed."""
+    __slots__ = ('values', 'morf', 'parents')
+
+    def __init__(self, values, morf, parents):
+        self.values = values
+        self.morf = morf
+        self.parents = parents
+
+
+def dump_settings(settings):
+    """Convert MorfDict tree into Nodes. Morf methods and parents from
+    outside of the tree are stored by reference, so they need to be
+    importable or picklable."""
+    nodes = {}
+    stack = [((), settings)]
+    while stack:
+        keys, node = stack.pop()
+        nodes[id(node)] = keys
+        for key in node.keys():
+            value = node._raw_get(key)
+            if isinstance(value, MorfDict) and id(value) not in nodes:
+                stack.append((keys + (key,), value))
+    return _dump_node(settings, None, nodes)
+
+
+def _dump_node(settings, container, nodes):
+    values = {}
+    for key in settings.keys():
+        value = settings._raw_get(key)
+        if isinstance(value, MorfDict):
+            value = _dump_node(value, settings, nodes)
+        elif isinstance(value, str):
+            value = str(value)
+        values[key] = value
+    parents = [
+        (nodes[id(parent)], None) if id(parent) in nodes else (None, parent)
+        for parent in settings._parents if parent is not container]
+    return Node(values, dict(settings._morf), parents)
+
+
+def load_settings(node, settings_class):
+    """Make settings_class object from Node made by dump_settings."""
+    parents = []
+    settings = _load_node(node, settings_class, (), parents)
+    for keys, node_keys, parent in parents:
+        if node_keys is not None:
+            parent = _get_node(settings, node_keys)
+        _get_node(settings, keys).append_parent(parent)
+    return settings
+
+
+def _load_node(node, settings_class, keys, parents):
+    settings = settings_class()
+    for key, value in node.values.items():
+        if isinstance(value, Node):
+            settings[key] = _load_node(
+                value, settings_class, keys + (key,), parents)
+        else:
+            settings[key] = value
+    for key, morf in node.morf.items():
+        settings.set_morf(key, morf)
+    parents.extend(
+        (keys, node_keys, parent) for node_keys, parent in node.parents)
+    return settings
+
+
+def _get_node(settings, keys):
+    for key in keys:
+        settings = settings._raw_get(key)
+    return settings
+
+
+def dump_paths(paths):
+    elements = []
+    for element in paths.paths.values():
+        elements.append((
+            isinstance(element, PathGeneratorElement),
+            element.name,
+            element._value,
+            element.parent,
+            element.is_root,
+            element.cacheable,
+        ))
+    return elements
+
+
+def load_paths(elements):
+    paths = Paths()
+    for is_generator, name, value, parent, is_root, cacheable in elements:
+        if is_generator:
+            paths.set_generator(name, value, parent, is_root, cacheable)
+        else:
+            paths.set(name, value, parent, is_root)
+    return paths
+
+
+def find_module_file(modulepath):
+    """Find file of a module without importing it or its packages. Return
+    None if the module does not exist."""
+    names = modulepath.split('.')
+    spec = find_spec(names[0])
+    for index in range(1, len(names)):
+        if spec is None or spec.submodule_search_locations is None:
+            return None
+        spec = PathFinder.find_spec(
+            '.'.join(names[:index + 1]), spec.submodule_search_locations)
+    if spec is None:
+        return None
+    return spec.origin
+
+
+def make_key(filenames, *extra):
+    """Make hash of files (their names, modification times and contents)
+    and the extra data."""
+    digest = hashlib.sha1(repr((VERSION, extra)).encode('utf8'))
+    for filename in filenames:
+        digest.update(repr(filename).encode('utf8'))
+        if filename is None or not os.path.isfile(filename):
+            continue
+        digest.update(str(os.stat(filename).st_mtime_ns).encode('utf8'))
+        with open(filename, 'rb') as stream:
+            digest.update(stream.read())
+    return digest.hexdigest()
+
+
+def write_snapshot(filename, key, settings, paths):
+    """Write settings and paths to the file. Raise SnapshotError if they
+    can not be stored (for example, because of a lambda morf) or the file
+    can not be written."""
+    try:
+        data = pickle.dumps(
+            (key, dump_settings(settings), dump_paths(paths)),
+            pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, AttributeError, TypeError) as error:
+        raise SnapshotError(
+            'Settings can not be stored in a snapshot: {0}'.format(error))
+    tmpname = '{0}.{1}.tmp'.format(filename, os.getpid())
+    try:
+        with open(tmpname, 'wb') as stream:
+            stream.write(data)
+        os.replace(tmpname, filename)
+    except OSError as error:
+        try:
+            os.remove(tmpname)
+        except OSError:
+            pass
+        raise SnapshotError(
+            'Snapshot can not be written: {0}'.format(error))
+
+
+def read_snapshot(filename, key, settings_class):
+    """Read settings and paths from the file. Return None if there is no
+    snapshot or it was made for a different key."""
+    try:
+        with open(filename, 'rb') as stream:
+            snapshot_key, node, elements = pickle.load(stream)
+    except (
+        OSError, EOFError, ValueError, AttributeError, ImportError,
+        pickle.UnpicklingError,
+    ):
+        return None
+    if snapshot_key != key:
+        return None
+    return load_settings(node, settings_class), load_paths(elements)
@@ -0,0 +1,96 @@
+import re
+
+# '%%', '%(name)' or positional '%'. Names with parentheses, which
+# str.__mod__ balances, are matched only up to the first '(' (nested group).
+PLACEHOLDER = re.compile(r'%(?:(%)|\(([^()]*)\)|(\()|)')
+
+
+class Template(str):
+    """String value with its '%(name)s' placeholders parsed once.
+
+    - format: the value with named placeholders changed into positional ones
+    - keys: names of the keys for every placeholder, in order
+    - references: names of the keys used, without repetitions
+
+    Values which can not be compiled (for example, with positional
+    placeholders or parentheses in names) have format set to None and are
+    rendered like before.
+    """
+    __slots__ = ('format', 'keys', 'references')
+
+    def __new__(cls, value):
+        template = super().__new__(cls, value)
+        template.format, template.keys = cls._compile(value)
+        template.references = tuple(dict.fromkeys(
+            find_references(value) if template.format is None
+            else template.keys))
+        return template
+
+    def __getnewargs__(self):
+        return (str(self),)
+
+    @staticmethod
+    def _compile(value):
+        parts = []
+        keys = []
+        start = 0
+        for match in PLACEHOLDER.finditer(value):
+            escaped, name, nested = match.groups()
+            if escaped is None and name is None:
+                return None, ()
+            parts.append(value[start:match.start()])
+            if name is None:
+                parts.append('%%')
+            else:
+                parts.append('%')
+                keys.append(name)
+            start = match.end()
+        parts.append(value[start:])
+        return ''.join(parts), tuple(keys)
+
+    def render(self, mapping):
+        """Interpolate the template with values from the mapping."""
+        if self.format is None:
+            return str.__mod__(self, mapping)
+        return self.format % tuple(map(mapping.__getitem__, self.keys))
+
+
+def find_references(template):
+    """Get names of the keys used by '%(name)s' placeholders."""
+    if isinstance(template, Template):
+        return list(template.references)
+    if '%' not in template:
+        return []
+    references = []
+    for escaped, name, nested in PLACEHOLDER.findall(template):
+        if nested:
+            return _find_nested_references(template)
+        if name and name not in references:
+            references.append(name)
+    return references
+
+
+def _find_nested_references(template):
+    """Find names like str.__mod__ does, balancing the parentheses, so
+    '%(a(x))s' uses key 'a(x)'."""
+    references = []
+    start = template.find('%')
+    while start != -1:
+        end = start + 1
+        if template.startswith('%', end):
+            end += 1
+        elif template.startswith('(', end):
+            depth = 0
+            for index in range(end, len(template)):
+                if template[index] == '(':
+                    depth += 1
+                elif template[index] == ')':
+                    depth -= 1
+                    if not depth:
+                        name = template[end + 1:index]
+                        if name and name not in references:
+                            references.append(name)
+                        end = index + 1
+                        break
+        start = template.find('%', end)
+    return references
@@ -2,7 +2,21 @@ import unittest
 import logging
 
 from morfdict.tests import morfdict
+from morfdict.tests import aio
+from morfdict.tests import cache
+from morfdict.tests import diff
+from morfdict.tests import env
+from morfdict.tests import export
 from morfdict.tests import factory
+from morfdict.tests import loaders
+from morfdict.tests import profiling
+from morfdict.tests import reload
+from morfdict.tests import resolver
+from morfdict.tests import schema
+from morfdict.tests import shared
+from morfdict.tests import snapshot
+from morfdict.tests import template
+from morfdict.tests import versioned
 
 all_test_cases = [
     morfdict.StringDictTest,
@@ -13,8 +27,55 @@ all_test_cases = [
     morfdict.TestTreePaths,
     morfdict.PathsContextTest,
     morfdict.StringDictEnvTest,
+    morfdict.CachedStringDictTest,
+    morfdict.FreezeTest,
+    morfdict.ParentIndexTest,
+    morfdict.PathsCacheTest,
+    morfdict.LayeredDictTest,
+    morfdict.NestedAccessTest,
+    morfdict.CompactLayoutTest,
 
     factory.FactoryTest,
+    factory.LazyFactoryTest,
+    factory.LayeredFactoryTest,
+    factory.ParallelFactoryTest,
+
+    loaders.LoadersTest,
+    loaders.FactoryFilesTest,
+
+    aio.AsyncMorfTest,
+
+    cache.MorfCacheTest,
+
+    diff.DiffTest,
+    diff.ObserverTest,
+
+    env.ConvertersTest,
+    env.EnvBindingsTest,
+    env.FactoryEnvTest,
+
+    export.ExportTest,
+
+    profiling.ProfilerTest,
+
+    reload.DiffTest,
+    reload.ReloaderTest,
+
+    resolver.ResolverTest,
+
+    schema.SchemaTest,
+    schema.CoercionTest,
+
+    shared.SharedDictTest,
+
+    snapshot.SnapshotTest,
+    snapshot.FactorySnapshotTest,
+
+    template.FindReferencesTest,
+    template.TemplateTest,
+    template.StringDictTemplateTest,
+
+    versioned.VersionedSettingsTest,
 ]
 
 
@@ -0,0 +1,125 @@
+import asyncio
+import time
+
+from .base import TestCase
+from morfdict import StringDict
+from morfdict.aio import AsyncMorf
+from morfdict.cache import MorfCache
+
+
+async def secret(obj, value):
+    await asyncio.sleep(0.05)
+    return value.upper()
+
+
+def blocking_secret(obj, value):
+    time.sleep(0.05)
+    return value.upper()
+
+
+async def slow(obj, value):
+    await asyncio.sleep(1)
+
+
+class AsyncMorfTest(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.calls = []
+        self.settings = StringDict({
+            'user': 'user',
+            'password': 'password',
+            'token': 'token',
+            'dsn': 'db://%(user)s:%(password)s',
+            'child': {'name': '%(dsn)s/child'},
+        })
+        self.settings.set_async_morf('user', self.counted(secret))
+        self.settings.set_async_morf('password', self.counted(secret))
+        self.settings.set_async_morf('token', blocking_secret, blocking=True)
+
+    def counted(self, method):
+        async def wrapper(obj, value):
+            self.calls.append(value)
+            return await method(obj, value)
+        return wrapper
+
+    def test_aget(self):
+        start = time.perf_counter()
+        value = asyncio.run(self.settings.aget('dsn'))
+        self.assertEqual('db://USER:PASSWORD', value)
+        self.assertTrue(time.perf_counter() - start < 0.09)
+        self.assertEqual(['password', 'user'], sorted(self.calls))
+
+    def test_aget_from_child(self):
+        value = asyncio.run(self.settings['child'].aget('name'))
+        self.assertEqual('db://USER:PASSWORD/child', value)
+
+    def test_ato_dict(self):
+        start = time.perf_counter()
+        data = asyncio.run(self.settings.ato_dict())
+        self.assertTrue(time.perf_counter() - start < 0.14)
+        self.assertEqual('TOKEN', data['token'])
+        self.assertEqual('db://USER:PASSWORD/child', data['child']['name'])
+        self.assertEqual(2, len(self.calls))
+
+    def test_sync_read(self):
+        self.assertEqual('db://USER:PASSWORD', self.settings['dsn'])
+        self.assertEqual('TOKEN', self.settings['token'])
+
+    def test_sync_read_in_loop(self):
+        async def read():
+            return self.settings['user']
+        self.assertEqual('USER', asyncio.run(read()))
+
+    def test_cache(self):
+        self.settings.set_async_morf(
+            'user', self.counted(secret), cache=True)
+        asyncio.run(self.settings.aget('user'))
+        self.assertEqual('USER', self.settings['user'])
+        self.assertEqual(1, len(self.calls))
+
+        self.settings['user'] = 'other'
+        self.assertEqual('OTHER', asyncio.run(self.settings.aget('user')))
+        self.assertEqual(2, len(self.calls))
+
+    def test_cache_is_bounded(self):
+        cache = MorfCache(maxsize=2)
+        morf = AsyncMorf(secret, cache=cache)
+        objects = [StringDict({'user': 'user'}) for index in range(5)]
+        for settings in objects:
+            settings.set_morf('user', morf)
+            self.assertEqual('USER', settings['user'])
+        self.assertEqual(2, len(cache))
+        self.assertEqual(3, cache.evictions)
+
+    def test_cache_not_used_by_new_object(self):
+        morf = AsyncMorf(self.counted(secret), cache=True)
+        for index in range(3):
+            settings = StringDict({'user': 'user'})
+            settings.set_morf('user', morf)
+            settings['user']
+            del settings
+        self.assertEqual(3, len(self.calls))
+
+    def test_morf_for_many_keys(self):
+        settings = StringDict({'a': 'aaa', 'b': 'bbb'})
+        morf = AsyncMorf(secret)
+        settings.set_morf('a', morf)
+        settings.set_morf('b', morf)
+        self.assertEqual(
+            {'a': 'AAA', 'b': 'BBB'}, asyncio.run(settings.ato_dict()))
+
+    def test_no_cache(self):
+        asyncio.run(self.settings.aget('user'))
+        self.settings['user']
+        self.assertEqual(2, len(self.calls))
+
+    def test_timeout(self):
+        self.settings.set_async_morf('user', slow, timeout=0.01)
+        self.assertRaises(
+            asyncio.TimeoutError,
+            asyncio.run, self.settings.aget('dsn'))
+
+    def test_morf_object(self):
+        self.assertTrue(
+            isinstance(self.settings.get_morf('user'), AsyncMorf))
@@ -1,5 +1,83 @@
+import os
+import sys
 import unittest
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from mock import patch
+
+from morfdict import Factory
 
 
 class TestCase(unittest.TestCase):
     pass
+
+
+class TempDirTestCase(TestCase):
+    """Test case with a temporary directory in self.root."""
+
+    def setUp(self):
+        super().setUp()
+        self.root = mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.root)
+        super().tearDown()
+
+    def write(self, name, content):
+        """Write file in self.root, making its directories, and return its
+        filename."""
+        filename = os.path.join(self.root, name)
+        if not os.path.isdir(os.path.dirname(filename)):
+            os.makedirs(os.path.dirname(filename))
+        exists = os.path.exists(filename)
+        with open(filename, 'w') as stream:
+            stream.write(content)
+        if exists:
+            # make sure a changed file is not taken for the old one (by its
+            # bytecode or by cached data), even when the size is the same
+            stat = os.stat(filename)
+            os.utime(filename, (stat.st_atime + 10, stat.st_mtime + 10))
+        return filename
+
+
+class PackageTestCase(TempDirTestCase):
+    """Test case with a package written in self.root, which is in sys.path
+    during the test. The modules of the package are forgotten after the
+    test."""
+    package = None
+
+    def setUp(self):
+        super().setUp()
+        sys.path.insert(0, self.root)
+
+    def tearDown(self):
+        sys.path.remove(self.root)
+        for name in list(sys.modules):
+            if name == self.package or name.startswith(self.package + '.'):
+                del sys.modules[name]
+        super().tearDown()
+
+
+class FactoryTestCase(TestCase):
+    """Test case with self.factory, which imports the settings modules from
+    the self.modules dict instead of the package."""
+
+    def setUp(self):
+        super().setUp()
+        self.calls = []
+        self.modules = {}
+        self.factory = Factory('main_modulepath', 'settings_modulepath')
+        patchers = [
+            patch.object(self.factory, 'import_module', self.import_module),
+            patch.object(self.factory, '_import_wrapper'),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.factory._import_wrapper.return_value.__file__ = '/one/two.py'
+
+    def import_module(self, name):
+        if name not in self.modules:
+            raise ImportError(name)
+        return self.modules[name]
@@ -0,0 +1,96 @@
+from .base import TestCase
+from morfdict import StringDict
+from morfdict.cache import MorfCache
+
+
+class MorfCacheTest(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.calls = []
+        self.cache = MorfCache(maxsize=2)
+        self.settings = StringDict({
+            'name': 'app',
+            'path': '/srv/%(name)s',
+            'db': {'host': 'localhost'},
+        })
+
+    def morf(self, obj, value):
+        self.calls.append(value)
+        return value.upper()
+
+    def test_cached(self):
+        self.cache.set_morf(self.settings, 'name', self.morf)
+        self.assertEqual('APP', self.settings['name'])
+        self.assertEqual('APP', self.settings['name'])
+        self.assertEqual(['app'], self.calls)
+        self.assertEqual(1, self.cache.hits)
+        self.assertEqual(1, self.cache.misses)
+
+    def test_raw_value_changed(self):
+        self.cache.set_morf(self.settings, 'name', self.morf)
+        self.settings['name']
+        self.settings['name'] = 'web'
+        self.assertEqual('WEB', self.settings['name'])
+        self.assertEqual(['app', 'web'], self.calls)
+
+    def test_forever(self):
+        self.cache.set_morf(self.settings, 'name', self.morf, raw=False)
+        self.settings['name']
+        self.settings['name'] = 'web'
+        self.assertEqual('APP', self.settings['name'])
+        self.cache.clear()
+        self.assertEqual('WEB', self.settings['name'])
+
+    def test_ttl(self):
+        self.cache.set_morf(self.settings, 'name', self.morf, ttl=0)
+        self.settings['name']
+        self.settings['name']
+        self.assertEqual(['app', 'app'], self.calls)
+
+        self.cache.set_morf(self.settings, 'name', self.morf, ttl=60)
+        self.settings['name']
+        self.settings['name']
+        self.assertEqual(3, len(self.calls))
+
+    def test_dependencies(self):
+        def morf(obj, value):
+            self.calls.append(value)
+            return obj['path'] + '/' + value
+
+        child = self.settings['db']
+        self.cache.set_morf(
+            child, 'host', morf, raw=False, depends=['path'])
+        self.assertEqual('/srv/app/localhost', child['host'])
+        self.assertEqual('/srv/app/localhost', child['host'])
+        self.assertEqual(1, len(self.calls))
+
+        self.settings['name'] = 'web'
+        self.assertEqual('/srv/web/localhost', child['host'])
+        self.assertEqual(2, len(self.calls))
+
+    def test_eviction(self):
+        for key in ('name', 'path'):
+            self.cache.set_morf(self.settings, key, self.morf)
+        self.cache.set_morf(self.settings['db'], 'host', self.morf)
+        self.settings['name']
+        self.settings['path']
+        self.settings['db']['host']
+        self.assertEqual(2, len(self.cache))
+        self.assertEqual(1, self.cache.evictions)
+        self.settings['name']
+        self.assertEqual(4, self.cache.misses)
+        self.assertEqual({
+            'hits': 0,
+            'misses': 4,
+            'evictions': 2,
+            'size': 2,
+            'maxsize': 2,
+        }, self.cache.stats())
+
+    def test_copies_are_separate(self):
+        self.cache.set_morf(self.settings, 'name', self.morf)
+        copy = self.settings._copy_tree()
+        self.settings['name']
+        copy['name']
+        self.assertEqual(2, self.cache.misses)
@@ -0,0 +1,141 @@
+from .base import TestCase
+from morfdict import StringDict
+from morfdict.diff import TreeObserver
+from morfdict.diff import diff
+from morfdict.models import Change
+from morfdict.models import NoDefault
+
+
+def upper(obj, value):
+    return value.upper()
+
+
+class DiffTest(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.before = StringDict({
+            'name': 'app',
+            'url': '%(name)s/url',
+            'db': {'host': 'db1', 'port': 5432},
+            'old': 'x',
+        })
+        self.before.set_morf('name', upper)
+
+    def changes(self, after):
+        return sorted(
+            (change.kind, '.'.join(change.path), change.morf)
+            for change in diff(self.before, after))
+
+    def test_same_object(self):
+        self.assertEqual([], self.changes(self.before))
+
+    def test_copy(self):
+        self.assertEqual([], self.changes(self.before._copy_tree()))
+
+    def test_changes(self):
+        after = self.before._copy_tree()
+        after['db']['host'] = 'db2'
+        after['new'] = {'a': 1}
+        del after['old']
+        after.del_morf('name')
+        after.set_morf('url', upper)
+
+        self.assertEqual([
+            ('added', 'new', False),
+            ('added', 'url', True),
+            ('changed', 'db.host', False),
+            ('removed', 'name', True),
+            ('removed', 'old', False),
+        ], self.changes(after))
+
+    def test_values(self):
+        after = self.before._copy_tree()
+        after['url'] = '%(name)s/other'
+        change, = diff(self.before, after)
+        self.assertEqual(('url',), change.path)
+        self.assertEqual('%(name)s/url', change.old)
+        self.assertEqual('%(name)s/other', change.new)
+
+    def test_values_not_morfed(self):
+        after = self.before._copy_tree()
+        after.set_morf('url', lambda obj, value: 1 / 0)
+        self.assertEqual([('added', 'url', True)], self.changes(after))
+
+    def test_identical_subtree_skipped(self):
+        db = self.before._raw_get('db')
+        after = StringDict({'name': 'app', 'url': '%(name)s/url', 'old': 'x'})
+        after.set_morf('name', upper)
+        dict.__setitem__(after, 'db', db)
+        db['port'] = object()
+        self.assertEqual([], self.changes(after))
+
+
+class ObserverTest(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.settings = StringDict({'name': 'app', 'db': {'host': 'db1'}})
+        self.changes = []
+
+    def test_observer(self):
+        self.settings.add_observer(self.changes.append)
+        self.settings['name'] = 'new'
+        self.settings['other'] = 'x'
+        del self.settings['other']
+        self.settings.set_morf('name', upper)
+        self.settings['db']['host'] = 'db2'
+
+        self.assertEqual(
+            ['changed', 'added', 'removed', 'added'],
+            [change.kind for change in self.changes])
+        self.assertEqual('app', self.changes[0].old)
+        self.assertEqual(NoDefault, self.changes[2].new)
+        self.assertTrue(self.changes[3].morf)
+
+        self.settings.remove_observer(self.changes.append)
+        self.settings['name'] = 'newer'
+        self.assertEqual(4, len(self.changes))
+
+    def test_dict_methods(self):
+        self.settings['b'] = 'b'
+        self.settings.add_observer(self.changes.append)
+        self.settings.update(name='new', c='c')
+        self.settings.setdefault('d', 'd')
+        self.settings.setdefault('d', 'other')
+        self.settings.pop('b')
+        self.settings.pop('missing', None)
+        self.settings |= {'e': 'e'}
+        self.assertEqual(('e', 'e'), self.settings.popitem())
+
+        self.assertEqual(
+            [('changed', 'name'), ('added', 'c'), ('added', 'd'),
+             ('removed', 'b'), ('added', 'e'), ('removed', 'e')],
+            [(change.kind, change.path[0]) for change in self.changes])
+
+        del self.changes[:]
+        self.settings.clear()
+        self.assertEqual(
+            ['c', 'd', 'db', 'name'],
+            sorted(change.path[0] for change in self.changes))
+        self.assertEqual(
+            {'removed'}, {change.kind for change in self.changes})
+
+    def test_tree_observer(self):
+        observer = TreeObserver(self.settings, self.changes.append)
+        self.settings['db']['host'] = 'db2'
+        self.settings['cache'] = {'url': 'x'}
+        self.settings['cache']['url'] = 'y'
+        self.settings.merge(StringDict({'db': {'port': '1'}}))
+
+        self.assertEqual(
+            ['db.host', 'cache', 'cache.url', 'db.port'],
+            ['.'.join(change.path) for change in self.changes])
+
+        observer.stop()
+        self.settings['db']['host'] = 'db3'
+        self.assertEqual(4, len(self.changes))
+
+    def test_change_repr(self):
+        change = Change.make(('db', 'host'), 'a', NoDefault)
+        self.assertEqual("Change(removed, 'db.host')", repr(change))
@@ -0,0 +1,117 @@
+from mock import patch
+
+from .base import TestCase
+from morfdict import Factory
+from morfdict import StringDict
+from morfdict.env import EnvBindingError
+from morfdict.env import EnvBindings
+from morfdict.env import EnvirontmentValueInvalid
+from morfdict.env import to_bool
+from morfdict.env import to_list
+from morfdict.models import EnvirontmentValueMissing
+
+
+class ConvertersTest(TestCase):
+
+    def test_to_bool(self):
+        self.assertEqual(True, to_bool(' Yes'))
+        self.assertEqual(False, to_bool('0'))
+        self.assertRaises(ValueError, to_bool, 'maybe')
+
+    def test_to_list(self):
+        self.assertEqual(['a', 'b'], to_list('a, b,'))
+
+
+class EnvBindingsTest(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.env = EnvBindings()
+        self.env.bind('name', 'NAME')
+        self.env.bind('port', 'PORT', int, default=80)
+        self.env.bind(['db', 'debug'], 'DEBUG', to_bool, error='no debug')
+        self.settings = StringDict({'name': 'app', 'db': {'host': 'local'}})
+
+    def test_apply(self):
+        self.env.apply(
+            self.settings, {'NAME': 'env', 'PORT': '8000', 'DEBUG': 'on'})
+        self.assertEqual('env', self.settings['name'])
+        self.assertEqual(8000, self.settings['port'])
+        self.assertEqual(True, self.settings['db']['debug'])
+        self.assertEqual('local', self.settings['db']['host'])
+
+    def test_default(self):
+        self.env.apply(self.settings, {'NAME': 'env', 'DEBUG': 'no'})
+        self.assertEqual(80, self.settings['port'])
+
+    def test_new_nested(self):
+        self.env.bind(['cache', 'url'], 'CACHE')
+        self.env.apply(
+            self.settings, {'NAME': 'a', 'DEBUG': '1', 'CACHE': 'x'})
+        self.assertEqual('x', self.settings['cache']['url'])
+
+    def test_all_errors(self):
+        try:
+            self.env.apply(self.settings, {'PORT': 'eighty'})
+            assert False
+        except EnvBindingError as error:
+            self.assertEqual(3, len(error.errors))
+            self.assertEqual(
+                [EnvirontmentValueMissing, EnvirontmentValueInvalid,
+                 EnvirontmentValueMissing],
+                [type(item) for item in error.errors])
+            self.assertTrue('"PORT"' in error.message)
+            self.assertTrue('no debug' in error.message)
+            self.assertEqual(error.errors[1].message, str(error.errors[1]))
+        self.assertEqual('app', self.settings['name'])
+
+    def test_keys(self):
+        self.assertEqual({'name', 'port', 'db'}, self.env.keys())
+
+    @patch('morfdict.env.environ', {'NAME': 'patched'})
+    def test_read_environ(self):
+        env = EnvBindings()
+        env.bind('name', 'NAME')
+        self.assertEqual([(('name',), 'patched')], env.read())
+
+
+class FactoryEnvTest(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.factory = Factory('main_modulepath', 'settings_modulepath')
+        self.factory.bind_env('name', 'NAME')
+        self.factory.bind_env('port', 'PORT', int)
+        self.patchers = [
+            patch.object(self.factory, '_import_wrapper'),
+            patch.object(self.factory, 'import_module'),
+            patch('morfdict.factory.environ', {'NAME': 'env', 'PORT': '1'}),
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+        self.factory._import_wrapper.return_value.__file__ = '/one/two.py'
+        module = self.factory.import_module.return_value
+        module.make_settings.side_effect = self._make_settings
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+
+    def _make_settings(self, settings, paths):
+        settings['name'] = 'module'
+        settings['port'] = 2
+
+    def test_override_modules(self):
+        settings, paths = self.factory.make_settings()
+        self.assertEqual('env', settings['name'])
+        self.assertEqual(1, settings['port'])
+
+    def test_lazy(self):
+        settings, paths = self.factory.make_settings(lazy=True)
+        self.assertEqual('env', settings['name'])
+        self.assertEqual(StringDict, type(settings))
+
+    def test_environ_snapshot(self):
+        settings, paths = self.factory.make_settings(lazy=True)
+        with patch.dict('morfdict.factory.environ', {'NAME': 'later'}):
+            self.assertEqual('env', settings['name'])
@@ -0,0 +1,99 @@
+import json
+from io import StringIO
+
+from .base import TestCase
+from morfdict import StringDict
+from morfdict.export import format_env_value
+from morfdict.export import iter_flat
+from morfdict.export import write_env
+from morfdict.export import write_json
+
+
+class ExportTest(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.settings = StringDict({
+            'name': 'app',
+            'port': 8000,
+            'debug': True,
+            'hosts': ['one', 'two'],
+            'url': 'http://%(name)s:%(port)s',
+            'db': {'dsn': '%(url)s/db', 'options': {'timeout': 5}},
+            'empty': {},
+        })
+
+    def add_error(self):
+        self.settings['broken'] = '%(missing)s'
+        self.settings['db']['broken'] = '%(missing)s'
+
+    def test_json(self):
+        stream = StringIO()
+        self.assertEqual([], write_json(self.settings, stream))
+        self.assertEqual(
+            self.settings.to_dict(), json.loads(stream.getvalue()))
+
+    def test_json_indent(self):
+        stream = StringIO()
+        write_json(self.settings, stream, indent=2)
+        self.assertEqual(
+            self.settings.to_dict(), json.loads(stream.getvalue()))
+        self.assertTrue(stream.getvalue().startswith('{\n  "name": "app",'))
+        self.assertTrue(stream.getvalue().endswith('\n  "empty": {}\n}'))
+
+    def test_json_error(self):
+        self.add_error()
+        self.assertRaises(KeyError, write_json, self.settings, StringIO())
+
+    def test_json_skip_errors(self):
+        self.add_error()
+        self.settings['object'] = object()
+        stream = StringIO()
+        errors = write_json(self.settings, stream, skip_errors=True)
+
+        data = json.loads(stream.getvalue())
+        self.assertEqual(3, len(errors))
+        self.assertFalse('broken' in data)
+        self.assertFalse('object' in data)
+        self.assertEqual('http://app:8000/db', data['db']['dsn'])
+
+    def test_flat_json(self):
+        stream = StringIO()
+        write_json(self.settings, stream, flat=True)
+        data = json.loads(stream.getvalue())
+        self.assertEqual('http://app:8000/db', data['db.dsn'])
+        self.assertEqual(5, data['db.options.timeout'])
+        self.assertEqual(7, len(data))
+
+    def test_iter_flat(self):
+        self.assertEqual(
+            ('db/options/timeout', 5),
+            list(iter_flat(self.settings, '/'))[-1])
+
+    def test_env(self):
+        stream = StringIO()
+        self.settings['db']['password'] = 'a "b"'
+        write_env(self.settings, stream, prefix='app_')
+        lines = stream.getvalue().splitlines()
+        self.assertEqual([
+            'APP_NAME=app',
+            'APP_PORT=8000',
+            'APP_DEBUG=true',
+            'APP_HOSTS=one,two',
+            'APP_URL=http://app:8000',
+            'APP_DB_DSN=http://app:8000/db',
+            'APP_DB_OPTIONS_TIMEOUT=5',
+            'APP_DB_PASSWORD="a \\"b\\""',
+        ], lines)
+
+    def test_env_skip_errors(self):
+        self.add_error()
+        stream = StringIO()
+        errors = write_env(self.settings, stream, skip_errors=True)
+        self.assertEqual(2, len(errors))
+        self.assertFalse('BROKEN' in stream.getvalue())
+
+    def test_format_env_value(self):
+        self.assertEqual('', format_env_value(None))
+        self.assertEqual('false', format_env_value(False))
+        self.assertEqual('"a\\nb"', format_env_value('a\nb'))
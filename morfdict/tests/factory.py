@@ -1,8 +1,17 @@
+import json
+import pickle
 import sys
+from copy import deepcopy
+from threading import Barrier
 from mock import patch, MagicMock
 
+from morfdict.tests.base import FactoryTestCase
 from morfdict.tests.base import TestCase
 from morfdict import Factory
+from morfdict import LayeredDict
+from morfdict import Paths
+from morfdict import StringDict
+from morfdict.factory import ParallelError
 
 
 class FactoryTest(TestCase):
@@ -147,3 +156,278 @@ class FactoryTest(TestCase):
             self.assertTrue('os' in sys.modules)
             import os
             self.assertTrue(module is os)
+
+
+class FakeModule(object):
+
+    def __init__(self, calls, modulename, **values):
+        self.calls = calls
+        self.modulename = modulename
+        self.values = values
+
+    def make_settings(self, settings, paths):
+        self.calls.append(self.modulename)
+        for key, value in self.values.items():
+            settings[key] = value
+        paths.set(self.modulename, self.modulename)
+
+
+class LazyFactoryTest(FactoryTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.modules = {
+            'default': FakeModule(
+                self.calls, 'default', name='default', url='%(host)s/db'),
+            'db': FakeModule(self.calls, 'db', host='dbhost'),
+            'local': FakeModule(self.calls, 'local', name='local'),
+        }
+        self.factory.declare_keys('default', ['name', 'url'])
+        self.factory.declare_keys('db', ['host'])
+        self.factory.declare_keys('local', ['name'])
+
+    def make_settings(self):
+        return self.factory.make_settings(
+            additional_modules=[('db', True), ('local', True)], lazy=True)
+
+    def test_nothing_run(self):
+        self.make_settings()
+        self.assertEqual([], self.calls)
+
+    def test_run_needed_modules(self):
+        settings, paths = self.make_settings()
+        self.assertEqual('dbhost/db', settings['url'])
+        self.assertEqual(['default', 'db'], self.calls)
+
+    def test_override_order(self):
+        settings, paths = self.make_settings()
+        self.assertEqual('local', settings['name'])
+        self.assertEqual(['default', 'db', 'local'], self.calls)
+        self.assertEqual(StringDict, type(settings))
+        self.assertEqual(Paths, type(paths))
+
+    def test_undeclared_module(self):
+        del self.factory.manifests['db']
+        settings, paths = self.make_settings()
+        self.assertRaises(KeyError, lambda: settings['missing'])
+        self.assertEqual(['default', 'db'], self.calls)
+
+    def test_set_after_modules(self):
+        settings, paths = self.make_settings()
+        settings['name'] = 'mine'
+        settings['other'] = {'key': 'value'}
+        self.assertEqual('mine', settings['name'])
+        self.assertEqual(StringDict, type(settings['other']))
+
+    def test_paths(self):
+        settings, paths = self.make_settings()
+        self.assertEqual('db', paths.get('db'))
+        self.assertEqual(['default', 'db', 'local'], self.calls)
+
+    def test_get_path(self):
+        settings, paths = self.make_settings()
+        self.assertEqual('dbhost/db', settings.get_path('url'))
+        self.assertEqual(['default', 'db'], self.calls)
+
+    def test_to_dict(self):
+        settings, paths = self.make_settings()
+        self.assertEqual(
+            {'name': 'local', 'url': 'dbhost/db', 'host': 'dbhost'},
+            settings.to_dict())
+
+    def test_nested_reads_parent_key(self):
+        self.modules['default'].values['db'] = {'url': 'pg://%(host)s'}
+        self.factory.declare_keys('default', ['name', 'url', 'db'])
+        settings, paths = self.make_settings()
+        self.assertEqual('pg://dbhost', settings['db']['url'])
+        self.assertEqual(['default', 'db'], self.calls)
+
+    def test_raw_get(self):
+        settings, paths = self.make_settings()
+        self.assertEqual('%(host)s/db', settings._raw_get('url'))
+        self.assertEqual(['default'], self.calls)
+
+    def test_deepcopy(self):
+        settings, paths = self.make_settings()
+        copied = deepcopy(settings)
+        self.assertEqual(['default', 'db', 'local'], self.calls)
+        self.assertEqual(StringDict, type(copied))
+        self.assertEqual('dbhost/db', copied['url'])
+
+    def test_pickle(self):
+        settings, paths = self.make_settings()
+        loaded = pickle.loads(pickle.dumps(settings))
+        self.assertEqual(StringDict, type(loaded))
+        self.assertEqual('local', loaded['name'])
+
+    def test_json(self):
+        settings, paths = self.make_settings()
+        settings['project'] = 'app'
+        self.assertEqual(
+            {'project': 'app', 'name': 'local', 'url': 'dbhost/db',
+             'host': 'dbhost'},
+            json.loads(json.dumps(settings)))
+
+
+class LayeredFactoryTest(FactoryTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.modules = {
+            'default': FakeModule(
+                self.calls, 'default', name='default', url='%(host)s/db'),
+            'local': FakeModule(self.calls, 'local', name='local'),
+        }
+
+    def test_layers(self):
+        settings, paths = self.factory.make_settings(
+            {'host': 'init'}, [('local', True)], layered=True)
+
+        self.assertEqual(LayeredDict, type(settings))
+        self.assertEqual(
+            ['init', 'default', 'local'], settings.layer_names())
+        self.assertEqual('local', settings.which_layer('name'))
+        self.assertEqual('init/db', settings['url'])
+
+        settings.remove_layer('local')
+        self.assertEqual('default', settings['name'])
+
+
+class BarrierModule(FakeModule):
+
+    def __init__(self, barrier, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.barrier = barrier
+
+    def make_settings(self, settings, paths):
+        self.barrier.wait()
+        super().make_settings(settings, paths)
+
+
+class ParentModule(FakeModule):
+
+    def make_settings(self, settings, paths):
+        super().make_settings(settings, paths)
+        settings.append_parent(StringDict({'region': 'eu'}))
+        settings['db'].append_parent(StringDict({'user': 'admin'}))
+        settings['db'].append_parent(settings['pool'])
+
+
+class ObserverModule(FakeModule):
+
+    def make_settings(self, settings, paths):
+        super().make_settings(settings, paths)
+        settings.add_observer(lambda change: None)
+
+
+class ParallelFactoryTest(FactoryTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.modules = {
+            'default': FakeModule(
+                self.calls, 'default', name='default', url='%(host)s/db',
+                db={'port': 5432}),
+            'certs': FakeModule(self.calls, 'certs', certs='bundle'),
+            'plugins': FakeModule(self.calls, 'plugins', plugins='a,b'),
+            'local': FakeModule(self.calls, 'local', name='local'),
+        }
+        self.factory.declare_keys('default', ['name', 'url', 'db'], reads=[])
+        self.factory.declare_keys('certs', ['certs'], reads=[])
+        self.factory.declare_keys('plugins', ['plugins'], reads=['name'])
+        self.factory.declare_keys('local', ['name'], reads=[])
+        self.additional = [
+            ('certs', True), ('plugins', True), ('local', True),
+            ('missing', False)]
+
+    def test_dependencies(self):
+        self.assertEqual({
+            'default': [],
+            'certs': [],
+            'plugins': ['default'],
+            'local': ['default'],
+            'missing': ['default', 'certs', 'plugins', 'local'],
+        }, self.factory.get_dependencies(
+            ['default', 'certs', 'plugins', 'local', 'missing']))
+
+    def test_same_as_serial(self):
+        settings, paths = self.factory.make_settings(
+            {'host': 'init', 'db': {'host': 'db1'}}, self.additional,
+            workers=4)
+
+        self.assertEqual(StringDict, type(settings))
+        self.assertEqual({
+            'host': 'init',
+            'name': 'local',
+            'url': 'init/db',
+            'certs': 'bundle',
+            'plugins': 'a,b',
+            'db': {'host': 'db1', 'port': 5432},
+        }, settings.to_dict())
+        self.assertEqual(
+            ['module_root', 'default', 'certs', 'plugins', 'local'],
+            list(paths.to_dict()))
+        self.assertEqual('local', paths.get('local'))
+
+    def test_concurrent(self):
+        barrier = Barrier(2, timeout=5)
+        self.modules['default'] = BarrierModule(
+            barrier, self.calls, 'default', name='default')
+        self.modules['certs'] = BarrierModule(
+            barrier, self.calls, 'certs', certs='bundle')
+
+        settings, paths = self.factory.make_settings(
+            {}, self.additional, workers=2)
+
+        self.assertEqual('bundle', settings['certs'])
+        self.assertEqual('local', settings['name'])
+        self.assertEqual(['local', 'plugins'], sorted(self.calls[2:]))
+
+    def test_layered(self):
+        settings, paths = self.factory.make_settings(
+            {'host': 'init'}, self.additional, workers=2, layered=True)
+
+        self.assertEqual(LayeredDict, type(settings))
+        self.assertEqual(
+            ['init', 'default', 'certs', 'plugins', 'local', 'missing'],
+            settings.layer_names())
+        self.assertEqual('local', settings.which_layer('name'))
+        self.assertEqual('init/db', settings['url'])
+
+    def test_error(self):
+        self.additional[-1] = ('missing', True)
+        self.assertRaises(
+            ImportError, self.factory.make_settings, {}, self.additional,
+            workers=2)
+
+    def assert_parents(self, settings):
+        self.assertEqual('eu', settings['region'])
+        self.assertEqual('eu/a,b', settings['plugins'])
+        self.assertEqual('admin', settings['db']['user'])
+        self.assertEqual(10, settings['db']['size'])
+
+    def test_parents(self):
+        self.modules['default'] = ParentModule(
+            self.calls, 'default', name='default', db={'port': 5432},
+            pool={'size': 10})
+        self.modules['plugins'] = FakeModule(
+            self.calls, 'plugins', plugins='%(region)s/a,b')
+
+        settings, paths = self.factory.make_settings(
+            {}, self.additional, workers=4)
+        self.assert_parents(settings)
+        settings['pool']['size'] = 20
+        self.assertEqual(20, settings['db']['size'])
+
+        settings, paths = self.factory.make_settings(
+            {}, self.additional, workers=4, layered=True)
+        self.assert_parents(settings)
+
+        settings, paths = self.factory.make_settings({}, self.additional)
+        self.assert_parents(settings)
+
+    def test_observers(self):
+        self.modules['certs'] = ObserverModule(self.calls, 'certs')
+        self.assertRaises(
+            ParallelError, self.factory.make_settings, {}, self.additional,
+            workers=2)
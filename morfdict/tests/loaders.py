@@ -0,0 +1,174 @@
+import os
+from io import StringIO
+
+from mock import patch
+
+from .base import TempDirTestCase
+from morfdict import Factory
+from morfdict import LayeredDict
+from morfdict import StringDict
+from morfdict.export import write_env
+from morfdict.loaders import LoaderError
+from morfdict.loaders import build_settings
+from morfdict.loaders import load_file
+from morfdict.loaders import parse_env
+from morfdict.loaders import parse_ini
+from morfdict.loaders import read_file
+from morfdict.template import Template
+
+JSON = '''
+{"name": "app", "url": "http://%(name)s", "db": {"dsn": "%(url)s/db"}}
+'''
+
+TOML = '''
+name = "app"
+url = "http://%(name)s"
+
+[db]
+dsn = "%(url)s/db"
+port = 5432
+'''
+
+INI = '''
+[DEFAULT]
+name = app
+url = http://%(name)s
+
+[db]
+dsn = %(url)s/db
+Name = db
+'''
+
+ENV = '''
+# comment
+NAME=app
+export URL="http://%(name)s"
+QUOTED='a "b"'
+ESCAPED="a\\nb \\"c\\""
+'''
+
+
+class LoadersTest(TempDirTestCase):
+
+    def test_build_settings(self):
+        settings = build_settings({
+            'name': 'app',
+            'url': 'http://%(name)s',
+            'db': {'dsn': '%(url)s/db', 'options': {'a': 1}},
+        })
+        self.assertEqual(Template, type(dict.get(settings, 'url')))
+        self.assertEqual('http://app/db', settings['db']['dsn'])
+        self.assertEqual(1, settings['db']['options']['a'])
+        self.assertEqual([settings], settings['db']._parents)
+
+    def test_formats(self):
+        for name, content in [
+            ('settings.json', JSON),
+            ('settings.toml', TOML),
+            ('settings.ini', INI),
+        ]:
+            settings = StringDict()
+            load_file(settings, self.write(name, content))
+            self.assertEqual('http://app/db', settings['db']['dsn'])
+
+    def test_ini(self):
+        data = parse_ini(StringIO(INI))
+        self.assertEqual({'dsn': '%(url)s/db', 'Name': 'db'}, data['db'])
+
+    def test_env(self):
+        data = parse_env(StringIO(ENV))
+        self.assertEqual({
+            'NAME': 'app',
+            'URL': 'http://%(name)s',
+            'QUOTED': 'a "b"',
+            'ESCAPED': 'a\nb "c"',
+        }, data)
+        self.assertRaises(LoaderError, parse_env, StringIO('wrong line'))
+
+    def test_env_round_trip(self):
+        stream = StringIO()
+        write_env(StringDict({'a': 'x y', 'b': 'c"d\\e', 'c': 1}), stream)
+        self.assertEqual(
+            {'A': 'x y', 'B': 'c"d\\e', 'C': '1'},
+            parse_env(StringIO(stream.getvalue())))
+
+    def test_unknown_format(self):
+        filename = self.write('settings.xml', '')
+        self.assertRaises(LoaderError, read_file, filename)
+        self.assertEqual({'a': '1'}, read_file(
+            self.write('settings.txt', 'a=1'), 'env'))
+
+    def test_not_dict(self):
+        filename = self.write('list.json', '[]')
+        self.assertRaises(LoaderError, read_file, filename)
+
+    def test_cache(self):
+        filename = self.write('settings.json', JSON)
+        data = read_file(filename)
+        self.assertTrue(data is read_file(filename))
+
+        self.write('settings.json', '{"name": "changed"}')
+        self.assertEqual({'name': 'changed'}, read_file(filename))
+
+    def test_cached_lists_not_shared(self):
+        filename = self.write(
+            'settings.json', '{"hosts": ["a"], "db": {"hosts": ["a"]}}')
+        first = StringDict()
+        load_file(first, filename)
+        first['hosts'].append('b')
+        first['db']['hosts'].append('b')
+
+        second = StringDict()
+        load_file(second, filename)
+        self.assertEqual(['a'], second['hosts'])
+        self.assertEqual(['a'], second['db']['hosts'])
+
+    def test_merge_nested(self):
+        settings = StringDict({'db': {'host': 'localhost', 'dsn': 'old'}})
+        load_file(settings, self.write('settings.json', JSON))
+        self.assertEqual('localhost', settings['db']['host'])
+        self.assertEqual('http://app/db', settings['db']['dsn'])
+
+    def test_layered(self):
+        settings = LayeredDict()
+        with settings.layer('file'):
+            load_file(settings, self.write('settings.json', JSON))
+        self.assertEqual('http://app/db', settings['db']['dsn'])
+        self.assertEqual('file', settings['db'].which_layer('dsn'))
+
+
+class FactoryFilesTest(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.factory = Factory('main_modulepath', 'settings_modulepath')
+        self.patcher = patch.object(self.factory, '_import_wrapper')
+        self.patcher.start()
+        self.factory._import_wrapper.return_value.__file__ = '/one/two.py'
+        self.factory.run_module = lambda name: None
+        self.factory.add_file(self.write('settings.json', JSON))
+        self.factory.add_file(self.write('local.env', 'name=local'))
+        self.factory.add_file(
+            os.path.join(self.root, 'missing.json'), required=False)
+
+    def tearDown(self):
+        self.patcher.stop()
+        super().tearDown()
+
+    def test_files(self):
+        settings, paths = self.factory.make_settings({'name': 'init'})
+        self.assertEqual('http://local/db', settings['db']['dsn'])
+
+    def test_required(self):
+        self.factory.add_file(os.path.join(self.root, 'missing.toml'))
+        self.assertRaises(FileNotFoundError, self.factory.make_settings)
+
+    def test_lazy(self):
+        settings, paths = self.factory.make_settings(lazy=True)
+        self.assertEqual('local', settings['name'])
+
+    def test_layered(self):
+        settings, paths = self.factory.make_settings(layered=True)
+        self.assertEqual(
+            '<file>' + os.path.join(self.root, 'local.env'),
+            settings.which_layer('name'))
@@ -1,10 +1,26 @@
+import pickle
+from copy import copy
+from copy import deepcopy
+from mock import MagicMock
 from mock import patch
 from os import sep
+from threading import Barrier
+from threading import Event
+from threading import Thread
 
 from .base import TestCase
+from morfdict import CachedStringDict
+from morfdict import FrozenDict
+from morfdict import LayeredDict
 from morfdict import Paths
 from morfdict import StringDict
 from morfdict.models import EnvirontmentValueMissing
+from morfdict.models import EMPTY
+from morfdict.models import FrozenDictError
+from morfdict.models import LayerError
+from morfdict.models import NO_PARENTS
+from morfdict.models import PathElement
+from morfdict.models import PathGeneratorElement
 
 
 class StringDictTest(TestCase):
@@ -161,6 +177,16 @@ class ParrentsTest(TestCase):
 
 class PathsTest(TestCase):
 
+    def test_cyclic_parent(self):
+        paths = Paths()
+        paths.set('a', 'x', 'a')
+        self.assertRaises(RecursionError, paths.get, 'a')
+
+        paths.set('a', 'x', 'b')
+        paths.set('b', 'y', 'a')
+        self.assertRaises(RecursionError, paths.get, 'b')
+        self.assertEqual(2, len(paths.get_errors()))
+
     def test_get_set(self):
         paths = Paths()
         paths.set('mypath', 'elo')
@@ -386,3 +412,641 @@ class StringDictEnvTest(TestCase):
             assert False
         except EnvirontmentValueMissing as error:
             assert error.message == 'Environtment "NAME" value missing'
+
+
+class CachedStringDictTest(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.data = CachedStringDict({
+            'host': 'localhost',
+            'port': '5432',
+            'address': '%(host)s:%(port)s',
+            'url': 'db://%(address)s',
+            'name': 'app',
+        })
+
+    def test_interpolation(self):
+        self.assertEqual('db://localhost:5432', self.data['url'])
+
+    def test_cached_read(self):
+        self.data['url']
+        with patch.object(StringDict, '_default_morf') as default_morf:
+            self.assertEqual('db://localhost:5432', self.data['url'])
+            self.assertFalse(default_morf.called)
+
+    def test_invalidate_dependants(self):
+        self.assertEqual('db://localhost:5432', self.data['url'])
+        self.data['name']
+        self.data['port'] = '5433'
+
+        self.assertEqual({'host', 'name'}, set(self.data._cache))
+        self.assertEqual('db://localhost:5433', self.data['url'])
+
+    def test_set_morf(self):
+        self.data['url']
+        self.data.set_morf('host', lambda obj, value: value.upper())
+        self.assertEqual('db://LOCALHOST:5432', self.data['url'])
+
+    def test_parent_change(self):
+        self.data['child'] = {'url': '%(address)s/child'}
+        self.assertEqual('localhost:5432/child', self.data['child']['url'])
+
+        self.data['host'] = 'remote'
+        self.assertEqual('remote:5432/child', self.data['child']['url'])
+
+    def test_append_parent(self):
+        child = CachedStringDict({'url': '%(host)s/child'})
+        self.assertRaises(KeyError, lambda: child['url'])
+
+        child.append_parent(self.data)
+        self.assertEqual('localhost/child', child['url'])
+
+    def test_merge(self):
+        self.data['url']
+        self.data.merge(CachedStringDict({'host': 'merged'}))
+        self.assertEqual('db://merged:5432', self.data['url'])
+
+    def test_delete(self):
+        self.data['child'] = {'host': 'childhost', 'url': '%(host)s'}
+        self.assertEqual('childhost', self.data['child']['url'])
+
+        del self.data['child']['host']
+        self.assertEqual('localhost', self.data['child']['url'])
+
+    def test_string_dict_parent(self):
+        parent = StringDict({'y': '1', 'x': '%(y)s', 'z': '%(x)s!'})
+        child = CachedStringDict()
+        child.append_parent(parent)
+        self.assertEqual('1!', child['z'])
+        self.assertEqual('1', child['x'])
+
+        parent['y'] = '2'
+        self.assertEqual('2', child['x'])
+        self.assertEqual('2!', child['z'])
+
+    def test_concurrent_reads(self):
+        # x starts first and reads y while z is being read in other thread
+        started = Event()
+        barriers = [Barrier(2, timeout=5), Barrier(2, timeout=5)]
+
+        def read_y(obj, value):
+            if barriers:
+                started.set()
+                barriers[0].wait()
+                value = obj['y']
+                barriers[1].wait()
+                return value
+            return obj['y']
+
+        def wait(obj, value):
+            barriers[0].wait()
+            barriers[1].wait()
+            return value
+
+        self.data.update(x='x', y='1', z='z')
+        self.data.set_morf('x', read_y)
+        self.data.set_morf('z', wait)
+        first = Thread(target=self.data.__getitem__, args=('x',))
+        first.start()
+        started.wait(5)
+        second = Thread(target=self.data.__getitem__, args=('z',))
+        second.start()
+        first.join()
+        second.join()
+        barriers.clear()
+
+        self.assertEqual({'y': {'x'}}, self.data._dependants)
+        self.assertEqual('1', self.data['x'])
+        self.data['y'] = '2'
+        self.assertEqual('2', self.data['x'])
+
+    def test_error_not_cached(self):
+        self.data['broken'] = '%(missing)s'
+        self.assertRaises(KeyError, lambda: self.data['broken'])
+
+        self.data['missing'] = 'found'
+        self.assertEqual('found', self.data['broken'])
+
+    def test_only_readers_told(self):
+        settings = StringDict({'name': 'app', 'one': {}, 'two': {}})
+        self.assertEqual('app', settings['one']['name'])
+        self.assertEqual({'name': {id(settings['one'])}}, settings._readers)
+
+        with patch.object(StringDict, '_forget') as forget:
+            forget.side_effect = lambda keys: keys
+            settings['name'] = 'new'
+        self.assertEqual(2, forget.call_count)
+        self.assertEqual({}, settings._readers)
+        self.assertEqual('new', settings['one']['name'])
+
+
+class FreezeTest(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.data = StringDict({
+            'host': 'localhost',
+            'url': 'db://%(host)s',
+            'db': {'name': 'app', 'dsn': '%(url)s/%(name)s'},
+        })
+        self.data.set_morf('host', lambda obj, value: value.upper())
+        self.frozen = self.data.freeze()
+
+    def test_values(self):
+        self.assertEqual('LOCALHOST', self.frozen['host'])
+        self.assertEqual('db://LOCALHOST', self.frozen['url'])
+        self.assertEqual('db://LOCALHOST/app', self.frozen['db']['dsn'])
+        self.assertTrue(isinstance(self.frozen['db'], FrozenDict))
+
+    def test_unreadable_parent_key(self):
+        self.data.append_parent({'discount': '100%'})
+        self.assertEqual([], self.data.get_errors())
+        frozen = self.data.freeze()
+        self.assertEqual(self.data.to_dict(), frozen.to_dict())
+        self.assertRaises(KeyError, lambda: frozen['discount'])
+
+    def test_copy(self):
+        for frozen in [
+            copy(self.frozen), deepcopy(self.frozen),
+            pickle.loads(pickle.dumps(self.frozen)),
+        ]:
+            self.assertTrue(isinstance(frozen, FrozenDict))
+            self.assertEqual(self.frozen.to_dict(), frozen.to_dict())
+            self.assertEqual('db://LOCALHOST', frozen['db']['url'])
+
+    def test_inherited(self):
+        self.assertEqual('db://LOCALHOST', self.frozen['db']['url'])
+        self.assertEqual('db://LOCALHOST', self.frozen['db'].get('url'))
+        self.assertEqual(['dsn', 'name'], sorted(self.frozen['db']))
+        self.assertRaises(KeyError, lambda: self.frozen['db']['missing'])
+
+    def test_get(self):
+        self.assertEqual('LOCALHOST', self.frozen.get('host'))
+        self.assertEqual('default', self.frozen.get('missing', 'default'))
+
+    def test_items_and_to_dict(self):
+        self.assertEqual(self.data.to_dict(), self.frozen.to_dict())
+        self.assertEqual(
+            dict(self.data['db'].items()), dict(self.frozen['db'].items()))
+
+    def test_snapshot(self):
+        self.data['host'] = 'remote'
+        self.assertEqual('db://LOCALHOST', self.frozen['url'])
+
+    def test_readonly(self):
+        def assign():
+            self.frozen['host'] = 'remote'
+
+        self.assertRaises(FrozenDictError, assign)
+        self.assertRaises(FrozenDictError, self.frozen['db'].pop, 'name')
+        self.assertRaises(FrozenDictError, self.frozen.update, {})
+        self.assertRaises(FrozenDictError, self.frozen.merge, self.data)
+
+    def test_parent_cycle(self):
+        parent = StringDict({'name': 'parent'})
+        child = StringDict({'value': '%(name)s child'})
+        child.append_parent(parent, 'child')
+
+        frozen = parent.freeze()
+        self.assertEqual('parent child', frozen['child']['value'])
+        self.assertTrue(frozen['child']['child'] is frozen['child'])
+
+    def test_error(self):
+        self.data['broken'] = '%(missing)s'
+        self.assertRaises(KeyError, self.data.freeze)
+
+    def test_wide(self):
+        data = StringDict({
+            'key{0}'.format(index): {'a': 'x', 'b': '%(a)s y'}
+            for index in range(500)})
+        frozen = data.freeze()
+        self.assertEqual('x y', frozen['key1']['b'])
+        self.assertTrue(frozen['key1']['key2'] is frozen['key2'])
+        self.assertEqual({}, dict(frozen['key1']._inherited))
+
+    def test_not_morfdict_parent(self):
+        child = StringDict({'name': 'child'})
+        child.append_parent({'greeting': 'hello %(name)s'})
+        child.set_morf('url', lambda obj, value: value.upper())
+        self.data['child'] = child
+
+        frozen = self.data.freeze()['child']
+        self.assertEqual('hello child', frozen['greeting'])
+        self.assertEqual('DB://LOCALHOST', frozen['url'])
+        self.assertEqual(
+            {'greeting', 'url'}, set(frozen._inherited))
+
+    def test_parent_errors_skipped(self):
+        self.data['broken'] = '%(missing)s'
+        frozen = self.data['db'].freeze()
+        self.assertEqual('db://LOCALHOST/app', frozen['dsn'])
+        self.assertRaises(KeyError, lambda: frozen['broken'])
+
+
+class ParentIndexTest(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.defaults = StringDict({'name': 'default', 'region': 'eu'})
+        self.region = StringDict({'region': 'us'})
+        self.tenant = StringDict({'tenant': 't1'})
+        self.region.append_parent(self.defaults)
+        self.tenant.append_parent(self.region)
+
+    def test_lookup(self):
+        self.assertEqual('default', self.tenant['name'])
+        self.assertEqual('us', self.tenant['region'])
+        self.assertTrue(self.tenant._owners['name'] is self.region)
+        self.assertTrue(self.region._owners['name'] is self.defaults)
+
+    def test_missing(self):
+        self.assertRaises(KeyError, lambda: self.tenant['missing'])
+        self.assertEqual(None, self.tenant._owners['missing'])
+
+        self.defaults['missing'] = 'found'
+        self.assertEqual('found', self.tenant['missing'])
+
+    def test_owner_changed(self):
+        self.assertEqual('default', self.tenant['name'])
+        self.region['name'] = 'region'
+        self.assertEqual('region', self.tenant['name'])
+
+        del self.region['name']
+        self.assertEqual('default', self.tenant['name'])
+
+    def test_append_parent(self):
+        self.assertRaises(KeyError, lambda: self.tenant['extra'])
+        self.tenant.append_parent(StringDict({'extra': 'value'}))
+        self.assertEqual('value', self.tenant['extra'])
+
+    def test_no_duplicated_parents(self):
+        self.tenant.append_parent(self.region)
+        self.tenant.append_parent(self.tenant)
+        self.assertEqual([self.region], self.tenant._parents)
+
+        data = StringDict()
+        data.merge(self.tenant)
+        data.merge(self.tenant)
+        self.assertEqual(1, len(data._parents))
+        self.assertEqual('default', data['name'])
+
+    def test_morf_error_in_owner(self):
+        self.region['broken'] = '%(nothing)s'
+        self.tenant.append_parent(StringDict({'broken': 'fixed'}))
+        self.assertEqual('fixed', self.tenant['broken'])
+
+    def test_parents_cycle(self):
+        self.defaults.append_parent(self.tenant)
+        self.assertRaises(KeyError, lambda: self.tenant['missing'])
+        self.assertEqual('t1', self.defaults['tenant'])
+
+    def test_not_morfdict_parent(self):
+        environ = {}
+        self.tenant.append_parent(environ)
+        self.assertEqual(None, self.tenant.get('late'))
+        environ['late'] = 'value'
+        self.assertEqual('value', self.tenant['late'])
+
+    def test_not_morfdict_parent_before_owner(self):
+        child = CachedStringDict({'url': 'db://%(host)s'})
+        child.append_parent({'other': 'value'})
+        child.append_parent(self.defaults)
+        self.defaults['host'] = 'a'
+        self.assertEqual('db://a', child['url'])
+
+        self.defaults['host'] = 'b'
+        self.assertEqual('db://b', child['url'])
+        del self.defaults['host']
+        self.assertRaises(KeyError, lambda: child['url'])
+
+    def test_dict_methods(self):
+        self.assertEqual(None, self.tenant.get('extra'))
+        self.defaults.update(extra='update')
+        self.assertEqual('update', self.tenant['extra'])
+
+        self.defaults.pop('extra')
+        self.assertEqual(None, self.tenant.get('extra'))
+        self.defaults.setdefault('extra', 'setdefault')
+        self.assertEqual('setdefault', self.tenant['extra'])
+
+        self.defaults.clear()
+        self.assertEqual(None, self.tenant.get('extra'))
+        self.defaults |= {'extra': 'ior'}
+        self.assertEqual('ior', self.tenant['extra'])
+
+        self.assertEqual(('extra', 'ior'), self.defaults.popitem())
+        self.assertEqual(None, self.tenant.get('extra'))
+
+
+class PathsCacheTest(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.paths = Paths()
+        self.paths.set('base', 'tmp', is_root=True)
+        self.paths.set('home', 'home', 'base')
+        self.paths.set('user', 'user', 'home')
+
+    def test_cached(self):
+        self.assertEqual('/tmp/home/user', self.paths.get('user'))
+        self.assertEqual(
+            {'base': '/tmp', 'home': '/tmp/home', 'user': '/tmp/home/user'},
+            self.paths._cache)
+
+    def test_parent_changed(self):
+        self.paths.to_dict()
+        self.paths.set('home', 'usr', 'base')
+        self.assertEqual({'base': '/tmp'}, self.paths._cache)
+        self.assertEqual('/tmp/usr/user', self.paths.get('user'))
+
+    def test_parent_set_later(self):
+        self.paths.set('child', 'child', 'later')
+        self.assertRaises(KeyError, self.paths.get, 'child')
+
+        self.paths.set('later', 'later', 'base')
+        self.assertEqual('/tmp/later/child', self.paths.get('child'))
+
+    def test_generator_not_cached(self):
+        self.paths.set_generator('gen', lambda paths: 'gen', 'home')
+        self.paths.set('below', 'below', 'gen')
+        self.assertEqual('/tmp/home/gen/below', self.paths.get('below'))
+        self.assertFalse('gen' in self.paths._cache)
+        self.assertFalse('below' in self.paths._cache)
+
+    def test_cacheable_generator(self):
+        generator = MagicMock(return_value='gen')
+        self.paths.set_generator('gen', generator, 'home', cacheable=True)
+
+        self.assertEqual('/tmp/home/gen', self.paths.get('gen'))
+        self.assertEqual('/tmp/home/gen', self.paths.get('gen'))
+        generator.assert_called_once_with(self.paths)
+
+        self.paths.set('home', 'usr', 'base')
+        self.assertEqual('/tmp/usr/gen', self.paths.get('gen'))
+        self.assertEqual(2, generator.call_count)
+
+    def test_children_index(self):
+        self.paths.set('other', 'other', 'base')
+        self.assertEqual(
+            ['home', 'other'],
+            [child.name for child in self.paths.paths['base'].get_childs()])
+
+        self.paths.set('home', 'home')
+        self.assertEqual(
+            ['other'],
+            [child.name for child in self.paths.paths['base'].get_childs()])
+
+    def test_tree_order(self):
+        self.paths.set('other', 'other', 'base')
+        self.paths.set('user', 'user', 'base')
+        self.assertEqual(
+            '''/tmp: #base
+    home: #home
+    user: #user
+    other: #other
+''',
+            self.paths.to_tree())
+
+
+class LayeredDictTest(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.settings = LayeredDict()
+        self.settings.push_layer('default', {
+            'name': 'app',
+            'url': '%(name)s/url',
+            'db': {'host': 'db1', 'port': '5432', 'dsn': '%(name)s@%(host)s'},
+        })
+        self.settings.push_layer('local', {
+            'name': 'local',
+            'db': {'host': 'db2'},
+        })
+
+    def test_read(self):
+        self.assertEqual('local/url', self.settings['url'])
+        self.assertEqual('local@db2', self.settings['db']['dsn'])
+        self.assertEqual({
+            'name': 'local',
+            'url': 'local/url',
+            'db': {'host': 'db2', 'port': '5432', 'dsn': 'local@db2'},
+        }, self.settings.to_dict())
+
+    def test_which_layer(self):
+        self.assertEqual('local', self.settings.which_layer('name'))
+        self.assertEqual('default', self.settings.which_layer('url'))
+        self.assertEqual('local', self.settings['db'].which_layer('host'))
+        self.assertEqual('default', self.settings['db'].which_layer('port'))
+        self.assertRaises(KeyError, self.settings.which_layer, 'missing')
+
+    def test_layers_not_changed(self):
+        local = self.settings.get_layer('local')
+        self.settings['name'] = 'runtime'
+        self.settings['db']['port'] = '1'
+
+        self.assertEqual('runtime', self.settings['url'].split('/')[0])
+        self.assertEqual('runtime', self.settings.which_layer('name'))
+        self.assertEqual(
+            ['default', 'local', 'runtime'], self.settings.layer_names())
+        self.assertEqual('local', local['name'])
+        self.assertEqual(
+            '5432', self.settings.get_layer('default')['db']['port'])
+
+    def test_remove_layer(self):
+        db = self.settings['db']
+        self.settings.remove_layer('local')
+        self.assertEqual('app/url', self.settings['url'])
+        self.assertEqual('app@db1', db['dsn'])
+        self.assertTrue(db is self.settings['db'])
+        self.assertRaises(LayerError, self.settings.remove_layer, 'local')
+
+    def test_swap_layer(self):
+        self.settings['other'] = 'x'
+        self.settings.swap_layer('default', {'name': 'new', 'old': 'y'})
+        self.assertEqual(['name', 'db', 'other', 'old'], list(self.settings))
+        self.assertRaises(KeyError, lambda: self.settings['url'])
+        self.assertEqual('y', self.settings['old'])
+        self.assertEqual({'host': 'db2'}, self.settings['db'].to_dict())
+
+    def test_replaced_by_value(self):
+        self.settings.push_layer('flat', {'db': 'none'})
+        self.assertEqual('none', self.settings['db'])
+        self.settings.remove_layer('flat')
+        self.assertEqual('db2', self.settings['db']['host'])
+
+    def test_layer_context(self):
+        with self.settings.layer('module'):
+            self.settings['name'] = 'module'
+            self.settings['cache'] = {'url': '%(name)s/cache'}
+        self.assertEqual('module/cache', self.settings['cache']['url'])
+        self.assertEqual('module', self.settings.which_layer('cache'))
+        self.assertEqual(
+            ['default', 'local', 'module'], self.settings.layer_names())
+        self.assertRaises(
+            LayerError, self.settings.push_layer, 'module', {})
+
+    def test_morf(self):
+        db = StringDict()
+        db.set_morf('port', lambda obj, value: int(value))
+        self.settings.push_layer('morfs', {'db': db})
+        self.assertEqual(5432, self.settings['db']['port'])
+
+        self.settings.set_morf('name', lambda obj, value: value.upper())
+        self.assertEqual('LOCAL/url', self.settings['url'])
+        self.settings.del_morf('name')
+        self.assertEqual('local/url', self.settings['url'])
+
+    def test_del(self):
+        self.settings['extra'] = 'x'
+        del self.settings['extra']
+        self.assertFalse('extra' in self.settings)
+        self.assertRaises(LayerError, self.settings.__delitem__, 'name')
+        self.assertRaises(KeyError, self.settings.__delitem__, 'missing')
+
+    def test_copy_tree(self):
+        self.settings['extra'] = 'x'
+        copy = self.settings._copy_tree()
+        copy['extra'] = 'y'
+        self.assertEqual('x', self.settings['extra'])
+        self.assertEqual('local@db2', copy['db']['dsn'])
+        self.assertTrue(
+            copy.get_layer('local') is self.settings.get_layer('local'))
+
+
+class NestedAccessTest(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.settings = StringDict({
+            'name': 'app',
+            'db': {
+                'replicas': {'primary': {'host': '%(name)s-db'}},
+                'broken': '%(missing)s',
+            },
+        })
+
+    def test_get_path(self):
+        self.assertEqual(
+            'app-db', self.settings.get_path('db.replicas.primary.host'))
+        self.assertEqual(
+            'app-db',
+            self.settings.get_path(('db', 'replicas', 'primary', 'host')))
+        self.assertEqual('app', self.settings.get_path('db.replicas.name'))
+        self.assertEqual('app', self.settings.get_path('name'))
+
+    def test_get_path_missing(self):
+        self.assertEqual(None, self.settings.get_path('db.missing.host'))
+        self.assertEqual(1, self.settings.get_path('db.missing', 1))
+        self.assertEqual(1, self.settings.get_path('name.host', 1))
+
+    def test_get_path_error(self):
+        self.assertRaises(KeyError, self.settings.get_path, 'db.broken')
+
+    def test_morfed_dict(self):
+        self.settings['other'] = {'host': 'other'}
+        self.settings.set_morf(
+            'db', lambda obj, value: obj._raw_get('other'))
+        self.assertEqual('other', self.settings.get_path('db.host'))
+
+    def test_get_many(self):
+        self.assertEqual(
+            ['app-db', None, 'app'],
+            self.settings.get_many([
+                'db.replicas.primary.host',
+                'db.replicas.missing.host',
+                'name',
+            ]))
+
+    def test_accessor(self):
+        host = self.settings.accessor('db.replicas.primary.host')
+        self.assertEqual('app-db', host())
+        self.settings['db']['replicas'] = {'primary': {'host': 'new'}}
+        self.assertEqual('new', host())
+        self.assertEqual('x', self.settings.accessor('db.missing', 'x')())
+
+    def test_accessor_keeps_node(self):
+        host = self.settings.accessor('db.replicas.primary.host')
+        host()
+        with patch.object(StringDict, '_get_child') as get_child:
+            self.assertEqual('app-db', host())
+            self.assertFalse(get_child.called)
+
+        primary = self.settings['db']['replicas']['primary']
+        primary['host'] = 'changed'
+        self.assertEqual('changed', host())
+
+        del self.settings['db']['replicas']['primary']
+        self.assertEqual(None, host())
+        self.settings['db']['replicas']['primary'] = {'host': 'new'}
+        self.assertEqual('new', host())
+        self.settings['db'].pop('replicas')
+        self.assertEqual(None, host())
+
+        self.settings['db'] = {'replicas': {'primary': {'host': 'db'}}}
+        self.assertEqual('db', host())
+
+    def test_accessor_morfed_dict(self):
+        self.settings['other'] = {'host': 'other'}
+        host = self.settings.accessor('db.host')
+        self.assertEqual(None, host())
+        self.settings.set_morf(
+            'db', lambda obj, value: obj._raw_get('other'))
+        self.assertEqual('other', host())
+        self.settings['other']['host'] = 'changed'
+        self.assertEqual('changed', host())
+
+    def test_frozen(self):
+        del self.settings['db']['broken']
+        frozen = self.settings['db'].freeze()
+        self.assertEqual('app-db', frozen.get_path('replicas.primary.host'))
+        self.assertEqual('app', frozen.get_path('replicas.name'))
+        self.assertEqual(None, frozen.get_path('replicas.missing.host'))
+        self.assertEqual('app', frozen.accessor('name')())
+
+
+class CompactLayoutTest(TestCase):
+
+    def test_no_instance_dict(self):
+        for obj in [
+            StringDict(),
+            CachedStringDict(),
+            StringDict().freeze(),
+            PathElement('name', ['value']),
+            PathGeneratorElement('name', lambda paths: 'value'),
+        ]:
+            self.assertFalse(hasattr(obj, '__dict__'))
+
+    def test_shared_until_used(self):
+        first = StringDict({'child': {}})
+        second = StringDict()
+        self.assertTrue(first._morf is second._morf is EMPTY)
+        self.assertTrue(second._parents is NO_PARENTS)
+        self.assertEqual(None, second._children)
+
+        second.set_morf('key', lambda obj, value: value)
+        self.assertFalse(first._morf is second._morf)
+        self.assertTrue(first._morf is EMPTY)
+        self.assertEqual([first], first['child']._parents)
+
+    def test_deepcopy(self):
+        obj = StringDict({'key': 'value', 'child': {'name': '%(key)s'}})
+        copy = deepcopy(obj)
+        self.assertEqual('value', copy['child']['name'])
+        self.assertTrue(copy._morf is EMPTY)
+
+    def test_pickle(self):
+        for cls in [StringDict, CachedStringDict, LayeredDict]:
+            obj = pickle.loads(pickle.dumps(cls(
+                {'key': 'value', 'child': {'name': '%(key)s'}})))
+            self.assertEqual('value', obj['child']['name'])
+            obj['key'] = 'changed'
+            self.assertEqual('changed', obj['child']['name'])
+
+    def test_empty_is_read_only(self):
+        self.assertRaises(TypeError, EMPTY.__setitem__, 'key', 'value')
+        self.assertRaises(TypeError, EMPTY.update, key='value')
+        self.assertEqual({}, EMPTY)
+
+    def test_del_morf_missing(self):
+        self.assertRaises(KeyError, StringDict().del_morf, 'key')
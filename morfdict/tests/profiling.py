@@ -0,0 +1,82 @@
+from .base import TestCase
+from morfdict import CachedStringDict
+from morfdict import StringDict
+from morfdict.profiling import Profiler
+
+
+class ProfilerTest(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.settings = StringDict({
+            'name': 'app',
+            'unused': 'nothing',
+            'url': 'db://%(name)s',
+            'db': {'dsn': '%(url)s/main', 'child': {}},
+        })
+        self.profiler = Profiler()
+
+    def test_no_class_change_when_disabled(self):
+        self.assertEqual(StringDict, type(self.settings))
+        with self.profiler.start(self.settings):
+            self.assertNotEqual(StringDict, type(self.settings))
+            self.assertNotEqual(StringDict, type(self.settings['db']))
+        self.assertEqual(StringDict, type(self.settings))
+        self.assertEqual(StringDict, type(self.settings['db']))
+
+    def test_reads(self):
+        with self.profiler.start(self.settings):
+            self.settings['url']
+            self.settings['url']
+            self.settings['db']['dsn']
+
+        stats = self.profiler.stats
+        self.assertEqual(3, stats['url'].reads)
+        self.assertEqual(1, stats['db.url'].reads)
+        self.assertEqual(1, stats['db.dsn'].reads)
+        self.assertEqual(3, stats['name'].reads)
+        self.assertTrue(stats['url'].time >= stats['url'].lookup_time)
+
+    def test_parent_hits(self):
+        with self.profiler.start(self.settings):
+            self.settings['db']['child']['name']
+
+        stats = self.profiler.stats['db.child.name']
+        self.assertEqual(1, stats.parent_hits)
+        self.assertEqual(2, stats.max_depth)
+
+    def test_report(self):
+        with self.profiler.start(self.settings):
+            self.settings['db']['dsn']
+            self.settings['name']
+
+        report = self.profiler.report()
+        self.assertEqual('name', report[0]['key'])
+        self.assertEqual(
+            ['db', 'db.dsn', 'db.url', 'name', 'url'],
+            sorted(item['key'] for item in report))
+        self.assertEqual(['name'], self.profiler.hot_keys(1))
+        self.assertEqual(
+            ['db.child', 'unused'], self.profiler.dead_keys(self.settings))
+
+    def test_hook(self):
+        calls = []
+        profiler = Profiler(hook=lambda key, elapsed: calls.append(key))
+        with profiler.start(self.settings):
+            self.settings['url']
+        self.assertEqual(['name', 'url'], calls)
+
+    def test_new_child(self):
+        with self.profiler.start(self.settings):
+            self.settings['new'] = {'key': 'value'}
+            self.settings['new']['key']
+        self.assertEqual(1, self.profiler.stats['new.key'].reads)
+        self.assertEqual(StringDict, type(self.settings['new']))
+
+    def test_cached(self):
+        settings = CachedStringDict({'name': 'app', 'url': '%(name)s'})
+        with self.profiler.start(settings):
+            settings['url']
+            settings['url']
+        self.assertEqual(2, self.profiler.stats['url'].reads)
+        self.assertEqual(CachedStringDict, type(settings))
@@ -0,0 +1,153 @@
+import os
+import time
+from importlib import import_module
+
+from .base import PackageTestCase
+from .base import TestCase
+from morfdict import Factory
+from morfdict.reload import Layer
+from morfdict.reload import apply_layer
+from morfdict.reload import diff_settings
+from morfdict.versioned import VersionedSettings
+from morfdict import StringDict
+
+CALLS = '''
+CALLS = []
+'''
+
+DEFAULT = '''
+from reloadpkg.calls import CALLS
+
+CALLS.append('default')
+
+
+def make_settings(settings, paths):
+    settings['name'] = 'app'
+    settings['url'] = 'db://%(name)s'
+    settings['db'] = {{'host': '{0}', 'dsn': '%(url)s@%(host)s'}}
+    paths.set('data', 'data', 'module_root')
+'''
+
+LOCAL = '''
+from reloadpkg.calls import CALLS
+
+CALLS.append('local')
+
+
+def make_settings(settings, paths):
+    settings['name'] = '{0}'
+    paths.set('{1}', 'local', 'data')
+'''
+
+
+class DiffTest(TestCase):
+
+    def test_diff_and_apply(self):
+        before = StringDict({'a': '1', 'b': '2', 'c': {'d': '3', 'e': '4'}})
+        after = StringDict({'a': '1', 'c': {'d': '5', 'e': '4'}, 'f': {}})
+        after.set_morf('a', lambda obj, value: int(value))
+
+        layer = diff_settings(before, after)
+
+        self.assertEqual({'b', 'c.d', 'f', 'a'}, layer.keys())
+        apply_layer(layer, before)
+        self.assertEqual(
+            {'a': 1, 'c': {'d': '5', 'e': '4'}, 'f': {}}, before.to_dict())
+
+    def test_no_changes(self):
+        before = StringDict({'a': '%(b)s', 'b': {'c': '1'}})
+        layer = diff_settings(before, before._copy_tree())
+        self.assertFalse(layer)
+        self.assertEqual(Layer().keys(), layer.keys())
+
+
+class ReloaderTest(PackageTestCase):
+    package = 'reloadpkg'
+
+    def setUp(self):
+        super().setUp()
+        self.write('reloadpkg/__init__.py', '')
+        self.write('reloadpkg/calls.py', CALLS)
+        self.write('reloadpkg/settings/__init__.py', '')
+        self.write('reloadpkg/settings/default.py', DEFAULT.format('db1'))
+        self.write('reloadpkg/settings/local.py', LOCAL.format('local', 'a'))
+        self.calls = import_module('reloadpkg.calls').CALLS
+        self.changes = []
+        self.factory = Factory('reloadpkg')
+        self.settings, self.paths = self.factory.make_settings(watch=True)
+        self.reloader = self.factory.reloader
+        self.reloader.subscribe(
+            lambda keys, paths: self.changes.append((keys, paths)))
+
+    def tearDown(self):
+        self.reloader.stop()
+        super().tearDown()
+
+    def test_build(self):
+        self.assertEqual(['default', 'local'], self.calls)
+        self.assertEqual('db://local@db1', self.settings['db']['dsn'])
+        self.assertTrue(self.paths.get('a').endswith('data/local'))
+
+    def test_nothing_changed(self):
+        self.assertFalse(self.reloader.check())
+        self.assertEqual(['default', 'local'], self.calls)
+        self.assertEqual([], self.changes)
+
+    def test_reload_last_module(self):
+        self.write('reloadpkg/settings/local.py', LOCAL.format('other', 'b'))
+
+        layer = self.reloader.check()
+
+        self.assertEqual({'name'}, layer.keys())
+        self.assertEqual(['default', 'local', 'local'], self.calls)
+        self.assertEqual('db://other@db1', self.settings['db']['dsn'])
+        self.assertTrue(self.paths.get('b').endswith('data/local'))
+        self.assertRaises(KeyError, self.paths.get, 'a')
+        self.assertEqual([({'name'}, {'a', 'b'})], self.changes)
+
+    def test_reload_first_module(self):
+        self.settings['patched'] = 'yes'
+        self.write('reloadpkg/settings/default.py', DEFAULT.format('db2'))
+
+        self.reloader.check()
+
+        self.assertEqual(['default', 'local', 'default'], self.calls)
+        self.assertEqual('db://local@db2', self.settings['db']['dsn'])
+        self.assertEqual('yes', self.settings['patched'])
+        self.assertEqual([({'db.host'}, set())], self.changes)
+
+    def test_error(self):
+        self.write('reloadpkg/settings/default.py', 'raise ValueError()')
+        self.assertRaises(ValueError, self.reloader.check)
+        self.assertFalse(self.reloader.check())
+        self.assertEqual('db://local@db1', self.settings['db']['dsn'])
+
+        self.write('reloadpkg/settings/default.py', DEFAULT.format('db3'))
+        self.reloader.check()
+        self.assertEqual('db://local@db3', self.settings['db']['dsn'])
+
+    def test_removed_module(self):
+        os.remove(os.path.join(self.root, 'reloadpkg/settings/local.py'))
+        self.reloader.check()
+        self.assertEqual('db://app@db1', self.settings['db']['dsn'])
+
+    def test_versioned_settings(self):
+        settings = VersionedSettings(self.settings)
+        self.reloader.settings = settings
+        self.write('reloadpkg/settings/local.py', LOCAL.format('other', 'a'))
+
+        self.reloader.check()
+
+        self.assertEqual(1, settings.version)
+        self.assertEqual('db://other@db1', settings['db']['dsn'])
+        self.assertEqual('db://local@db1', self.settings['db']['dsn'])
+
+    def test_watch(self):
+        self.reloader.start(interval=0.01)
+        self.write('reloadpkg/settings/local.py', LOCAL.format('other', 'a'))
+        for index in range(200):
+            if self.changes:
+                break
+            time.sleep(0.01)
+        self.reloader.stop()
+        self.assertEqual('db://other@db1', self.settings['db']['dsn'])
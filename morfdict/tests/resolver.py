@@ -0,0 +1,89 @@
+from mock import MagicMock
+from mock import patch
+
+from .base import TestCase
+from morfdict import StringDict
+from morfdict.resolver import InterpolationCycleError
+from morfdict.resolver import Resolver
+
+
+class ResolverTest(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.data = StringDict({
+            'first': 'one',
+            'second': '%(first)s two',
+            'third': '%(second)s three',
+            'fourth': '%(third)s %(second)s four',
+        })
+
+    def test_chain(self):
+        resolver = Resolver(self.data).resolve()
+        self.assertEqual('one two three', resolver.get('third'))
+        self.assertEqual(
+            'one two three one two four', resolver.get('fourth'))
+
+    def test_order(self):
+        order = Resolver(self.data).resolve()._sort()
+        for key, before in [('second', 'first'), ('third', 'second')]:
+            self.assertTrue(order.index(before) < order.index(key))
+
+    def test_resolve_once(self):
+        morf = MagicMock(return_value='morfed')
+        self.data.set_morf('first', morf)
+        self.data['fifth'] = '%(first)s %(first)s'
+
+        self.assertEqual('morfed morfed', self.data.to_dict()['fifth'])
+        morf.assert_called_once_with(self.data, 'one')
+
+    def test_parent_values(self):
+        self.data['child'] = {'value': '%(third)s child'}
+        self.assertEqual(
+            'one two three child', self.data.to_dict()['child']['value'])
+
+    def test_escaped(self):
+        self.data['escaped'] = '100%%'
+        self.data['mixed'] = '%(first)s 100%%'
+        data = self.data.to_dict()
+        self.assertEqual('100%', data['escaped'])
+        self.assertEqual('one 100%', data['mixed'])
+
+    def test_cycle(self):
+        self.data['a'] = '%(b)s'
+        self.data['b'] = '%(c)s'
+        self.data['c'] = '%(a)s'
+        self.data['d'] = '%(a)s d'
+
+        try:
+            self.data.to_dict()
+            assert False
+        except InterpolationCycleError as error:
+            self.assertEqual(4, len(error.cycle))
+            self.assertEqual(error.cycle[0], error.cycle[-1])
+            self.assertEqual({'a', 'b', 'c'}, set(error.cycle))
+            self.assertTrue(' -> ' in error.message)
+
+    def test_errors(self):
+        self.data['self'] = '%(self)s'
+        self.data['missing'] = '%(nothing)s'
+        self.data['uses_missing'] = '%(missing)s'
+
+        errors = self.data.get_errors()
+        self.assertEqual(3, len(errors))
+        types = [type(error) for error in errors]
+        self.assertEqual(1, types.count(InterpolationCycleError))
+        self.assertEqual(2, types.count(KeyError))
+
+    def test_only_references_sorted(self):
+        resolver = Resolver(self.data).resolve()
+        self.assertEqual(['second', 'third', 'fourth'], list(resolver.graph))
+        self.assertEqual('one', resolver.values['first'])
+
+    def test_no_templates(self):
+        data = StringDict({'name': 'app', 'port': 5432, 'db': {'a': 'b'}})
+        with patch('morfdict.models.Resolver') as resolver:
+            self.assertEqual(
+                {'name': 'app', 'port': 5432, 'db': {'a': 'b'}},
+                data.to_dict())
+            self.assertFalse(resolver.called)
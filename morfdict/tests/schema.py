@@ -0,0 +1,206 @@
+from .base import TestCase
+from morfdict import Paths
+from morfdict import StringDict
+from morfdict.schema import CoercingMorf
+from morfdict.schema import Field
+from morfdict.schema import Schema
+from morfdict.schema import SchemaError
+from morfdict.schema import Section
+
+
+class SchemaTest(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.schema = Schema({
+            'name': str,
+            'debug': bool,
+            'db': {'host': str, 'port': int, 'name': str},
+            'extra': object,
+        })
+        self.settings = StringDict({
+            'name': 'app',
+            'debug': False,
+            'db': {'host': '%(name)s-db', 'port': 5432},
+            'extra': None,
+            'ignored': '%(missing)s',
+        })
+
+    def test_build(self):
+        cfg = self.schema.build(self.settings)
+        self.assertEqual('app', cfg.name)
+        self.assertEqual('app-db', cfg.db.host)
+        self.assertEqual(5432, cfg.db.port)
+        self.assertEqual('app', cfg.db.name)
+        self.assertEqual(None, cfg.extra)
+        self.assertFalse(hasattr(cfg, '__dict__'))
+        self.assertEqual('SettingsDb', type(cfg.db).__name__)
+
+    def test_to_dict(self):
+        cfg = self.schema.build(self.settings)
+        self.assertEqual({
+            'name': 'app',
+            'debug': False,
+            'db': {'host': 'app-db', 'port': 5432, 'name': 'app'},
+            'extra': None,
+        }, cfg.to_dict())
+
+    def test_frozen(self):
+        del self.settings['ignored']
+        cfg = self.schema.build(self.settings.freeze())
+        self.assertEqual('app-db', cfg.db.host)
+        self.assertEqual('app', cfg.db.name)
+
+    def test_class_made_once(self):
+        self.assertTrue(
+            type(self.schema.build(self.settings))
+            is type(self.schema.build(self.settings)))
+
+    def test_errors(self):
+        self.settings['debug'] = 1.5
+        self.settings['db']['host'] = '%(missing)s'
+        del self.settings['db']['port']
+        self.settings['db']['name'] = 1
+
+        errors = self.schema.get_errors(self.settings)
+
+        self.assertEqual([
+            '"debug" should be bool, not float',
+            '"db.host" can not be read: KeyError(\'missing\')',
+            '"db.port" is missing',
+            '"db.name" should be str, not int',
+        ], [error.message for error in errors])
+        with self.assertRaises(SchemaError) as context:
+            self.schema.build(self.settings)
+        self.assertEqual(4, len(context.exception.errors))
+
+    def test_not_dict(self):
+        self.settings['db'] = 'db'
+        self.assertEqual(
+            ['"db" is not a dict'],
+            [error.message for error in self.schema.get_errors(
+                self.settings)])
+
+    def test_wrong_key(self):
+        self.assertRaises(ValueError, Schema, {'not valid': str})
+
+
+class CoercionTest(TestCase):
+
+    def setUp(self):
+        super().setUp()
+
+        class Settings(Section):
+            debug = bool
+            workers = Field(int, min=1, max=64)
+
+            class db(Section):
+                host = str
+                port = Field(int, default=5432)
+                mode = Field(str, choices=('rw', 'ro'), default='rw')
+
+        self.schema = Schema(Settings, paths={'base': Field(check=bool)})
+        self.settings = StringDict({
+            'debug': 'yes',
+            'workers': '%(count)s',
+            'count': '4',
+            'db': {'host': 'localhost', 'port': '5433'},
+        })
+
+    def test_class_declaration(self):
+        self.assertEqual('Settings', self.schema.name)
+        self.assertEqual(
+            ['debug', 'workers', 'db'], list(self.schema.fields))
+        self.assertEqual('SettingsDb', self.schema.fields['db'].name)
+
+    def test_build_coerces(self):
+        cfg = self.schema.build(self.settings)
+        self.assertEqual(True, cfg.debug)
+        self.assertEqual(4, cfg.workers)
+        self.assertEqual(5433, cfg.db.port)
+        self.assertEqual('rw', cfg.db.mode)
+        # settings are not changed
+        self.assertEqual('5433', self.settings['db']['port'])
+
+    def test_errors(self):
+        self.settings['debug'] = 'maybe'
+        self.settings['count'] = '100'
+        self.settings['db']['port'] = 'http'
+        self.settings['db']['mode'] = 'wr'
+        paths = Paths()
+
+        errors = self.schema.get_errors(self.settings, paths)
+
+        self.assertEqual([
+            '"debug" can not be converted: \'maybe\' is not a bool value',
+            '"workers" should be at most 64',
+            '"db.port" can not be converted: invalid literal for int() '
+            'with base 10: \'http\'',
+            '"db.mode" should be one of \'rw\', \'ro\'',
+            '"paths.base" is missing',
+        ], [error.message for error in errors])
+
+    def test_coerce(self):
+        paths = Paths()
+        paths.set('base', '/tmp')
+        self.schema.coerce(self.settings, paths)
+
+        self.assertEqual(True, self.settings['debug'])
+        self.assertEqual(4, self.settings['workers'])
+        self.assertEqual(5433, self.settings['db']['port'])
+        self.assertEqual('rw', self.settings['db']['mode'])
+        self.assertEqual({
+            'debug': True,
+            'workers': 4,
+            'count': '4',
+            'db': {'host': 'localhost', 'port': 5433, 'mode': 'rw'},
+        }, self.settings.to_dict())
+
+        self.settings['count'] = '8'
+        self.assertEqual(8, self.settings['workers'])
+        self.settings['count'] = '0'
+        self.assertRaises(ValueError, self.settings.__getitem__, 'workers')
+
+    def test_coerce_twice(self):
+        self.schema.coerce(self.settings)
+        self.schema.coerce(self.settings)
+        morf = self.settings._morf['debug']
+        self.assertTrue(isinstance(morf, CoercingMorf))
+        self.assertEqual(None, morf.morf)
+
+    def test_coerce_errors(self):
+        self.settings['workers'] = 0
+        with self.assertRaises(SchemaError) as context:
+            self.schema.coerce(self.settings)
+        self.assertEqual(
+            '"workers" should be at least 1', context.exception.message)
+
+    def test_coerced_value_cached(self):
+        calls = []
+
+        def convert(value):
+            calls.append(value)
+            return int(value)
+
+        schema = Schema({'port': Field(int, convert=convert)})
+        settings = StringDict({'port': '80'})
+        schema.coerce(settings)
+        settings['port']
+        settings['port']
+        self.assertEqual(['80'], calls)
+
+    def test_coerced_value_not_used_by_new_object(self):
+        calls = []
+
+        def convert(value):
+            calls.append(value)
+            return int(value)
+
+        morf = CoercingMorf(Field(int, convert=convert))
+        for index in range(3):
+            settings = StringDict({'port': '80'})
+            settings.set_morf('port', morf)
+            self.assertEqual(80, settings['port'])
+            del settings
+        self.assertEqual(['80', '80', '80'], calls)
+        self.assertTrue(len(morf.cache) <= CoercingMorf.maxsize)
@@ -0,0 +1,88 @@
+import os
+
+from .base import TempDirTestCase
+from morfdict import StringDict
+from morfdict.shared import SharedDict
+from morfdict.shared import SharedDictError
+from morfdict.shared import export_shared
+from morfdict.shared import open_shared
+
+
+class SharedDictTest(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.filename = os.path.join(self.root, 'settings.shared')
+        self.settings = StringDict({
+            'name': 'app',
+            'port': 8000,
+            'debug': False,
+            'hosts': ['one', 'two'],
+            'url': 'http://%(name)s:%(port)s',
+            'db': {'name': 'db', 'dsn': '%(url)s/%(name)s'},
+            'zażółć': 'unicode',
+        })
+        export_shared(self.settings, self.filename)
+        self.shared = open_shared(self.filename)
+
+    def test_values(self):
+        self.assertEqual('app', self.shared['name'])
+        self.assertEqual(8000, self.shared['port'])
+        self.assertEqual(False, self.shared['debug'])
+        self.assertEqual(['one', 'two'], self.shared['hosts'])
+        self.assertEqual('http://app:8000', self.shared['url'])
+        self.assertEqual('unicode', self.shared['zażółć'])
+
+    def test_nested(self):
+        self.assertTrue(isinstance(self.shared['db'], SharedDict))
+        self.assertEqual('http://app:8000/db', self.shared['db']['dsn'])
+
+    def test_inherited(self):
+        self.assertEqual('http://app:8000', self.shared['db'].get('url'))
+        self.assertFalse('url' in self.shared['db'])
+        self.assertEqual(['dsn', 'name'], sorted(self.shared['db']))
+
+    def test_inherited_not_repeated(self):
+        settings = StringDict({
+            'key{0}'.format(index): {'value': 'x' * 100}
+            for index in range(200)})
+        export_shared(settings, self.filename)
+        shared = open_shared(self.filename)
+
+        self.assertEqual('x' * 100, shared['key1']['key2']['value'])
+        self.assertLess(os.path.getsize(self.filename), 200 * 1000)
+
+    def test_not_morfdict_parent(self):
+        self.settings['db'].append_parent({'extra': '%(name)s extra'})
+        export_shared(self.settings, self.filename)
+        shared = open_shared(self.filename)
+        self.assertEqual('db extra', shared['db']['extra'])
+        self.assertEqual('http://app:8000', shared['db']['url'])
+
+    def test_missing(self):
+        self.assertRaises(KeyError, lambda: self.shared['missing'])
+        self.assertRaises(KeyError, lambda: self.shared[1])
+        self.assertEqual('default', self.shared.get('missing', 'default'))
+
+    def test_mapping(self):
+        self.assertEqual(7, len(self.shared))
+        self.assertTrue('name' in self.shared)
+        self.assertEqual(self.settings.to_dict(), self.shared.to_dict())
+        self.assertEqual(
+            self.settings['db'].to_dict(), dict(self.shared['db'].items()))
+
+    def test_readonly(self):
+        def assign():
+            self.shared['name'] = 'other'
+
+        self.assertRaises(TypeError, assign)
+
+    def test_unsupported_value(self):
+        self.settings['object'] = object()
+        self.assertRaises(
+            SharedDictError, export_shared, self.settings, self.filename)
+
+    def test_not_shared_file(self):
+        with open(self.filename, 'wb') as stream:
+            stream.write(b'x' * 32)
+        self.assertRaises(SharedDictError, open_shared, self.filename)
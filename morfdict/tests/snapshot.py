@@ -0,0 +1,174 @@
+import os
+import sys
+
+from mock import patch
+
+from .base import PackageTestCase
+from morfdict import Factory
+from morfdict import StringDict
+from morfdict.snapshot import SnapshotError
+from morfdict.snapshot import find_module_file
+from morfdict.snapshot import read_snapshot
+from morfdict.snapshot import write_snapshot
+
+DEFAULT = '''
+from snapshotpkg.morfs import generator
+from snapshotpkg.morfs import upper
+
+
+def make_settings(settings, paths):
+    settings['name'] = 'app'
+    settings['url'] = 'db://%(name)s'
+    settings['db'] = {'dsn': '%(url)s/main'}
+    settings.set_morf('name', upper)
+    paths.set('data', 'data', 'module_root')
+    paths.set_generator('generated', generator, 'data', cacheable=True)
+'''
+
+MORFS = '''
+def upper(obj, value):
+    return value.upper()
+
+
+def generator(paths):
+    return 'generated'
+'''
+
+
+class SnapshotTestCase(PackageTestCase):
+    package = 'snapshotpkg'
+
+    def setUp(self):
+        super().setUp()
+        self.snapshot = os.path.join(self.root, 'settings.snapshot')
+        self.write('snapshotpkg/__init__.py', '')
+        self.write('snapshotpkg/morfs.py', MORFS)
+        self.write('snapshotpkg/settings/__init__.py', '')
+        self.write('snapshotpkg/settings/default.py', DEFAULT)
+
+
+class SnapshotTest(SnapshotTestCase):
+
+    def test_find_module_file(self):
+        self.assertEqual(
+            os.path.join(self.root, 'snapshotpkg', 'settings', 'default.py'),
+            find_module_file('snapshotpkg.settings.default'))
+        self.assertEqual(None, find_module_file('snapshotpkg.settings.local'))
+        self.assertFalse('snapshotpkg.settings' in sys.modules)
+
+    def test_dump_and_load(self):
+        settings, paths = Factory('snapshotpkg').make_settings()
+        write_snapshot(self.snapshot, 'key', settings, paths)
+
+        loaded_settings, loaded_paths = read_snapshot(
+            self.snapshot, 'key', StringDict)
+        self.assertEqual(settings.to_dict(), loaded_settings.to_dict())
+        self.assertEqual('db://APP/main', loaded_settings['db']['dsn'])
+        self.assertEqual(paths.to_dict(), loaded_paths.to_dict())
+
+    def test_wrong_key(self):
+        settings, paths = Factory('snapshotpkg').make_settings()
+        write_snapshot(self.snapshot, 'key', settings, paths)
+        self.assertEqual(
+            None, read_snapshot(self.snapshot, 'other', StringDict))
+
+    def test_no_snapshot(self):
+        self.assertEqual(
+            None, read_snapshot(self.snapshot, 'key', StringDict))
+
+    def test_not_written(self):
+        factory = Factory('snapshotpkg')
+        factory.init_data({})
+        os.mkdir(self.snapshot)
+
+        self.assertRaises(
+            SnapshotError, write_snapshot, self.snapshot, 'key',
+            factory.settings, factory.paths)
+        self.assertEqual(['settings.snapshot'], sorted(
+            name for name in os.listdir(self.root)
+            if name.startswith('settings')))
+
+    def test_lambda_morf(self):
+        settings = StringDict({'name': 'value'})
+        settings.set_morf('name', lambda obj, value: value)
+        factory = Factory('snapshotpkg')
+        factory.init_data({})
+
+        self.assertRaises(
+            SnapshotError,
+            write_snapshot, self.snapshot, 'key', settings, factory.paths)
+
+
+class FactorySnapshotTest(SnapshotTestCase):
+
+    def make_settings(self):
+        factory = Factory('snapshotpkg')
+        return factory, factory.make_settings(snapshot=self.snapshot)
+
+    def test_snapshot_used(self):
+        factory, (settings, paths) = self.make_settings()
+        self.assertTrue(os.path.isfile(self.snapshot))
+
+        with patch.object(Factory, 'run_module') as run_module:
+            factory, (loaded, loaded_paths) = self.make_settings()
+            self.assertFalse(run_module.called)
+        self.assertEqual(settings.to_dict(), loaded.to_dict())
+        self.assertEqual(paths.to_dict(), loaded_paths.to_dict())
+        self.assertTrue(factory.settings is loaded)
+
+    def test_missing_directory(self):
+        self.snapshot = os.path.join(self.root, 'missing', 'snapshot')
+        factory, (settings, paths) = self.make_settings()
+        self.assertEqual('APP', settings['name'])
+        self.assertFalse(os.path.exists(self.snapshot))
+
+    def test_changed_module(self):
+        self.make_settings()
+        self.write(
+            'snapshotpkg/settings/default.py',
+            DEFAULT + "    settings['extra'] = 'yes'\n")
+        sys.modules.pop('snapshotpkg.settings.default', None)
+
+        factory, (settings, paths) = self.make_settings()
+        self.assertEqual('yes', settings['extra'])
+
+    def test_added_module(self):
+        self.make_settings()
+        self.write(
+            'snapshotpkg/settings/local.py',
+            'def make_settings(settings, paths):\n'
+            "    settings['name'] = 'local'\n")
+
+        factory, (settings, paths) = self.make_settings()
+        self.assertEqual('LOCAL', settings['name'])
+
+    def test_parents(self):
+        self.write(
+            'snapshotpkg/settings/local.py',
+            'from morfdict import StringDict\n'
+            '\n'
+            '\n'
+            'def make_settings(settings, paths):\n'
+            "    settings['base'] = {'host': 'h'}\n"
+            "    settings['db'] = {'url': '%(host)s:%(port)s'}\n"
+            "    settings['db'].append_parent(settings['base'])\n"
+            "    settings.append_parent(StringDict({'port': '5432'}))\n")
+
+        factory, (settings, paths) = self.make_settings()
+        self.assertEqual('h:5432', settings['db']['url'])
+        with patch.object(Factory, 'run_module') as run_module:
+            factory, (loaded, loaded_paths) = self.make_settings()
+            self.assertFalse(run_module.called)
+        self.assertEqual('h:5432', loaded['db']['url'])
+        loaded['base']['host'] = 'other'
+        self.assertEqual('other:5432', loaded['db']['url'])
+
+    def test_not_stored(self):
+        self.write(
+            'snapshotpkg/settings/local.py',
+            'def make_settings(settings, paths):\n'
+            "    settings.set_morf('name', lambda obj, value: value)\n")
+
+        factory, (settings, paths) = self.make_settings()
+        self.assertEqual('app', settings['name'])
+        self.assertFalse(os.path.exists(self.snapshot))
@@ -0,0 +1,119 @@
+import pickle
+
+from mock import patch
+
+from .base import TestCase
+from morfdict import MorfDict
+from morfdict import StringDict
+from morfdict.template import Template
+from morfdict.template import find_references
+
+
+class FindReferencesTest(TestCase):
+
+    def test_no_placeholders(self):
+        self.assertEqual([], find_references('plain value'))
+
+    def test_placeholders(self):
+        self.assertEqual(
+            ['one', 'two:three'],
+            find_references('%(one)s %%(escaped)s %(two:three)s %(one)d'))
+
+    def test_template(self):
+        self.assertEqual(['one'], find_references(Template('%(one)s')))
+
+    def test_parentheses(self):
+        self.assertEqual(
+            ['a(x)', 'b'], find_references('%(a(x))s %(b)s (%(a(x))s)'))
+
+
+class TemplateTest(TestCase):
+
+    def test_compile(self):
+        template = Template('%(one)s and %(two)05d %% of %(one)s')
+        self.assertEqual('%s and %05d %% of %s', template.format)
+        self.assertEqual(('one', 'two', 'one'), template.keys)
+        self.assertEqual(('one', 'two'), template.references)
+
+    def test_render(self):
+        template = Template('%(one)s and %(two)05d %% of %(one)s')
+        self.assertEqual(
+            'a and 00002 % of a', template.render({'one': 'a', 'two': 2}))
+
+    def test_positional(self):
+        template = Template('%(one)s %s')
+        self.assertEqual(None, template.format)
+        self.assertEqual(('one',), template.references)
+        self.assertRaises(TypeError, template.render, {'one': 1})
+
+    def test_parentheses(self):
+        template = Template('%(a(x))s (%(b)s)')
+        self.assertEqual(None, template.format)
+        self.assertEqual(('a(x)', 'b'), template.references)
+        self.assertEqual('P (B)', template.render({'a(x)': 'P', 'b': 'B'}))
+
+    def test_unclosed_name(self):
+        template = Template('%(a(x)s')
+        self.assertEqual(None, template.format)
+        self.assertRaises(ValueError, template.render, {'a(x': 'P'})
+
+    def test_string(self):
+        template = Template('%(one)s')
+        self.assertEqual('%(one)s', template)
+        self.assertTrue(isinstance(template, str))
+
+    def test_pickle(self):
+        template = pickle.loads(pickle.dumps(Template('%(one)s')))
+        self.assertEqual(('one',), template.keys)
+
+
+class StringDictTemplateTest(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.data = StringDict({'one': 'first', 'two': '%(one)s second'})
+
+    def test_compiled_on_set(self):
+        self.assertTrue(type(self.data._raw_get('two')) is Template)
+        self.assertTrue(type(self.data._raw_get('one')) is str)
+        self.assertEqual({'one': 'first', 'two': '%(one)s second'}, self.data)
+
+    def test_plain_string(self):
+        with patch.object(Template, 'render') as render:
+            self.assertEqual('first', self.data['one'])
+            self.assertFalse(render.called)
+
+    def test_interpolation(self):
+        self.assertEqual('first second', self.data['two'])
+        self.data['one'] = 'changed'
+        self.assertEqual('changed second', self.data['two'])
+
+    def test_references(self):
+        self.assertEqual(['one'], self.data.get_references('two'))
+        self.assertEqual([], self.data.get_references('one'))
+
+    def test_merge(self):
+        data = StringDict({'one': 'merged'})
+        data.merge(self.data)
+        self.assertTrue(type(data._raw_get('two')) is Template)
+        self.assertEqual('first second', data['two'])
+
+    def test_custom_morf_gets_str(self):
+        values = []
+
+        def morf(obj, value):
+            values.append(value)
+            return value
+
+        self.data.set_morf('two', morf)
+        self.assertTrue(type(self.data['two']) is str)
+        self.assertTrue(type(self.data.to_dict()['two']) is str)
+        self.assertEqual(['%(one)s second', '%(one)s second'], values)
+
+    def test_not_kept_in_morfdict(self):
+        data = MorfDict()
+        data.merge(self.data)
+        data.update(self.data)
+        data['three'] = self.data._raw_get('two')
+        for key in ['two', 'three']:
+            self.assertTrue(type(data._raw_get(key)) is str)
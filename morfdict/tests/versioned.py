@@ -0,0 +1,106 @@
+from threading import Thread
+
+from .base import TestCase
+from morfdict import CachedStringDict
+from morfdict import StringDict
+from morfdict.versioned import VersionedSettings
+
+
+class VersionedSettingsTest(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.original = StringDict({
+            'name': 'app',
+            'url': 'http://%(name)s',
+            'db': {'host': 'db1', 'port': '5432', 'url': '%(host)s:%(port)s'},
+        })
+        self.settings = VersionedSettings(self.original)
+
+    def test_read(self):
+        self.assertEqual('http://app', self.settings['url'])
+        self.assertEqual('app', self.settings['db']['name'])
+        self.assertEqual('db1:5432', self.settings.to_dict()['db']['url'])
+        self.assertTrue('name' in self.settings)
+        self.assertEqual(3, len(self.settings))
+
+    def test_write_publishes_copy(self):
+        old = self.settings.snapshot()
+        self.settings['name'] = 'new'
+
+        self.assertEqual(1, self.settings.version)
+        self.assertEqual('http://new', self.settings['url'])
+        self.assertEqual('new', self.settings['db']['name'])
+        self.assertEqual('http://app', old['url'])
+        self.assertEqual('app', old['db']['name'])
+
+    def test_copy_keeps_tree(self):
+        self.original.set_morf('name', lambda obj, value: value.upper())
+        self.settings['other'] = 'x'
+        new = self.settings.snapshot()
+
+        self.assertFalse(new['db'] is self.original['db'])
+        self.assertEqual('APP', new['db']['name'])
+        self.assertTrue(new['db']._parents[0] is new)
+
+    def test_transaction(self):
+        old = self.settings.snapshot()
+        with self.settings.transaction() as settings:
+            settings['db']['host'] = 'db2'
+            self.settings['name'] = 'new'
+            self.assertEqual('app', self.settings['name'])
+            self.assertEqual('new', settings['db']['name'])
+            self.assertEqual('db2:5432', settings['db']['url'])
+
+        self.assertEqual(1, self.settings.version)
+        self.assertEqual('db2:5432', self.settings['db']['url'])
+        self.assertEqual('new', self.settings['name'])
+        self.assertEqual('db1:5432', old['db']['url'])
+
+    def test_transaction_error(self):
+        with self.assertRaises(RuntimeError):
+            with self.settings.transaction() as settings:
+                settings['name'] = 'new'
+                raise RuntimeError()
+
+        self.assertEqual(0, self.settings.version)
+        self.assertEqual('app', self.settings['name'])
+
+    def test_cached_string_dict(self):
+        settings = VersionedSettings(CachedStringDict({
+            'name': 'app',
+            'url': 'http://%(name)s',
+        }))
+        self.assertEqual('http://app', settings['url'])
+        settings['name'] = 'new'
+        self.assertEqual('http://new', settings['url'])
+
+    def test_consistent_reads(self):
+        self.settings['first'] = '0'
+        self.settings['second'] = '0'
+        errors = []
+
+        def read():
+            for index in range(2000):
+                data = self.settings.snapshot()
+                if data['first'] != data['second']:
+                    errors.append((data['first'], data['second']))
+                values = dict(self.settings.items())
+                if values['first'] != values['second']:
+                    errors.append((values['first'], values['second']))
+
+        def write():
+            for index in range(200):
+                with self.settings.transaction() as settings:
+                    settings['first'] = str(index)
+                    settings['second'] = str(index)
+
+        threads = [Thread(target=read) for index in range(4)]
+        threads.append(Thread(target=write))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([], errors)
+        self.assertEqual('199', self.settings['second'])
@@ -0,0 +1,106 @@
+from contextlib import contextmanager
+from threading import RLock
+
+
+class VersionedSettings(object):
+    """MorfDict shared by many threads.
+
+    Readers use the current version of the settings without any lock.
+    Writers copy the whole tree, change the copy and publish it by replacing
+    one reference, so readers see either the old or the new version, never
+    a half done change. items, to_dict and the other methods which read
+    many keys use one version from the start to the end.
+
+    Every write copies the tree, so make many changes at once with
+    transaction(). Nested dicts read from this object belong to the
+    published version, so change them only inside a transaction. Values
+    other than MorfDicts are shared by the versions, so they should not be
+    changed in place.
+
+    >> settings = VersionedSettings(settings)
+    >> with settings.transaction() as new:
+    >>     new['db']['host'] = 'db2'
+    >>     new['db']['port'] = 5433
+    """
+
+    def __init__(self, settings):
+        self._current = settings
+        self._pending = None
+        self._lock = RLock()
+        self.version = 0
+
+    def snapshot(self):
+        """Get the current version. Published versions are never changed,
+        so do not change it directly."""
+        return self._current
+
+    @contextmanager
+    def transaction(self):
+        """Yield copy of the current version which is published when the
+        block ends without an error. Nested transactions use the same copy
+        and only the outermost one publishes it."""
+        with self._lock:
+            if self._pending is not None:
+                yield self._pending
+                return
+            self._pending = self._current._copy_tree()
+            try:
+                yield self._pending
+                self._current = self._pending
+                self.version += 1
+            finally:
+                self._pending = None
+
+    def __getitem__(self, key):
+        return self._current[key]
+
+    def __contains__(self, key):
+        return key in self._current
+
+    def __iter__(self):
+        return iter(self._current)
+
+    def __len__(self):
+        return len(self._current)
+
+    def get(self, key, default=None):
+        return self._current.get(key, default)
+
+    def keys(self):
+        return self._current.keys()
+
+    def items(self):
+        return self._current.items()
+
+    def to_dict(self):
+        return self._current.to_dict()
+
+    def get_errors(self):
+        return self._current.get_errors()
+
+    def freeze(self):
+        return self._current.freeze()
+
+    def __setitem__(self, key, value):
+        with self.transaction() as settings:
+            settings[key] = value
+
+    def __delitem__(self, key):
+        with self.transaction() as settings:
+            del settings[key]
+
+    def set_morf(self, key, morf):
+        with self.transaction() as settings:
+            settings.set_morf(key, morf)
+
+    def del_morf(self, key):
+        with self.transaction() as settings:
+            settings.del_morf(key)
+
+    def merge(self, data):
+        with self.transaction() as settings:
+            settings.merge(data)
+
+    def append_parent(self, parent):
+        with self.transaction() as settings:
+            settings.append_parent(parent)
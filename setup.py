@@ -13,7 +13,7 @@ if __name__ == '__main__':
         author='Dominik "Socek" Długajczy',
         author_email='msocek@gmail.com',
         test_suite='morfdict.tests.get_all_test_suite',
-        packages=find_packages(),
+        packages=find_packages(exclude=['benchmarks', 'benchmarks.*']),
         package_data={'morfdict': ['README.rst']},
         long_description=read('morfdict/README.rst'),
         description=(